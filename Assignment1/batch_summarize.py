@@ -0,0 +1,171 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_community.chat_models import ChatOllama
+from pdf_index import file_sha256
+from embedding_backends import EMBEDDING_BACKENDS
+from summarize_pdf import (
+    MODEL_NAME, PERSIST_DIRECTORY, SUMMARY_TOKEN_BUDGET, EXTRACT_WORKERS, EMBEDDING_BACKEND,
+    make_pipeline, setup_persistent_vectorstore, load_and_split_pdf,
+    summarize_doc, summarize_doc_map_reduce, setup_llm_cache, print_cache_stats
+)
+
+BATCH_WORKERS = 4 # Documents summarized concurrently
+
+
+def find_pdfs(source):
+    """Returns the PDFs in a directory (recursively) or matching a glob pattern."""
+    if os.path.isdir(source):
+        pattern = os.path.join(source, "**", "*.pdf")
+    else:
+        pattern = source
+    return sorted(os.path.abspath(path) for path in glob.glob(pattern, recursive=True) if path.lower().endswith(".pdf"))
+
+
+class BatchManifest:
+    """
+    Records which PDFs have been summarized, keyed by absolute path, so an
+    interrupted batch resumes where it stopped. A PDF is skipped only if it
+    finished successfully and its content hash has not changed since.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def is_done(self, file_path, sha256):
+        entry = self.entries.get(file_path)
+        return entry is not None and entry["status"] == "done" and entry["sha256"] == sha256
+
+    def record(self, file_path, sha256, status, error=None):
+        with self._lock:
+            self.entries[file_path] = {"sha256": sha256, "status": status, "error": error}
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+class BatchSummarizer:
+    """
+    Summarizes many PDFs in one process through a shared, warm worker pool.
+
+    The LLM client, embedding pipeline and LLM cache are created once and
+    shared by every worker thread; the heavy lifting happens in the Ollama
+    server, so threads keep it busy without paying interpreter start-up and
+    client set-up for every file.
+    """
+
+    def __init__(self, mode="retrieval", workers=BATCH_WORKERS, persist_directory=PERSIST_DIRECTORY,
+                 token_budget=SUMMARY_TOKEN_BUDGET, extract_workers=EXTRACT_WORKERS, bypass_cache=False,
+                 embedding_backend=EMBEDDING_BACKEND):
+        self.mode = mode
+        self.workers = workers
+        self.persist_directory = persist_directory
+        self.token_budget = token_budget
+        self.extract_workers = extract_workers
+        self.cache = setup_llm_cache(bypass=bypass_cache)
+        self.llm = ChatOllama(model=MODEL_NAME)
+        self.pipeline = make_pipeline(backend=embedding_backend)
+
+    def summarize_file(self, file_path):
+        if self.mode == "map-reduce":
+            splits = load_and_split_pdf(file_path, self.extract_workers)
+            return summarize_doc_map_reduce(splits, self.token_budget, llm=self.llm)
+        vectorstore = setup_persistent_vectorstore(
+            file_path, self.persist_directory, self.pipeline, workers=self.extract_workers
+        )
+        return summarize_doc(vectorstore, llm=self.llm)
+
+    def _process(self, file_path, sha256):
+        start = time.perf_counter()
+        try:
+            summary = self.summarize_file(file_path)
+            return {"path": file_path, "sha256": sha256, "status": "done", "summary": summary,
+                    "seconds": time.perf_counter() - start}
+        except Exception as e:
+            return {"path": file_path, "sha256": sha256, "status": "failed", "error": str(e),
+                    "seconds": time.perf_counter() - start}
+
+    def run(self, files, output_path, manifest):
+        """Summarizes every file not yet done, appending one JSON line per document to output_path."""
+        todo = []
+        for file_path in files:
+            sha256 = file_sha256(file_path)
+            if not manifest.is_done(file_path, sha256):
+                todo.append((file_path, sha256))
+        print(f"Found {len(files)} PDFs, {len(files) - len(todo)} already summarized, {len(todo)} to process.")
+
+        done = failed = 0
+        total_bytes = 0
+        start = time.perf_counter()
+        with open(output_path, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [executor.submit(self._process, file_path, sha256) for file_path, sha256 in todo]
+            for future in as_completed(futures):
+                result = future.result()
+                # The result line is flushed before the manifest marks the file done
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                manifest.record(result["path"], result["sha256"], result["status"], result.get("error"))
+                if result["status"] == "done":
+                    done += 1
+                    total_bytes += os.path.getsize(result["path"])
+                else:
+                    failed += 1
+                    print(f"FAILED {result['path']}: {result['error']}")
+                elapsed = time.perf_counter() - start
+                print(f"[{done + failed}/{len(todo)}] {os.path.basename(result['path'])} "
+                      f"in {result['seconds']:.1f}s ({(done + failed) / elapsed:.2f} docs/sec overall)")
+
+        elapsed = time.perf_counter() - start
+        print(f"\nBatch finished: {done} summarized, {failed} failed in {elapsed:.1f}s")
+        if elapsed > 0 and todo:
+            print(f"Throughput: {(done + failed) / elapsed:.2f} docs/sec, "
+                  f"{total_bytes / (1024 * 1024) / elapsed:.2f} MB/sec of PDF")
+        print_cache_stats(self.cache)
+        return done, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize every PDF in a directory or glob with a shared worker pool.")
+    parser.add_argument("source", help="Directory (searched recursively) or glob pattern, e.g. 'docs/**/*.pdf'")
+    parser.add_argument("--output", default="summaries.jsonl", help="JSONL file the summaries are appended to")
+    parser.add_argument("--manifest", help="Resume manifest (default: <output>.manifest.json)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Documents summarized concurrently")
+    parser.add_argument("--mode", choices=["retrieval", "map-reduce"], default="retrieval", help="Summarization mode")
+    parser.add_argument("--index-dir", default=PERSIST_DIRECTORY, help="Directory of the persistent Chroma index")
+    parser.add_argument("--extract-workers", type=int, default=EXTRACT_WORKERS, help="Processes used to extract each PDF's text")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    parser.add_argument("--embedding-backend", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND, help="Embedding backend")
+    args = parser.parse_args()
+
+    files = find_pdfs(args.source)
+    if not files:
+        print(f"No PDF files found for {args.source}")
+        sys.exit(1)
+
+    manifest = BatchManifest(args.manifest or args.output + ".manifest.json")
+    summarizer = BatchSummarizer(
+        mode=args.mode,
+        workers=args.workers,
+        persist_directory=args.index_dir,
+        extract_workers=args.extract_workers,
+        bypass_cache=args.no_cache,
+        embedding_backend=args.embedding_backend
+    )
+    _, failed = summarizer.run(files, args.output, manifest)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import os
+import time
+from create_dummy_pdf import create_large_pdf
+from parallel_extract import iter_pages_parallel
+
+
+def benchmark(file_path, worker_counts, repeats=1):
+    """Measures pages/sec of PDF text extraction for each worker count."""
+    results = []
+    for workers in worker_counts:
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            # min_pages=0 so the process pool is used however small the PDF is; 1 worker is the serial baseline
+            num_pages = sum(1 for _ in iter_pages_parallel(file_path, workers, min_pages=0))
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        results.append({"workers": workers, "pages": num_pages, "seconds": best, "pages_per_sec": num_pages / best})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serial vs multi-process PDF text extraction.")
+    parser.add_argument("file_path", nargs="?", help="PDF to extract (default: a generated synthetic PDF)")
+    parser.add_argument("--pages", type=int, default=500, help="Pages in the generated PDF")
+    parser.add_argument("--workers", type=int, nargs="+", help="Worker counts to try (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per worker count, the fastest is reported")
+    args = parser.parse_args()
+
+    file_path = args.file_path
+    generated = file_path is None
+    if generated:
+        file_path = "benchmark_extraction.pdf"
+        create_large_pdf(file_path, args.pages)
+
+    worker_counts = args.workers
+    if not worker_counts:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpu_count:
+            worker_counts.append(worker_counts[-1] * 2)
+
+    try:
+        results = benchmark(file_path, worker_counts, args.repeats)
+    finally:
+        if generated and os.path.exists(file_path):
+            os.remove(file_path)
+
+    baseline = results[0]["pages_per_sec"]
+    print("\n| Workers | Pages | Seconds | Pages/sec | Speedup |")
+    print("| --- | --- | --- | --- | --- |")
+    for res in results:
+        print(f"| {res['workers']} | {res['pages']} | {res['seconds']:.2f} | {res['pages_per_sec']:.1f} | {res['pages_per_sec'] / baseline:.2f}x |")
+
+
+if __name__ == "__main__":
+    main()
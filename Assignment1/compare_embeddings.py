@@ -0,0 +1,84 @@
+import argparse
+import random
+import time
+import numpy as np
+from embedding_backends import EMBEDDING_BACKENDS, get_embeddings
+from summarize_pdf import MODEL_NAME, load_and_split_pdf
+
+
+def make_queries(splits, num_queries, seed=0):
+    """
+    Builds (query, chunk index) pairs: each query is a sentence-sized span
+    taken from the middle of a chunk, and the right answer is that chunk.
+    """
+    rng = random.Random(seed)
+    candidates = [i for i, doc in enumerate(splits) if len(doc.page_content) > 200]
+    queries = []
+    for index in rng.sample(candidates, min(num_queries, len(candidates))):
+        text = splits[index].page_content
+        start = len(text) // 3
+        queries.append((text[start:start + 150], index))
+    return queries
+
+
+def evaluate(backend, model_name, threads, splits, queries):
+    """Returns embedding throughput and retrieval quality of one backend."""
+    start = time.perf_counter()
+    embeddings, embedding_id = get_embeddings(backend, model_name, threads)
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc_vectors = np.array(embeddings.embed_documents([doc.page_content for doc in splits]), dtype=np.float32)
+    embed_seconds = time.perf_counter() - start
+    query_vectors = np.array([embeddings.embed_query(query) for query, _ in queries], dtype=np.float32)
+
+    doc_vectors /= np.linalg.norm(doc_vectors, axis=1, keepdims=True) + 1e-12
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True) + 1e-12
+    scores = query_vectors @ doc_vectors.T
+    targets = np.array([index for _, index in queries])
+    # Rank of the source chunk among all chunks, 1 is best
+    ranks = (scores > scores[np.arange(len(queries)), targets][:, None]).sum(axis=1) + 1
+
+    return {
+        "backend": embedding_id,
+        "dimensions": doc_vectors.shape[1],
+        "load_seconds": load_seconds,
+        "chunks_per_sec": len(splits) / embed_seconds,
+        "recall_at_1": float(np.mean(ranks <= 1)),
+        "recall_at_5": float(np.mean(ranks <= 5)),
+        "mrr": float(np.mean(1.0 / ranks))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embedding backends on throughput and retrieval quality.")
+    parser.add_argument("file_path", help="PDF whose chunks are embedded and searched")
+    parser.add_argument("--backends", nargs="+", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKENDS, help="Backends to compare")
+    parser.add_argument("--threads", type=int, help="CPU threads for the local backends")
+    parser.add_argument("--queries", type=int, default=100, help="Number of synthetic queries")
+    args = parser.parse_args()
+
+    splits = load_and_split_pdf(args.file_path)
+    queries = make_queries(splits, args.queries)
+    if not queries:
+        print("The PDF is too short to build queries from, try a longer document.")
+        return
+    print(f"Comparing {len(args.backends)} backends on {len(splits)} chunks and {len(queries)} queries...")
+
+    results = []
+    for backend in args.backends:
+        model_name = MODEL_NAME if backend == "ollama" else None
+        try:
+            results.append(evaluate(backend, model_name, args.threads, splits, queries))
+        except Exception as e:
+            print(f"Skipping {backend}: {e}")
+
+    print("\n| Backend | Dims | Load (s) | Chunks/sec | Recall@1 | Recall@5 | MRR |")
+    print("| --- | --- | --- | --- | --- | --- | --- |")
+    for res in results:
+        print(f"| {res['backend']} | {res['dimensions']} | {res['load_seconds']:.1f} | {res['chunks_per_sec']:.1f} | "
+              f"{res['recall_at_1']:.2f} | {res['recall_at_5']:.2f} | {res['mrr']:.3f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from langchain_core.documents import Document
+from map_reduce import CHARS_PER_TOKEN, estimate_tokens
+
+
+class ContextPacker:
+    """
+    Assembles retrieved chunks into the context of the stuff-documents chain.
+
+    Chunks from the same page that overlap or touch (by their start_index
+    metadata) are merged into one passage so the shared CHUNK_OVERLAP text is
+    sent once, exact duplicates are dropped, and passages are then added in
+    retrieval order until token_budget is reached. The token counts of every
+    query are kept in last_stats and printed.
+    """
+
+    def __init__(self, token_budget, verbose=True):
+        self.token_budget = token_budget
+        self.verbose = verbose
+        self.last_stats = None
+
+    @staticmethod
+    def merge(docs):
+        """Returns (passage, best retrieval rank) pairs with overlapping chunks of a page merged."""
+        spans = {}
+        unplaced = []
+        seen_text = set()
+        for rank, doc in enumerate(docs):
+            if doc.page_content in seen_text:
+                continue
+            seen_text.add(doc.page_content)
+            start = doc.metadata.get("start_index")
+            if start is None or start < 0:
+                unplaced.append((doc, rank))
+                continue
+            key = (doc.metadata.get("source"), doc.metadata.get("page"))
+            spans.setdefault(key, []).append((start, doc, rank))
+
+        passages = list(unplaced)
+        for chunks in spans.values():
+            chunks.sort(key=lambda chunk: chunk[0])
+            start, doc, rank = chunks[0]
+            text, end = doc.page_content, start + len(doc.page_content)
+            metadata = dict(doc.metadata)
+            for next_start, next_doc, next_rank in chunks[1:]:
+                if next_start <= end:
+                    # Append only the part of the next chunk that isn't already covered
+                    text += next_doc.page_content[end - next_start:]
+                    end = max(end, next_start + len(next_doc.page_content))
+                    rank = min(rank, next_rank)
+                else:
+                    passages.append((Document(page_content=text, metadata=metadata), rank))
+                    text, end, rank = next_doc.page_content, next_start + len(next_doc.page_content), next_rank
+                    metadata = dict(next_doc.metadata)
+            passages.append((Document(page_content=text, metadata=metadata), rank))
+        return passages
+
+    def pack(self, docs):
+        """Merges and packs retrieved chunks to the token budget, most relevant first."""
+        tokens_in = sum(estimate_tokens(doc.page_content) for doc in docs)
+        passages = sorted(self.merge(docs), key=lambda passage: passage[1])
+        merged_tokens = sum(estimate_tokens(doc.page_content) for doc, _ in passages)
+
+        packed = []
+        used = 0
+        for doc, _ in passages:
+            tokens = estimate_tokens(doc.page_content)
+            if used + tokens <= self.token_budget:
+                packed.append(doc)
+                used += tokens
+        if not packed and passages:
+            # Even the best passage is over budget: send as much of it as fits
+            best = passages[0][0]
+            chars = max(0, self.token_budget - 1) * CHARS_PER_TOKEN
+            packed.append(Document(page_content=best.page_content[:chars], metadata=best.metadata))
+            used = estimate_tokens(packed[0].page_content)
+
+        self.last_stats = {
+            "chunks": len(docs),
+            "passages": len(packed),
+            "tokens_in": tokens_in,
+            "tokens_out": used,
+            "saved_by_merge": tokens_in - merged_tokens,
+            "dropped_for_budget": merged_tokens - used
+        }
+        if self.verbose:
+            stats = self.last_stats
+            print(f"Context: {stats['chunks']} chunks -> {stats['passages']} passages, "
+                  f"{stats['tokens_in']} -> {stats['tokens_out']} tokens "
+                  f"({stats['saved_by_merge']} saved by merging overlaps, "
+                  f"{stats['dropped_for_budget']} over the {self.token_budget}-token budget)")
+        return packed
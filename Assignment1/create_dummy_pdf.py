@@ -11,5 +11,15 @@ def create_dummy_pdf(filename):
     c.save()
     print(f"Created {filename}")
 
+def create_large_pdf(filename, num_pages, lines_per_page=40):
+    """Creates a multi-page PDF of numbered filler text for load testing."""
+    c = canvas.Canvas(filename)
+    for page in range(num_pages):
+        for line in range(lines_per_page):
+            c.drawString(50, 780 - line * 18, f"Page {page + 1}, line {line + 1}: Retrieval-Augmented Generation combines search with generation.")
+        c.showPage()
+    c.save()
+    print(f"Created {filename} ({num_pages} pages)")
+
 if __name__ == "__main__":
     create_dummy_pdf("sample.pdf")
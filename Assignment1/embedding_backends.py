@@ -0,0 +1,96 @@
+import os
+from langchain_community.embeddings import OllamaEmbeddings
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_BACKENDS = ["ollama", "sentence-transformers", "onnx"]
+DEFAULT_SENTENCE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# int8 dynamically-quantized export shipped with DEFAULT_SENTENCE_MODEL on the Hugging Face hub
+DEFAULT_ONNX_FILE = "onnx/model_qint8_avx2.onnx"
+# Plain export, used for other models and when the requested file is missing
+FALLBACK_ONNX_FILE = "onnx/model.onnx"
+
+
+def has_file(model_name, file_name):
+    """Whether a local model directory or Hub repo has the file; assumed so when the Hub can't be reached."""
+    if os.path.isdir(model_name):
+        return os.path.exists(os.path.join(model_name, file_name))
+    from huggingface_hub import file_exists
+    try:
+        return file_exists(model_name, file_name)
+    except OSError:
+        # Offline: leave it to the loader and its local cache
+        return True
+
+
+class SentenceTransformerEmbeddings(Embeddings):
+    """
+    Local CPU embeddings from a purpose-built sentence-embedding model.
+
+    With onnx=True the model runs on ONNX Runtime from onnx_file. It defaults
+    to the int8-quantized export for DEFAULT_SENTENCE_MODEL, usually the
+    fastest option on CPU, and to onnx/model.onnx for other models, which is
+    also used when the requested file isn't there.
+    threads caps the intra-op threads of PyTorch or ONNX Runtime.
+    sentence-transformers (and onnxruntime/optimum for ONNX) are optional
+    dependencies and only imported when this backend is used.
+    """
+
+    def __init__(self, model_name=DEFAULT_SENTENCE_MODEL, threads=None, onnx=False,
+                 onnx_file=None, batch_size=64):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("The sentence-transformers backend needs: pip install sentence-transformers") from e
+
+        self.batch_size = batch_size
+        self.onnx_file = None
+        if onnx:
+            try:
+                import onnxruntime
+            except ImportError as e:
+                raise ImportError("The onnx backend needs: pip install \"sentence-transformers[onnx]\"") from e
+            session_options = onnxruntime.SessionOptions()
+            if threads:
+                session_options.intra_op_num_threads = threads
+            if onnx_file is None:
+                onnx_file = DEFAULT_ONNX_FILE if model_name == DEFAULT_SENTENCE_MODEL else FALLBACK_ONNX_FILE
+            if onnx_file != FALLBACK_ONNX_FILE and not has_file(model_name, onnx_file):
+                print(f"{model_name} has no {onnx_file}, using {FALLBACK_ONNX_FILE} instead")
+                onnx_file = FALLBACK_ONNX_FILE
+            self.onnx_file = onnx_file
+            self.model = SentenceTransformer(
+                model_name,
+                backend="onnx",
+                model_kwargs={"file_name": onnx_file, "provider": "CPUExecutionProvider", "session_options": session_options}
+            )
+        else:
+            import torch
+            if threads:
+                torch.set_num_threads(threads)
+            self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed_documents(self, texts):
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, normalize_embeddings=True)
+        return vectors.tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def get_embeddings(backend, model_name=None, threads=None, onnx_file=None):
+    """
+    Returns (embeddings, embedding_id) for the chosen backend. embedding_id
+    names the backend and model (and for onnx, the export that was loaded),
+    so indexes built with different embeddings never get mixed up.
+    """
+    if backend == "ollama":
+        return OllamaEmbeddings(model=model_name), f"ollama:{model_name}"
+    model_name = model_name or DEFAULT_SENTENCE_MODEL
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbeddings(model_name, threads=threads), f"st:{model_name}"
+    if backend == "onnx":
+        embeddings = SentenceTransformerEmbeddings(model_name, threads=threads, onnx=True, onnx_file=onnx_file)
+        if embeddings.onnx_file == DEFAULT_ONNX_FILE:
+            return embeddings, f"onnx-int8:{model_name}"
+        return embeddings, f"onnx:{model_name}:{embeddings.onnx_file}"
+    raise ValueError(f"Unsupported embedding backend: {backend}. Choose one of {EMBEDDING_BACKENDS}.")
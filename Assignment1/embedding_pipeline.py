@@ -0,0 +1,133 @@
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+
+def iter_batches(items, batch_size):
+    """Yields lists of up to batch_size items from any iterable, without materializing it."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def open_chroma(embeddings, collection_name="langchain", persist_directory=None):
+    """
+    Returns (vectorstore, collection): a LangChain Chroma store for retrieval
+    and the chromadb collection behind it, for writing pre-computed vectors.
+    Both go through one chromadb client, so the store's private attributes
+    are never needed. Without persist_directory the index is in memory.
+    """
+    import chromadb
+    from langchain_community.vectorstores import Chroma
+    client = chromadb.PersistentClient(path=persist_directory) if persist_directory else chromadb.Client()
+    vectorstore = Chroma(client=client, collection_name=collection_name, embedding_function=embeddings)
+    return vectorstore, client.get_collection(collection_name)
+
+
+def chroma_writer(collection, make_id=None):
+    """
+    Returns a write(docs, vectors) callback that stores pre-computed embeddings
+    in a chromadb collection (see open_chroma). make_id(doc) picks the id of
+    each chunk (random by default).
+    """
+    make_id = make_id or (lambda doc: str(uuid.uuid4()))
+
+    def write(docs, vectors):
+        collection.upsert(
+            ids=[make_id(doc) for doc in docs],
+            embeddings=vectors,
+            metadatas=[doc.metadata for doc in docs],
+            documents=[doc.page_content for doc in docs]
+        )
+
+    return write
+
+
+class EmbeddingPipeline:
+    """
+    Embeds chunks in batches with a bounded number of batches in flight.
+
+    Batches are embedded on a thread pool while the caller's thread writes
+    finished batches, in order, to the vector store. At most max_in_flight
+    batches are embedded or waiting to be written at any time, so a slow store
+    holds back the embedder instead of letting vectors pile up in memory.
+    The speedup comes from that concurrency. OllamaEmbeddings
+    (langchain-community 0.0.38) sends one HTTP request per text, so with
+    Ollama max_in_flight requests run at once. batch_size only sets the
+    chunks per worker task and per store write.
+    name identifies the embedding backend and model, e.g. "ollama:<model>".
+    """
+
+    def __init__(self, embeddings, batch_size=32, max_in_flight=4, verbose=False, name=None):
+        if batch_size < 1 or max_in_flight < 1:
+            raise ValueError("batch_size and max_in_flight must be at least 1")
+        self.embeddings = embeddings
+        self.name = name or type(embeddings).__name__
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.verbose = verbose
+
+    def _embed_batch(self, docs):
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents([doc.page_content for doc in docs])
+        return vectors, time.perf_counter() - start
+
+    def run(self, chunks, write):
+        """
+        Embeds every chunk and hands each finished batch to write(docs, vectors).
+        Returns throughput and per-batch latency statistics.
+        """
+        latencies = []
+        total_chunks = 0
+        start = time.perf_counter()
+
+        def flush(pending):
+            nonlocal total_chunks
+            docs, future = pending.popleft()
+            vectors, latency = future.result()
+            write(docs, vectors)
+            latencies.append(latency)
+            total_chunks += len(docs)
+            if self.verbose:
+                print(f"  Batch {len(latencies)}: {len(docs)} chunks embedded in {latency:.2f}s")
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            pending = deque()
+            for docs in iter_batches(chunks, self.batch_size):
+                if len(pending) >= self.max_in_flight:
+                    flush(pending)
+                pending.append((docs, executor.submit(self._embed_batch, docs)))
+            while pending:
+                flush(pending)
+
+        stats = self.summarize(total_chunks, time.perf_counter() - start, latencies)
+        if total_chunks:
+            print(f"Embedded {stats['chunks']} chunks in {stats['batches']} batches: "
+                  f"{stats['chunks_per_sec']:.1f} chunks/sec, batch latency "
+                  f"p50 {stats['batch_latency_p50']:.2f}s / p95 {stats['batch_latency_p95']:.2f}s / "
+                  f"max {stats['batch_latency_max']:.2f}s")
+        return stats
+
+    @staticmethod
+    def summarize(total_chunks, elapsed, latencies):
+        ordered = sorted(latencies)
+
+        def percentile(p):
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            "chunks": total_chunks,
+            "batches": len(latencies),
+            "elapsed_sec": elapsed,
+            "chunks_per_sec": total_chunks / elapsed if elapsed > 0 else 0.0,
+            "batch_latency_p50": percentile(0.50),
+            "batch_latency_p95": percentile(0.95),
+            "batch_latency_max": ordered[-1] if ordered else 0.0
+        }
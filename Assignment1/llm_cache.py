@@ -0,0 +1,152 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from langchain_core.caches import BaseCache
+from langchain_core.globals import get_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration
+from langchain_core.runnables import RunnableGenerator
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "rag_models", "llm_cache.sqlite")
+
+
+class DiskLRUCache(BaseCache):
+    """
+    Persistent LangChain LLM cache with size-bounded LRU and TTL eviction.
+
+    Entries are keyed on a hash of the model settings LangChain passes as
+    llm_string (model name and parameters) and of the rendered prompt, which
+    embeds the retrieved context, so a different model, question or context
+    never reuses an answer. Entries older than ttl_seconds are treated as misses, and
+    once the stored responses exceed max_bytes the least recently used ones
+    are evicted. Several tools can point at the same file to share answers.
+
+    Set bypass=True to skip the cache without uninstalling it.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=256 * 1024 * 1024, ttl_seconds=7 * 24 * 3600, bypass=False):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, llm_string TEXT, value TEXT,"
+            " size INTEGER, created REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def _key(prompt, llm_string):
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        if self.bypass:
+            return None
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return loads(row[0])
+
+    def update(self, prompt, llm_string, return_val):
+        if self.bypass:
+            return
+        value = dumps(list(return_val))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(prompt, llm_string), llm_string, value, len(value), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        evicted = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def clear(self, **kwargs):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self):
+        """Returns hit/miss counters for this process and the current size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+def llm_string(llm):
+    """
+    The model-settings part of a cache key, built from the public llm.dict().
+
+    This is how LangChain builds invoke()'s llm_string for models that are not
+    LangChain-serializable, such as ChatOllama, so the keys match there.
+    Serializable models (ChatOpenAI) are keyed differently by invoke(), and
+    their streamed and non-streamed answers are cached apart.
+    """
+    params = {**llm.dict(), "stop": None}
+    return str(sorted([(k, v) for k, v in params.items()]))
+
+
+def cached_stream(llm, cache=None):
+    """
+    Wraps a chat model for .stream() so streamed answers use the LLM cache too.
+
+    LangChain only consults the cache in invoke(). Through this wrapper a
+    cached answer comes back as a single chunk, and a streamed answer is
+    stored once it is complete. Entries are keyed on the serialized
+    messages and llm_string(llm), so streamed and non-streamed calls share
+    answers. cache defaults to the installed one.
+    """
+    def stream(prompt_values):
+        llm_cache = cache or get_llm_cache()
+        for prompt_value in prompt_values:
+            messages = prompt_value.to_messages()
+            if llm_cache is None:
+                yield from llm.stream(messages)
+                continue
+            prompt, settings = dumps(messages), llm_string(llm)
+            cached = llm_cache.lookup(prompt, settings)
+            if cached:
+                yield AIMessageChunk(content=cached[0].text)
+                continue
+            parts = []
+            for chunk in llm.stream(messages):
+                parts.append(chunk.content)
+                yield chunk
+            if parts:
+                llm_cache.update(prompt, settings, [ChatGeneration(message=AIMessage(content="".join(parts)))])
+
+    return RunnableGenerator(stream)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+CHARS_PER_TOKEN = 4 # Rough average for English text, good enough for budgeting prompts
+
+MAP_TEMPLATE = """
+Summarize the main points of the following part of a document in a short paragraph:
+
+<text>
+{text}
+</text>
+"""
+
+REDUCE_TEMPLATE = """
+The following are summaries of consecutive parts of one document.
+Combine them into a single concise summary of the whole document:
+
+<summaries>
+{text}
+</summaries>
+"""
+
+
+def estimate_tokens(text):
+    """Approximate token count of a piece of text."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """On-disk cache of partial summaries, one JSON file per input."""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["summary"]
+
+    def put(self, key, summary):
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary}, f)
+        os.replace(tmp_path, self._path(key))
+
+
+class MapReduceSummarizer:
+    """
+    Summarizes a whole document instead of only the top-k retrieved chunks.
+
+    Chunks are grouped and every group is summarized in parallel (map), then
+    the partial summaries are combined level by level, each call staying
+    within token_budget, until one summary is left (tree reduce).
+
+    Group boundaries are content-defined: a group ends after a chunk whose
+    hash hits a fixed pattern, or when the budget is reached. An edit therefore
+    only changes the groups around it, and together with the per-group cache
+    re-running after a small edit only recomputes the branches that changed.
+    """
+
+    def __init__(self, llm, model_name, token_budget=3000, max_workers=4,
+                 cache_dir="./summary_cache", average_group_size=4):
+        self.model_name = model_name
+        self.token_budget = token_budget
+        self.max_workers = max_workers
+        self.average_group_size = average_group_size
+        self.cache = SummaryCache(cache_dir) if cache_dir else None
+        self.map_chain = ChatPromptTemplate.from_template(MAP_TEMPLATE) | llm | StrOutputParser()
+        self.reduce_chain = ChatPromptTemplate.from_template(REDUCE_TEMPLATE) | llm | StrOutputParser()
+        self.cache_hits = 0
+        self.llm_calls = 0
+        self._lock = threading.Lock()
+
+    def group(self, texts, template):
+        """Splits texts into consecutive groups that each fit the token budget."""
+        budget = self.token_budget - estimate_tokens(template)
+        groups = []
+        current = []
+        current_tokens = 0
+        for text in texts:
+            tokens = estimate_tokens(text)
+            if current and current_tokens + tokens > budget:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+            # Content-defined boundary, at least two items per group so every level shrinks
+            if len(current) >= 2 and int(_hash(text)[:8], 16) % self.average_group_size == 0:
+                groups.append(current)
+                current, current_tokens = [], 0
+        if current:
+            groups.append(current)
+        return groups
+
+    def _summarize(self, chain, template, text):
+        key = _hash(f"{self.model_name}\n{template}\n{text}")
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._lock:
+                    self.cache_hits += 1
+                return cached
+        with self._lock:
+            self.llm_calls += 1
+        summary = chain.invoke({"text": text})
+        if self.cache:
+            self.cache.put(key, summary)
+        return summary
+
+    def _summarize_groups(self, chain, template, groups):
+        texts = ["\n\n".join(group) for group in groups]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(lambda text: self._summarize(chain, template, text), texts))
+
+    def summarize(self, splits):
+        """Returns one summary covering every chunk in splits."""
+        groups = self.group([doc.page_content for doc in splits], MAP_TEMPLATE)
+        print(f"Map: summarizing {len(splits)} chunks in {len(groups)} groups...")
+        summaries = self._summarize_groups(self.map_chain, MAP_TEMPLATE, groups)
+
+        level = 1
+        while len(summaries) > 1:
+            groups = self.group(summaries, REDUCE_TEMPLATE)
+            if len(groups) == len(summaries):
+                # Every summary fills the budget on its own, pair them up so the tree still shrinks
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            print(f"Reduce level {level}: combining {len(summaries)} summaries into {len(groups)}...")
+            summaries = self._summarize_groups(self.reduce_chain, REDUCE_TEMPLATE, groups)
+            level += 1
+
+        print(f"Map-reduce finished: {self.llm_calls} LLM calls, {self.cache_hits} cached summaries reused.")
+        return summaries[0] if summaries else ""
@@ -0,0 +1,60 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+MIN_PAGES_FOR_PARALLEL = 64 # Below this, process start-up costs more than it saves
+
+
+def _extract_range(file_path, start, end):
+    """Extracts the text of pages [start, end) in a worker process."""
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() for i in range(start, end)]
+
+
+def iter_pages(file_path):
+    """
+    Yields one Document per page, extracting each page only when it is asked
+    for. PyPDFLoader.lazy_load() extracts the whole file before its first
+    page comes out, so it neither bounds memory nor overlaps with consumers.
+    """
+    reader = PdfReader(file_path)
+    for i, page in enumerate(reader.pages):
+        yield Document(page_content=page.extract_text(), metadata={"source": file_path, "page": i})
+
+
+def page_ranges(num_pages, shard_size):
+    """Splits page numbers 0..num_pages into consecutive [start, end) shards."""
+    return [(start, min(start + shard_size, num_pages)) for start in range(0, num_pages, shard_size)]
+
+
+def iter_pages_parallel(file_path, workers=None, shard_size=None, min_pages=MIN_PAGES_FOR_PARALLEL):
+    """
+    Yields one Document per page, extracting page ranges on a process pool.
+
+    Pages come out in document order with the same "source" and "page"
+    metadata PyPDFLoader attaches. Only about two shards per worker are
+    extracted ahead of the consumer, so memory stays bounded. Small files, or
+    workers <= 1, are extracted page by page in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    num_pages = len(PdfReader(file_path).pages)
+    if workers <= 1 or num_pages < min_pages:
+        yield from iter_pages(file_path)
+        return
+
+    # Several shards per worker keeps the pool busy when some pages are slower than others
+    shard_size = shard_size or max(1, num_pages // (workers * 4))
+    ranges = page_ranges(num_pages, shard_size)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        next_range = 0
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < workers * 2:
+                start, end = ranges[next_range]
+                pending.append((start, executor.submit(_extract_range, file_path, start, end)))
+                next_range += 1
+            start, future = pending.popleft()
+            for offset, text in enumerate(future.result()):
+                yield Document(page_content=text, metadata={"source": file_path, "page": start + offset})
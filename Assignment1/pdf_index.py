@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+from embedding_pipeline import chroma_writer, open_chroma
+
+
+def file_sha256(file_path, block_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(text):
+    """Returns the SHA-256 hex digest of a string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# Bumped whenever stored chunks change shape, so older indexes are rebuilt
+# (2: chunks carry "start_index" for context packing)
+CHUNK_FORMAT_VERSION = 2
+
+_manifest_lock = threading.Lock()
+
+
+class PersistentPDFIndex:
+    """
+    A Chroma index that is kept on disk between runs.
+
+    Every PDF gets its own collection, named after its path and the index
+    settings (chunk size, overlap, embedding model and CHUNK_FORMAT_VERSION),
+    so changing any of those settings builds a fresh index instead of mixing
+    incompatible vectors or chunks without the metadata later steps expect.
+    A manifest records the PDF's content hash and the hash of every page:
+    an unchanged PDF is reopened without loading or embedding anything, and an
+    edited PDF only re-embeds the pages whose text changed.
+    Chunks are embedded through the given EmbeddingPipeline.
+    """
+
+    def __init__(self, pipeline, embedding_id, chunk_size, chunk_overlap, persist_directory="./chroma_index"):
+        self.pipeline = pipeline
+        self.persist_directory = persist_directory
+        self.config_key = text_sha256(f"{embedding_id}|{chunk_size}|{chunk_overlap}|v{CHUNK_FORMAT_VERSION}")[:12]
+        self.manifest_path = os.path.join(persist_directory, "manifest.json")
+        os.makedirs(persist_directory, exist_ok=True)
+
+    def collection_name(self, file_path):
+        path_key = text_sha256(os.path.abspath(file_path))[:16]
+        return f"pdf-{path_key}-{self.config_key}"
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_entry(self, name, entry):
+        # Re-read under the lock so concurrent indexing threads don't drop each other's entries
+        with _manifest_lock:
+            manifest = self._load_manifest()
+            manifest[name] = entry
+            # Write to a temp file first so an interrupted run never leaves a corrupt manifest
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path)
+
+    def open(self, file_path, load_pages, split):
+        """
+        Returns a vector store for the PDF, embedding only what is missing.
+        load_pages(file_path) must return an iterable of page Documents and
+        split(pages) an iterable of their chunks; both may be generators.
+        """
+        name = self.collection_name(file_path)
+        pdf_hash = file_sha256(file_path)
+        vectorstore, collection = open_chroma(self.pipeline.embeddings, name, self.persist_directory)
+
+        entry = self._load_manifest().get(name)
+        if entry and entry["pdf_sha256"] == pdf_hash:
+            print(f"Index for {file_path} is up to date, skipping embedding.")
+            return vectorstore
+
+        old_pages = entry["pages"] if entry else {}
+        old_hashes = set(old_pages.values())
+        new_pages = {}
+        changed = set()
+
+        def changed_pages():
+            # Lazy, so a streaming loader hands pages to the embedder while extraction continues
+            for page in load_pages(file_path):
+                page_hash = text_sha256(page.page_content)
+                page.metadata["page_hash"] = page_hash
+                new_pages[str(page.metadata.get("page", len(new_pages)))] = page_hash
+                # Identical pages (e.g. blank ones) share a hash and are embedded once
+                if page_hash not in old_hashes and page_hash not in changed:
+                    changed.add(page_hash)
+                    yield page
+
+        self.pipeline.run(split(changed_pages()), chroma_writer(collection, self.chunk_id_factory()))
+
+        # Drop chunks of pages whose text no longer appears in the PDF
+        removed = old_hashes - set(new_pages.values())
+        if removed:
+            stale = vectorstore.get(where={"page_hash": {"$in": sorted(removed)}}, include=[])
+            if stale["ids"]:
+                vectorstore.delete(ids=stale["ids"])
+
+        # Pages that only moved keep their vectors, just their page number is refreshed
+        old_numbers = {page_hash: page_no for page_no, page_hash in old_pages.items()}
+        moved = {
+            page_hash: int(page_no) for page_no, page_hash in new_pages.items()
+            if page_hash in old_numbers and old_numbers[page_hash] != page_no
+        }
+        if moved:
+            kept = vectorstore.get(where={"page_hash": {"$in": sorted(moved)}}, include=["metadatas"])
+            for metadata in kept["metadatas"]:
+                metadata["page"] = moved[metadata["page_hash"]]
+            collection.update(ids=kept["ids"], metadatas=kept["metadatas"])
+
+        print(f"Re-embedded {len(changed)} of {len(new_pages)} pages "
+              f"({len(removed)} removed, {len(moved)} moved).")
+
+        self._save_entry(name, {
+            "source": os.path.abspath(file_path),
+            "pdf_sha256": pdf_hash,
+            "pages": new_pages
+        })
+        return vectorstore
+
+    @staticmethod
+    def chunk_id_factory():
+        """
+        Returns make_id(chunk) for content-addressed chunk ids: the page hash
+        plus the chunk's position in that page. Chunks must be passed in order.
+        """
+        counters = {}
+
+        def make_id(chunk):
+            page_hash = chunk.metadata["page_hash"]
+            position = counters.get(page_hash, 0)
+            counters[page_hash] = position + 1
+            return f"{page_hash[:32]}-{position}"
+
+        return make_id
@@ -0,0 +1,67 @@
+import queue
+import threading
+from parallel_extract import iter_pages, iter_pages_parallel
+
+_DONE = object()
+
+
+def prefetch(items, max_buffered):
+    """
+    Iterates items on a background thread, keeping at most max_buffered of
+    them waiting for the consumer. The producer blocks when the buffer is full,
+    so memory is bounded by the window and not by the length of the iterable.
+    Exceptions raised by the producer are re-raised in the consumer.
+    """
+    buffer = queue.Queue(maxsize=max(1, max_buffered))
+    stop = threading.Event()
+
+    def put(item):
+        # Poll so the producer exits if the consumer stops iterating early
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(e)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
+def stream_pdf_pages(file_path, window_pages=16, workers=1):
+    """
+    Yields the PDF's pages one at a time while extraction of the following
+    pages continues in the background, at most window_pages ahead.
+    With workers > 1 the pages are extracted on a process pool.
+    """
+    if workers > 1:
+        pages = iter_pages_parallel(file_path, workers)
+    else:
+        pages = iter_pages(file_path)
+    return prefetch(pages, window_pages)
+
+
+def stream_split(pages, text_splitter):
+    """Splits pages one at a time, yielding chunks as soon as each page is split."""
+    for page in pages:
+        yield from text_splitter.split_documents([page])
@@ -0,0 +1,59 @@
+import hashlib
+import math
+import threading
+import time
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import FakeListChatModel
+
+
+class StubEmbeddings(Embeddings):
+    """
+    Deterministic offline stand-in for OllamaEmbeddings.
+
+    Vectors are derived from a hash of the text, so identical text always gets
+    the same vector. An optional sleep per call and per text imitates the cost
+    of a local embedding server, and the peak number of concurrent calls is
+    recorded so callers can check how many requests were in flight.
+    """
+
+    def __init__(self, dimensions=64, latency_per_call=0.0, latency_per_text=0.0):
+        self.dimensions = dimensions
+        self.latency_per_call = latency_per_call
+        self.latency_per_text = latency_per_text
+        self.calls = 0
+        self.max_concurrent_calls = 0
+        self._active_calls = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text):
+        values = []
+        counter = 0
+        while len(values) < self.dimensions:
+            digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+            values.extend(byte / 127.5 - 1.0 for byte in digest)
+            counter += 1
+        values = values[:self.dimensions]
+        norm = math.sqrt(sum(v * v for v in values)) or 1.0
+        return [v / norm for v in values]
+
+    def embed_documents(self, texts):
+        with self._lock:
+            self.calls += 1
+            self._active_calls += 1
+            self.max_concurrent_calls = max(self.max_concurrent_calls, self._active_calls)
+        try:
+            delay = self.latency_per_call + self.latency_per_text * len(texts)
+            if delay:
+                time.sleep(delay)
+            return [self._vector(text) for text in texts]
+        finally:
+            with self._lock:
+                self._active_calls -= 1
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def make_stub_llm(response="This is a stub summary of the document."):
+    """Deterministic offline stand-in for ChatOllama that always gives the same answer."""
+    return FakeListChatModel(responses=[response])
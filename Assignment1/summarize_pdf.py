@@ -1,58 +1,143 @@
 import argparse
 import os
 import sys
+import time
 from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import OllamaEmbeddings
 from langchain_community.chat_models import ChatOllama
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_retrieval_chain
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.globals import set_llm_cache
+from langchain_core.runnables import RunnableLambda
+from pdf_index import PersistentPDFIndex
+from embedding_pipeline import EmbeddingPipeline, chroma_writer, open_chroma
+from map_reduce import MapReduceSummarizer, estimate_tokens
+from pdf_stream import stream_pdf_pages, stream_split
+from parallel_extract import iter_pages_parallel
+from llm_cache import DiskLRUCache, DEFAULT_CACHE_PATH, cached_stream
+from embedding_backends import EMBEDDING_BACKENDS, get_embeddings
+from context_packing import ContextPacker
 
 # Configuration
 MODEL_NAME = "deepseek-r1:1.5b" # Using available model
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+PERSIST_DIRECTORY = "./chroma_index"
+EMBEDDING_BACKEND = "ollama" # One of EMBEDDING_BACKENDS
+EMBEDDING_MODEL = None # None: MODEL_NAME for Ollama, all-MiniLM-L6-v2 for the local backends
+EMBEDDING_ONNX_FILE = None # None: the int8 export for all-MiniLM-L6-v2, onnx/model.onnx otherwise
+EMBED_THREADS = None # CPU threads for the local backends, None lets the runtime decide
+EMBED_BATCH_SIZE = 32 # Chunks per embedding batch (Ollama still gets one request per chunk)
+EMBED_MAX_IN_FLIGHT = 4 # Batches embedded concurrently against the Ollama server
+SUMMARY_TOKEN_BUDGET = 3000 # Max prompt tokens per map-reduce summarization call
+SUMMARY_MAX_WORKERS = 4 # Parallel LLM calls in map-reduce mode
+SUMMARY_CACHE_DIR = "./summary_cache"
+STREAM_WINDOW_PAGES = 16 # Pages extracted ahead of the embedder in streaming mode
+EXTRACT_WORKERS = 1 # Processes extracting PDF text, 1 keeps extraction serial
+MODEL_CONTEXT_WINDOW = 2048 # Ollama's default num_ctx for MODEL_NAME
+ANSWER_TOKENS = 512 # Part of the context window kept free for the generated answer
+RETRIEVAL_K = 4 # Chunks retrieved per query before packing
+SUMMARY_QUERY = "Summarize the main points of this document in a concise paragraph."
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH) # Shared with the Assignment4 query tool
 
-def load_and_split_pdf(file_path):
-    """Loads a PDF and splits it into chunks."""
+def load_pdf_pages(file_path, workers=EXTRACT_WORKERS):
+    """Loads a PDF and returns one Document per page. Raises FileNotFoundError for a missing file."""
     print(f"Loading PDF: {file_path}...")
     if not os.path.exists(file_path):
-        print(f"Error: File not found at {file_path}")
-        sys.exit(1)
-        
+        raise FileNotFoundError(f"File not found at {file_path}")
+
+    if workers > 1:
+        return list(iter_pages_parallel(file_path, workers))
     loader = PyPDFLoader(file_path)
-    docs = loader.load()
-    
-    print(f"Splitting document...")
-    text_splitter = RecursiveCharacterTextSplitter(
+    return loader.load()
+
+def make_text_splitter():
+    return RecursiveCharacterTextSplitter(
         chunk_size=CHUNK_SIZE, 
-        chunk_overlap=CHUNK_OVERLAP
+        chunk_overlap=CHUNK_OVERLAP,
+        add_start_index=True # Lets context packing merge overlapping chunks
     )
-    splits = text_splitter.split_documents(docs)
+
+def split_documents(docs):
+    """Splits page Documents into chunks."""
+    print(f"Splitting document...")
+    splits = make_text_splitter().split_documents(docs)
     print(f"Created {len(splits)} chunks.")
     return splits
 
-def setup_vectorstore(splits):
-    """Sets up the Chroma vector store with Ollama embeddings."""
-    print("Initializing Vector Store (ChromaDB) with Ollama Embeddings...")
-    embeddings = OllamaEmbeddings(model=MODEL_NAME)
+def load_and_split_pdf(file_path, workers=EXTRACT_WORKERS):
+    """Loads a PDF and splits it into chunks."""
+    return split_documents(load_pdf_pages(file_path, workers))
+
+def stream_pdf_chunks(file_path, window_pages=STREAM_WINDOW_PAGES, workers=EXTRACT_WORKERS):
+    """
+    Yields chunks page by page while the rest of the PDF is still being extracted.
+    At most window_pages pages are held in memory ahead of the consumer.
+    """
+    print(f"Streaming PDF: {file_path} (window: {window_pages} pages)...")
+    return stream_split(stream_pdf_pages(file_path, window_pages, workers), make_text_splitter())
+
+def make_pipeline(batch_size=EMBED_BATCH_SIZE, max_in_flight=EMBED_MAX_IN_FLIGHT, verbose=False,
+                  backend=EMBEDDING_BACKEND, embedding_model=EMBEDDING_MODEL, threads=EMBED_THREADS,
+                  onnx_file=EMBEDDING_ONNX_FILE):
+    """Builds the batched embedding stage around the chosen embedding backend."""
+    if backend == "ollama":
+        embedding_model = embedding_model or MODEL_NAME
+    embeddings, embedding_id = get_embeddings(backend, embedding_model, threads, onnx_file)
+    return EmbeddingPipeline(
+        embeddings, batch_size=batch_size, max_in_flight=max_in_flight, verbose=verbose, name=embedding_id
+    )
+
+def setup_vectorstore(splits, pipeline=None):
+    """Sets up the Chroma vector store with the configured embeddings."""
+    pipeline = pipeline or make_pipeline()
+    print(f"Initializing Vector Store (ChromaDB) with {pipeline.name} embeddings...")
     
     # Create a temporary vector store in memory for this run
-    vectorstore = Chroma.from_documents(
-        documents=splits, 
-        embedding=embeddings
-    )
+    vectorstore, collection = open_chroma(pipeline.embeddings)
+    pipeline.run(splits, chroma_writer(collection))
     return vectorstore
 
-def summarize_doc(vectorstore):
-    """Runs the summarization chain."""
-    print(f"Initializing RAG chain with model: {MODEL_NAME}...")
-    llm = ChatOllama(model=MODEL_NAME)
-    
-    # Define the prompt for summarization
-    prompt = ChatPromptTemplate.from_template("""
+def setup_persistent_vectorstore(file_path, persist_directory=PERSIST_DIRECTORY, pipeline=None,
+                                 stream=False, window_pages=STREAM_WINDOW_PAGES, workers=EXTRACT_WORKERS):
+    """
+    Opens the on-disk Chroma index for the PDF, embedding only pages that are
+    new or changed since the last run. With stream=True pages are extracted,
+    split and embedded incrementally instead of loading the whole PDF first.
+    """
+    print(f"Opening persistent Vector Store (ChromaDB) at {persist_directory}...")
+    pipeline = pipeline or make_pipeline()
+    index = PersistentPDFIndex(
+        pipeline=pipeline,
+        embedding_id=pipeline.name,
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        persist_directory=persist_directory
+    )
+    if stream:
+        return index.open(
+            file_path,
+            load_pages=lambda path: stream_pdf_pages(path, window_pages, workers),
+            split=lambda pages: stream_split(pages, make_text_splitter())
+        )
+    return index.open(file_path, load_pages=lambda path: load_pdf_pages(path, workers), split=split_documents)
+
+def setup_llm_cache(bypass=False, path=LLM_CACHE_PATH):
+    """Installs the on-disk LLM response cache for every LangChain model call in this process."""
+    cache = DiskLRUCache(path, bypass=bypass)
+    set_llm_cache(cache)
+    return cache
+
+def print_cache_stats(cache):
+    if cache.bypass:
+        print("LLM cache: bypassed")
+        return
+    stats = cache.stats()
+    print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses "
+          f"({stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB on disk)")
+
+SUMMARY_PROMPT = """
     Answer the following question based only on the provided context:
 
     <context>
@@ -60,30 +145,175 @@ def summarize_doc(vectorstore):
     </context>
 
     Question: {input}
-    """)
+    """
+
+def context_token_budget(question=SUMMARY_QUERY):
+    """Tokens left for retrieved context once the prompt, question and answer are accounted for."""
+    return MODEL_CONTEXT_WINDOW - ANSWER_TOKENS - estimate_tokens(SUMMARY_PROMPT) - estimate_tokens(question)
+
+def stream_answer(tokens, on_token, start):
+    """
+    Passes each generated token to on_token as it arrives and returns the full
+    answer with its time-to-first-token and tokens/sec (measured from start).
+    """
+    parts = []
+    first_token_at = None
+    for token in tokens:
+        if not token:
+            continue
+        if first_token_at is None:
+            first_token_at = time.perf_counter()
+        parts.append(token)
+        on_token(token)
+    finished_at = time.perf_counter()
+    generation_seconds = finished_at - first_token_at if first_token_at else 0.0
+    metrics = {
+        "time_to_first_token": first_token_at - start if first_token_at else None,
+        "tokens": len(parts),
+        "tokens_per_sec": len(parts) / generation_seconds if generation_seconds > 0 else 0.0,
+        "total_seconds": finished_at - start
+    }
+    return "".join(parts), metrics
+
+def print_stream_metrics(metrics):
+    if metrics["time_to_first_token"] is None:
+        print("Streaming: no tokens received.")
+        return
+    print(f"Streaming: first token after {metrics['time_to_first_token']:.2f}s, "
+          f"{metrics['tokens']} tokens at {metrics['tokens_per_sec']:.1f} tokens/sec "
+          f"({metrics['total_seconds']:.2f}s total)")
+
+def summarize_doc(vectorstore, llm=None, context_tokens=None, k=RETRIEVAL_K, on_token=None):
+    """
+    Runs the summarization chain. If on_token is given the answer is streamed:
+    on_token(token) is called for every token as it is generated.
+    """
+    print(f"Initializing RAG chain with model: {MODEL_NAME}...")
+    llm = llm or ChatOllama(model=MODEL_NAME)
+    
+    # Define the prompt for summarization
+    prompt = ChatPromptTemplate.from_template(SUMMARY_PROMPT)
 
-    # Create the chain
-    document_chain = create_stuff_documents_chain(llm, prompt)
-    retriever = vectorstore.as_retriever()
-    retrieval_chain = create_retrieval_chain(retriever, document_chain)
+    # Create the chain: retrieved chunks are de-duplicated and packed to the token budget
+    # before they are stuffed into the prompt
+    # Streamed answers go through cached_stream, since LangChain only caches invoke()
+    document_chain = create_stuff_documents_chain(cached_stream(llm) if on_token else llm, prompt)
+    retriever = vectorstore.as_retriever(search_kwargs={"k": k})
+    packer = ContextPacker(context_tokens or context_token_budget())
+    retrieve_and_pack = (lambda x: x["input"]) | retriever | RunnableLambda(packer.pack)
+    retrieval_chain = create_retrieval_chain(retrieve_and_pack, document_chain)
     
     print("Generating summary...")
-    response = retrieval_chain.invoke({"input": "Summarize the main points of this document in a concise paragraph."})
+    if on_token:
+        start = time.perf_counter()
+        # Only the "answer" key streams token by token, the other keys arrive once
+        tokens = (chunk.get("answer") for chunk in retrieval_chain.stream({"input": SUMMARY_QUERY}))
+        answer, metrics = stream_answer(tokens, on_token, start)
+        print()
+        print_stream_metrics(metrics)
+        return answer
+
+    response = retrieval_chain.invoke({"input": SUMMARY_QUERY})
     
     return response["answer"]
 
+def summarize_doc_map_reduce(splits, token_budget=SUMMARY_TOKEN_BUDGET, max_workers=SUMMARY_MAX_WORKERS,
+                             cache_dir=SUMMARY_CACHE_DIR, llm=None):
+    """Summarizes every chunk of the document with a parallel map-reduce over the LLM."""
+    print(f"Initializing map-reduce summarization with model: {MODEL_NAME}...")
+    llm = llm or ChatOllama(model=MODEL_NAME)
+    summarizer = MapReduceSummarizer(
+        llm,
+        model_name=MODEL_NAME,
+        token_budget=token_budget,
+        max_workers=max_workers,
+        cache_dir=cache_dir
+    )
+    return summarizer.summarize(splits)
+
 def main():
     parser = argparse.ArgumentParser(description="Summarize a PDF using RAG with Ollama and ChromaDB.")
     parser.add_argument("file_path", help="Path to the PDF file to summarize")
+    parser.add_argument("--index-dir", default=PERSIST_DIRECTORY, help="Directory of the persistent Chroma index")
+    parser.add_argument("--no-persist", action="store_true", help="Use a throwaway in-memory index instead")
+    parser.add_argument("--embed-batch-size", type=int, default=EMBED_BATCH_SIZE, help="Chunks per embedding batch")
+    parser.add_argument("--embed-concurrency", type=int, default=EMBED_MAX_IN_FLIGHT, help="Embedding batches in flight at once")
+    parser.add_argument("--verbose", action="store_true", help="Print the latency of every embedding batch")
+    parser.add_argument("--embedding-backend", choices=EMBEDDING_BACKENDS, default=EMBEDDING_BACKEND,
+                        help="ollama: the chat model via Ollama; sentence-transformers / onnx: a local CPU sentence-embedding model")
+    parser.add_argument("--embedding-model", default=EMBEDDING_MODEL, help="Embedding model name for the chosen backend")
+    parser.add_argument("--onnx-file", default=EMBEDDING_ONNX_FILE,
+                        help="ONNX export to load with the onnx backend, relative to the model (default: the int8 export "
+                             "for all-MiniLM-L6-v2, onnx/model.onnx for other models)")
+    parser.add_argument("--embed-threads", type=int, default=EMBED_THREADS, help="CPU threads for the local embedding backends")
+    parser.add_argument("--mode", choices=["retrieval", "map-reduce"], default="retrieval",
+                        help="retrieval: summarize the top-k retrieved chunks; map-reduce: summarize the whole document")
+    parser.add_argument("--token-budget", type=int, default=SUMMARY_TOKEN_BUDGET, help="Max prompt tokens per map-reduce call")
+    parser.add_argument("--summary-workers", type=int, default=SUMMARY_MAX_WORKERS, help="Parallel LLM calls in map-reduce mode")
+    parser.add_argument("--stream", action="store_true", help="Extract, split and embed the PDF page by page")
+    parser.add_argument("--window-pages", type=int, default=STREAM_WINDOW_PAGES, help="Pages buffered ahead of the embedder when streaming")
+    parser.add_argument("--extract-workers", type=int, default=EXTRACT_WORKERS,
+                        help="Processes used to extract PDF text (small PDFs are always extracted serially)")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    parser.add_argument("--k", type=int, default=RETRIEVAL_K, help="Chunks retrieved before context packing")
+    parser.add_argument("--context-tokens", type=int,
+                        help=f"Token budget for the retrieved context (default: fits the {MODEL_CONTEXT_WINDOW}-token context window)")
+    parser.add_argument("--stream-output", action="store_true", help="Print the summary token by token as it is generated")
     args = parser.parse_args()
 
-    splits = load_and_split_pdf(args.file_path)
-    vectorstore = setup_vectorstore(splits)
-    summary = summarize_doc(vectorstore)
+    if not os.path.exists(args.file_path):
+        print(f"Error: File not found at {args.file_path}")
+        sys.exit(1)
+
+    cache = setup_llm_cache(bypass=args.no_cache)
+
+    if args.mode == "map-reduce":
+        # The whole document is summarized, so no vector store is needed
+        splits = load_and_split_pdf(args.file_path, args.extract_workers)
+        summary = summarize_doc_map_reduce(splits, args.token_budget, args.summary_workers)
+        print("\n--- SUMMARY ---\n")
+        print(summary)
+        print("\n---------------")
+        print_cache_stats(cache)
+        return
+
+    pipeline = make_pipeline(
+        args.embed_batch_size, args.embed_concurrency, args.verbose,
+        backend=args.embedding_backend, embedding_model=args.embedding_model, threads=args.embed_threads,
+        onnx_file=args.onnx_file
+    )
+    if args.no_persist:
+        if args.stream:
+            splits = stream_pdf_chunks(args.file_path, args.window_pages, args.extract_workers)
+        else:
+            splits = load_and_split_pdf(args.file_path, args.extract_workers)
+        vectorstore = setup_vectorstore(splits, pipeline)
+    else:
+        vectorstore = setup_persistent_vectorstore(
+            args.file_path, args.index_dir, pipeline,
+            stream=args.stream, window_pages=args.window_pages, workers=args.extract_workers
+        )
+    if args.stream_output:
+        header_printed = False
+
+        def print_token(token):
+            nonlocal header_printed
+            if not header_printed:
+                print("\n--- SUMMARY ---\n")
+                header_printed = True
+            print(token, end="", flush=True)
+
+        summarize_doc(vectorstore, context_tokens=args.context_tokens, k=args.k, on_token=print_token)
+        print("\n---------------")
+        print_cache_stats(cache)
+        return
+
+    summary = summarize_doc(vectorstore, context_tokens=args.context_tokens, k=args.k)
     
     print("\n--- SUMMARY ---\n")
     print(summary)
     print("\n---------------")
+    print_cache_stats(cache)
 
 if __name__ == "__main__":
     main()
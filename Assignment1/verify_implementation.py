@@ -1,8 +1,19 @@
+import argparse
+import json
 import os
 import sys
+import tempfile
 import time
-from create_dummy_pdf import create_dummy_pdf
-from summarize_pdf import load_and_split_pdf, setup_vectorstore, summarize_doc
+import tracemalloc
+from create_dummy_pdf import create_dummy_pdf, create_large_pdf
+from summarize_pdf import load_and_split_pdf, load_pdf_pages, split_documents, setup_vectorstore, summarize_doc
+from embedding_pipeline import EmbeddingPipeline, chroma_writer, open_chroma
+from stub_models import StubEmbeddings, make_stub_llm
+
+BENCHMARK_SIZES = [10, 100, 500] # Pages per synthetic PDF
+BENCHMARK_QUERIES = 20
+REGRESSION_TOLERANCE = 0.25 # Allowed slowdown / memory growth vs. the baseline
+MIN_REGRESSION_SECONDS = 0.05 # Ignore slowdowns smaller than this, they are timer noise
 
 def run_verification():
     print("Starting Verification Process...")
@@ -39,7 +50,31 @@ def run_verification():
         print(f"ERROR: {e}")
         results.append({"step": step_name, "status": "ERROR", "details": str(e)})
 
-    # 3. Test Vector Store Creation
+    # 3. Test the batched embedding pipeline offline with a stub embedder
+    step_name = "Embedding Pipeline (Stub)"
+    if splits:
+        try:
+            print("Testing batched embedding pipeline with stub embeddings...")
+            stub = StubEmbeddings(latency_per_call=0.01)
+            pipeline = EmbeddingPipeline(stub, batch_size=2, max_in_flight=2)
+            written = []
+            # Repeat the chunks so there are always several batches to overlap
+            chunks = splits * 10
+            stats = pipeline.run(chunks, lambda docs, vectors: written.extend(zip(docs, vectors)))
+            in_order = [doc for doc, _ in written] == chunks
+            if in_order and stub.max_concurrent_calls <= 2:
+                print("PASS: All chunks embedded in order with bounded concurrency.")
+                results.append({"step": step_name, "status": "PASS", "details": f"{stats['chunks_per_sec']:.0f} chunks/sec, {stats['batches']} batches"})
+            else:
+                print("FAIL: Embedding pipeline output out of order or over the concurrency limit.")
+                results.append({"step": step_name, "status": "FAIL", "details": f"in_order={in_order}, max_concurrent_calls={stub.max_concurrent_calls}"})
+        except Exception as e:
+            print(f"ERROR: {e}")
+            results.append({"step": step_name, "status": "ERROR", "details": str(e)})
+    else:
+        results.append({"step": step_name, "status": "SKIPPED", "details": "Skipped due to previous failure"})
+
+    # 4. Test Vector Store Creation
     step_name = "Vector Store Creation"
     vectorstore = None
     if splits:
@@ -58,7 +93,7 @@ def run_verification():
     else:
         results.append({"step": step_name, "status": "SKIPPED", "details": "Skipped due to previous failure"})
 
-    # 4. Test Summarization
+    # 5. Test Summarization
     step_name = "Summarization"
     if vectorstore:
         try:
@@ -103,7 +138,115 @@ def run_verification():
     
     return all(r["status"] == "PASS" for r in results)
 
+def measure(stage, items, func):
+    """Runs func() and returns its result and the stage's time, throughput and peak traced memory."""
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    count = items(result) if callable(items) else items
+    print(f"  {stage:<9} {seconds:8.3f}s  {count / seconds if seconds > 0 else 0:10.1f} items/sec  peak {peak / (1024 * 1024):7.1f} MiB")
+    return result, {
+        "seconds": seconds,
+        "items": count,
+        "items_per_sec": count / seconds if seconds > 0 else 0.0,
+        "peak_memory_mb": peak / (1024 * 1024)
+    }
+
+def benchmark_pdf(pdf_path, num_pages):
+    """Times every pipeline stage on one PDF with offline stub embeddings and LLM."""
+    stages = {}
+    embeddings = StubEmbeddings()
+    pipeline = EmbeddingPipeline(embeddings)
+
+    pages, stages["load"] = measure("load", len, lambda: load_pdf_pages(pdf_path))
+    splits, stages["split"] = measure("split", len, lambda: split_documents(pages))
+
+    vectors = []
+    _, stages["embed"] = measure("embed", len(splits), lambda: pipeline.run(splits, lambda docs, batch: vectors.extend(batch)))
+
+    vectorstore, collection = open_chroma(embeddings, f"benchmark-{num_pages}")
+    write = chroma_writer(collection)
+
+    def index():
+        # One write per embedding batch, as in the real pipeline; a single upsert of
+        # every chunk can exceed Chroma's max batch size on large PDFs
+        for start in range(0, len(splits), pipeline.batch_size):
+            write(splits[start:start + pipeline.batch_size], vectors[start:start + pipeline.batch_size])
+
+    _, stages["index"] = measure("index", len(splits), index)
+
+    queries = [splits[i % len(splits)].page_content[:100] for i in range(BENCHMARK_QUERIES)]
+    _, stages["retrieve"] = measure("retrieve", len(queries), lambda: [vectorstore.similarity_search(q, k=4) for q in queries])
+    _, stages["generate"] = measure("generate", 1, lambda: summarize_doc(vectorstore, llm=make_stub_llm()))
+
+    vectorstore.delete_collection()
+    return stages
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Returns a description of every stage that got slower or used more memory than the baseline allows."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if not previous:
+                continue
+            if (current["seconds"] > previous["seconds"] * (1 + tolerance)
+                    and current["seconds"] - previous["seconds"] > MIN_REGRESSION_SECONDS):
+                regressions.append(f"{size} pages / {stage}: {current['seconds']:.3f}s vs baseline {previous['seconds']:.3f}s")
+            if current["peak_memory_mb"] > previous["peak_memory_mb"] * (1 + tolerance) and current["peak_memory_mb"] > 1:
+                regressions.append(f"{size} pages / {stage}: peak {current['peak_memory_mb']:.1f} MiB "
+                                   f"vs baseline {previous['peak_memory_mb']:.1f} MiB")
+    return regressions
+
+def run_benchmark(sizes, output_path, baseline_path, update_baseline=False, tolerance=REGRESSION_TOLERANCE):
+    """Benchmarks every stage on synthetic PDFs and fails if a stage regressed against the stored baseline."""
+    print("Starting Benchmark...")
+    results = {}
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_pages in sizes:
+            pdf_path = os.path.join(tmp_dir, f"benchmark_{num_pages}.pdf")
+            create_large_pdf(pdf_path, num_pages)
+            print(f"Benchmarking {num_pages} pages:")
+            results[str(num_pages)] = benchmark_pdf(pdf_path, num_pages)
+    tracemalloc.stop()
+
+    with open(output_path, "w") as f:
+        json.dump({"date": time.strftime('%Y-%m-%d %H:%M:%S'), "results": results}, f, indent=2)
+    print(f"\nBenchmark results written to {output_path}")
+
+    if update_baseline or not os.path.exists(baseline_path):
+        with open(baseline_path, "w") as f:
+            json.dump({"date": time.strftime('%Y-%m-%d %H:%M:%S'), "results": results}, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return True
+
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)["results"]
+    regressions = compare_to_baseline(results, baseline, tolerance)
+    if regressions:
+        print(f"FAIL: {len(regressions)} regressions against {baseline_path}:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return False
+    print(f"PASS: No regressions against {baseline_path} (tolerance {tolerance:.0%}).")
+    return True
+
 if __name__ == "__main__":
-    success = run_verification()
+    parser = argparse.ArgumentParser(description="Verify the RAG summarizer, or benchmark its pipeline stages.")
+    parser.add_argument("--benchmark", action="store_true", help="Time each stage offline instead of running the verification")
+    parser.add_argument("--sizes", type=int, nargs="+", default=BENCHMARK_SIZES, help="Pages of each synthetic PDF")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the benchmark results")
+    parser.add_argument("--baseline", default="benchmark_baseline.json", help="Baseline to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE, help="Allowed regression, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        success = run_benchmark(args.sizes, args.output, args.baseline, args.update_baseline, args.tolerance)
+    else:
+        success = run_verification()
     if not success:
         sys.exit(1)
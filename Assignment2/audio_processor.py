@@ -1,29 +1,201 @@
 import torch
 import torchaudio
 from torchaudio import transforms
+from vector_db import file_sha256
+from waveform_cache import WaveformCache
+
+# Shared decoded-waveform cache, set up from the command line (None disables it)
+WAVEFORM_CACHE_SETTINGS = None
+
+def make_waveform_cache():
+    return WaveformCache(**WAVEFORM_CACHE_SETTINGS) if WAVEFORM_CACHE_SETTINGS else None
+
+class StreamingResampler:
+    """
+    Resamples a signal that arrives in chunks exactly as if it were resampled whole.
+
+    Resampling each chunk on its own zero-pads both of its edges and leaves a
+    discontinuity at every chunk boundary. This keeps the input the filter
+    needs on either side of a boundary and holds back the output it can't
+    finish until the next chunk (or flush) arrives.
+    """
+    def __init__(self, resampler):
+        self.resampler = resampler
+        # Output comes in periods of new samples, one for every orig input samples
+        self.orig = resampler.orig_freq // resampler.gcd
+        self.new = resampler.new_freq // resampler.gcd
+        # Input the filter reaches around a period, rounded up to whole periods
+        self.context = -(-(resampler.width + self.orig) // self.orig) * self.orig
+        self.buffer = torch.zeros(1, 0)
+        self.buffer_start = 0 # Input position of buffer[0], always a whole number of periods
+        self.next_period = 0 # First period not returned yet
+        self.length = 0 # Input samples fed so far
+
+    def feed(self, chunk):
+        """Takes the next input chunk and returns the output that is final so far."""
+        self.buffer = torch.cat([self.buffer, chunk], dim=1)
+        self.length += chunk.shape[1]
+        return self._resample(max(self.next_period, (self.length - self.context) // self.orig))
+
+    def flush(self):
+        """Returns the rest of the output, treating the end of the input as the end of the signal."""
+        return self._resample(None)
+
+    def _resample(self, end_period):
+        start = max(0, self.next_period * self.orig - self.context)
+        resampled = self.resampler(self.buffer[:, start - self.buffer_start:])
+        first = (self.next_period - start // self.orig) * self.new
+        if end_period is None:
+            # Same length as resampling the whole input at once
+            total = -(-self.new * self.length // self.orig)
+            output = resampled[:, first:first + total - self.next_period * self.new]
+            end_period = -(-self.length // self.orig)
+        else:
+            output = resampled[:, first:first + (end_period - self.next_period) * self.new]
+        self.next_period = end_period
+        drop = max(0, self.next_period * self.orig - self.context) - self.buffer_start
+        if drop > 0:
+            self.buffer = self.buffer[:, drop:]
+            self.buffer_start += drop
+        return output
 
 class AudioProcessor:
-    def __init__(self, target_sample_rate=16000):
+    def __init__(self, target_sample_rate=16000, cache=None):
         self.target_sample_rate = target_sample_rate
+        self.cache = cache if cache is not None else make_waveform_cache()
+        # Building a Resample transform computes its filter kernel, so keep one per source rate
+        self._resamplers = {}
+
+    def get_resampler(self, sample_rate):
+        if sample_rate not in self._resamplers:
+            self._resamplers[sample_rate] = transforms.Resample(orig_freq=sample_rate, new_freq=self.target_sample_rate)
+        return self._resamplers[sample_rate]
 
     def load_and_preprocess(self, file_path):
         """
         Loads an audio file, resamples it to the target sample rate,
-        and ensures it is mono.
+        and ensures it is mono. With a waveform cache, a file whose content
+        was decoded before is read from the cache instead.
         """
+        key = None
+        if self.cache is not None:
+            try:
+                key = WaveformCache.key(file_sha256(file_path), self.target_sample_rate)
+            except OSError as e:
+                print(f"Error loading {file_path}: {e}")
+                return None
+            samples = self.cache.get(key)
+            if samples is not None:
+                return torch.from_numpy(samples).unsqueeze(0)
+
         try:
             waveform, sample_rate = torchaudio.load(file_path)
         except Exception as e:
             print(f"Error loading {file_path}: {e}")
             return None
 
-        # Resample if necessary
-        if sample_rate != self.target_sample_rate:
-            resampler = transforms.Resample(orig_freq=sample_rate, new_freq=self.target_sample_rate)
-            waveform = resampler(waveform)
-
-        # Convert to mono if stereo
+        # Convert to mono if stereo (before resampling, so only one channel is resampled)
         if waveform.shape[0] > 1:
             waveform = torch.mean(waveform, dim=0, keepdim=True)
 
+        # Resample if necessary
+        if sample_rate != self.target_sample_rate:
+            waveform = self.get_resampler(sample_rate)(waveform)
+
+        if key is not None:
+            # Return the stored, rounded samples, so the first load embeds exactly what later hits will
+            waveform = torch.from_numpy(self.cache.put(key, waveform[0].numpy())).unsqueeze(0)
         return waveform
+
+    def iter_windows(self, file_path, window_seconds=5.0, hop_seconds=2.5, chunk_seconds=30.0):
+        """
+        Streams fixed-size overlapping windows of a file without decoding it whole.
+
+        The file is decoded chunk_seconds at a time, mixed down and resampled
+        as one continuous signal, and yields (start_seconds, end_seconds, waveform) for every window of
+        window_seconds, one every hop_seconds. The tail of the file gets a
+        final window ending at the end of the file; a file shorter than one
+        window yields a single shorter window. Memory stays at about one chunk
+        plus one window, whatever the length of the file.
+        """
+        window = int(window_seconds * self.target_sample_rate)
+        hop = int(hop_seconds * self.target_sample_rate)
+        buffer = torch.zeros(1, 0)
+        buffer_start = 0 # Position of buffer[0] in target-rate samples
+        next_start = 0 # Start of the next window to yield
+
+        try:
+            for chunk in self._target_rate_chunks(file_path, chunk_seconds):
+                buffer = torch.cat([buffer, chunk], dim=1)
+
+                while next_start + window <= buffer_start + buffer.shape[1]:
+                    offset = next_start - buffer_start
+                    yield self._window(next_start, buffer[:, offset:offset + window])
+                    next_start += hop
+                # Keep the samples later windows need, and at least one window for the tail
+                drop = max(0, min(next_start - buffer_start, buffer.shape[1] - window))
+                buffer = buffer[:, drop:]
+                buffer_start += drop
+        except Exception as e:
+            print(f"Error loading {file_path}: {e}")
+            return
+
+        end = buffer_start + buffer.shape[1]
+        if next_start == 0:
+            if end > 0:
+                yield self._window(0, buffer)
+        elif next_start - hop + window < end:
+            # The last full window stopped short of the end of the file
+            yield self._window(end - window, buffer[:, -window:])
+
+    def _target_rate_chunks(self, file_path, chunk_seconds):
+        """Yields the mono chunks of a file at the target rate, ending with the resampler's held-back tail."""
+        stream = None
+        for chunk, sample_rate in self.iter_chunks(file_path, chunk_seconds):
+            if chunk.shape[0] > 1:
+                chunk = torch.mean(chunk, dim=0, keepdim=True)
+            if sample_rate == self.target_sample_rate:
+                yield chunk
+                continue
+            if stream is None:
+                stream = StreamingResampler(self.get_resampler(sample_rate))
+            yield stream.feed(chunk)
+        if stream is not None:
+            yield stream.flush()
+
+    @staticmethod
+    def iter_chunks(file_path, chunk_seconds=30.0):
+        """
+        Decodes a file in one sequential pass, yielding (samples, sample_rate)
+        chunks of chunk_seconds with channels first. Uses torchaudio's FFmpeg
+        StreamReader; where it is unavailable (it was removed in torchaudio 2.9),
+        each chunk is read with torchaudio.load instead, which reopens the file
+        and seeks every time. That path takes the sample rate from the first
+        chunk it reads, since torchaudio.info is gone from newer releases too.
+        """
+        try:
+            from torchaudio.io import StreamReader
+            reader = StreamReader(file_path)
+        except (ImportError, OSError, RuntimeError):
+            # No FFmpeg support in this torchaudio build (or a file it can't open)
+            reader = None
+        if reader is not None:
+            sample_rate = int(reader.get_src_stream_info(reader.default_audio_stream).sample_rate)
+            reader.add_basic_audio_stream(frames_per_chunk=int(chunk_seconds * sample_rate))
+            for (chunk,) in reader.stream():
+                yield chunk.T, sample_rate # StreamReader gives (frames, channels)
+            return
+
+        # The rate is unknown until the first read, so that chunk is sized for 48 kHz
+        chunk_frames = int(chunk_seconds * 48000)
+        frame_offset = 0
+        while True:
+            chunk, sample_rate = torchaudio.load(file_path, frame_offset=frame_offset, num_frames=chunk_frames)
+            if chunk.shape[1] == 0:
+                return
+            frame_offset += chunk.shape[1]
+            chunk_frames = int(chunk_seconds * sample_rate)
+            yield chunk, sample_rate
+
+    def _window(self, start, waveform):
+        return start / self.target_sample_rate, (start + waveform.shape[1]) / self.target_sample_rate, waveform
@@ -0,0 +1,137 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from vector_db import AudioVectorDB
+
+DIMENSIONS = 768 # wav2vec2-base hidden size
+CLUSTERS = 256
+WRITE_BATCH = 5000 # Below Chroma's maximum batch size
+
+
+def make_vectors(start, count, seed=0):
+    """
+    Deterministic clustered vectors: vector i is always the same, so any
+    slice can be regenerated without keeping the whole set in memory.
+    """
+    centers = np.random.default_rng(seed).standard_normal((CLUSTERS, DIMENSIONS)).astype(np.float32)
+    rng = np.random.default_rng((seed, start))
+    labels = np.arange(start, start + count) % CLUSTERS
+    return centers[labels] + 0.5 * rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+
+
+def vector_at(index):
+    """Regenerates stored vector index from the write batch that contains it."""
+    offset = index - index % WRITE_BATCH
+    return make_vectors(offset, WRITE_BATCH)[index - offset]
+
+
+def rss_mb():
+    """Resident memory of this process, from /proc where available."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def directory_mb(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def run_one(backend, size, queries, ivf_lists, nprobe):
+    """Builds, reopens and queries one index in a fresh process, returning its measurements."""
+    directory = tempfile.mkdtemp(prefix="audio_bench_")
+    try:
+        db = AudioVectorDB(persist_directory=directory, backend=backend)
+        start = time.perf_counter()
+        for offset in range(0, size, WRITE_BATCH):
+            count = min(WRITE_BATCH, size - offset)
+            db.add_many(make_vectors(offset, count), [{"path": str(i)} for i in range(offset, offset + count)],
+                        [str(i) for i in range(offset, offset + count)], batch_size=WRITE_BATCH)
+        if ivf_lists:
+            db.collection.train_ivf(ivf_lists)
+        build_seconds = time.perf_counter() - start
+        del db
+        gc.collect()
+
+        rss_before = rss_mb()
+        start = time.perf_counter()
+        db = AudioVectorDB(persist_directory=directory, backend=backend, nprobe=nprobe)
+        open_seconds = time.perf_counter() - start
+
+        rng = np.random.default_rng(1)
+        targets = rng.integers(0, size, queries)
+        query_vectors = [vector_at(int(i)) + 0.05 * rng.standard_normal(DIMENSIONS).astype(np.float32)
+                         for i in targets]
+        latencies = []
+        hits = 0
+        for target, vector in zip(targets, query_vectors):
+            start = time.perf_counter()
+            results = db.query_audio(vector.tolist(), n_results=10)
+            latencies.append(time.perf_counter() - start)
+            hits += str(target) in results["ids"][0]
+
+        return {
+            "backend": backend + (f"+ivf{ivf_lists}/{nprobe}" if ivf_lists else ""),
+            "vectors": size,
+            "build_seconds": build_seconds,
+            "open_seconds": open_seconds,
+            "p50_ms": float(np.percentile(latencies, 50) * 1000),
+            "p99_ms": float(np.percentile(latencies, 99) * 1000),
+            "recall_at_10": hits / queries,
+            "rss_mb": rss_mb() - rss_before,
+            "disk_mb": directory_mb(directory)
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Chroma and NumPy vector backends on synthetic vectors.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="Index sizes")
+    parser.add_argument("--backends", nargs="+", choices=["chroma", "numpy", "numpy-ivf"],
+                        default=["chroma", "numpy", "numpy-ivf"], help="Backends to compare")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per index")
+    parser.add_argument("--nprobe", type=int, default=8, help="Lists scanned per query by numpy-ivf")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    results = []
+    # Every run gets its own process so memory measurements don't leak between runs
+    context = multiprocessing.get_context("spawn")
+    for size in args.sizes:
+        for backend in args.backends:
+            ivf_lists = int(4 * np.sqrt(size)) if backend == "numpy-ivf" else None
+            print(f"Benchmarking {backend} with {size} vectors...")
+            with context.Pool(1) as pool:
+                try:
+                    results.append(pool.apply(run_one, ("numpy" if ivf_lists else backend, size, args.queries,
+                                                        ivf_lists, args.nprobe)))
+                except Exception as e:
+                    print(f"Skipping {backend} at {size}: {e}")
+
+    print("\n| Backend | Vectors | Build (s) | Open (s) | p50 (ms) | p99 (ms) | Recall@10 | RSS (MB) | Disk (MB) |")
+    print("| --- | --- | --- | --- | --- | --- | --- | --- | --- |")
+    for res in results:
+        print(f"| {res['backend']} | {res['vectors']} | {res['build_seconds']:.1f} | {res['open_seconds']:.2f} | "
+              f"{res['p50_ms']:.2f} | {res['p99_ms']:.2f} | {res['recall_at_10']:.2f} | "
+              f"{res['rss_mb']:.0f} | {res['disk_mb']:.0f} |")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import argparse
+import glob
+import json
+import os
+import time
+import numpy as np
+import torch
+from audio_processor import AudioProcessor
+from embedding_model import LocalWav2Vec2Model, OptimizedWav2Vec2Model
+from synthetic_corpus import CLIP_KINDS, base_clip
+
+
+def synthetic_clips(count, sample_rate=16000, seed=0):
+    """Seeded tones, chirps and noise bursts of 1-4 seconds, for when no folder is given."""
+    rng = np.random.default_rng(seed)
+    return [torch.from_numpy(base_clip(CLIP_KINDS[i % len(CLIP_KINDS)], rng, sample_rate)).unsqueeze(0)
+            for i in range(count)]
+
+
+def load_folder(folder_path, limit):
+    processor = AudioProcessor()
+    files = sorted(glob.glob(os.path.join(folder_path, "*.wav")) + glob.glob(os.path.join(folder_path, "*.mp3")))
+    clips = [processor.load_and_preprocess(path) for path in files[:limit]]
+    return [clip for clip in clips if clip is not None]
+
+
+def embed_all(model, clips, batch_size):
+    model.get_embeddings(clips[:batch_size], batch_size=batch_size) # Warm-up
+    start = time.perf_counter()
+    embeddings = np.asarray(model.get_embeddings(clips, batch_size=batch_size), dtype=np.float32)
+    seconds = time.perf_counter() - start
+    return embeddings, seconds
+
+
+def neighbours(embeddings, k):
+    """Indices of every clip's k nearest other clips by L2 distance."""
+    squared = np.square(embeddings).sum(axis=1)
+    distances = squared[:, None] - 2 * embeddings @ embeddings.T + squared[None, :]
+    np.fill_diagonal(distances, np.inf)
+    return np.argsort(distances, axis=1)[:, :k]
+
+
+def compare(reference, candidate, k):
+    """How closely candidate embeddings reproduce the reference nearest-neighbour rankings."""
+    reference_nn, candidate_nn = neighbours(reference, k), neighbours(candidate, k)
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(reference_nn, candidate_nn)])
+    normalized = [e / (np.linalg.norm(e, axis=1, keepdims=True) + 1e-12) for e in (reference, candidate)]
+    return {
+        "top1_agreement": float(np.mean(reference_nn[:, 0] == candidate_nn[:, 0])),
+        f"overlap_at_{k}": float(overlap),
+        "mean_cosine_to_fp32": float(np.mean(np.sum(normalized[0] * normalized[1], axis=1)))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare optimized wav2vec2 variants with the fp32 model on CPU.")
+    parser.add_argument("--folder", help="Folder of audio files to use (default: synthetic clips)")
+    parser.add_argument("--clips", type=int, default=120, help="Number of clips")
+    parser.add_argument("--threads", type=int, help="PyTorch intra-op threads")
+    parser.add_argument("--batch-size", type=int, default=8, help="Clips per forward pass")
+    parser.add_argument("--layers", type=int, nargs="*", default=[6], help="Truncated layer counts to try")
+    parser.add_argument("--k", type=int, default=10, help="Neighbours compared per clip")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    clips = load_folder(args.folder, args.clips) if args.folder else synthetic_clips(args.clips)
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    audio_seconds = sum(clip.shape[1] for clip in clips) / 16000
+    print(f"Embedding {len(clips)} clips ({audio_seconds:.0f}s of audio) with {torch.get_num_threads()} threads")
+    variants = [("fp32", lambda: LocalWav2Vec2Model()),
+                ("int8", lambda: OptimizedWav2Vec2Model(quantize=True, threads=args.threads))]
+    for layers in args.layers:
+        variants.append((f"fp32 L{layers}", lambda layers=layers: OptimizedWav2Vec2Model(quantize=False, num_layers=layers, threads=args.threads)))
+        variants.append((f"int8 L{layers}", lambda layers=layers: OptimizedWav2Vec2Model(quantize=True, num_layers=layers, threads=args.threads)))
+
+    rows = []
+    reference = None
+    reference_seconds = None
+    for name, make_model in variants:
+        embeddings, seconds = embed_all(make_model(), clips, args.batch_size)
+        if reference is None:
+            reference, reference_seconds = embeddings, seconds
+        row = {"variant": name, "clips_per_sec": len(clips) / seconds, "speedup": reference_seconds / seconds}
+        row.update(compare(reference, embeddings, args.k))
+        rows.append(row)
+
+    print(f"\n| Variant | Clips/sec | Speedup | Top-1 agreement | Overlap@{args.k} | Cosine to fp32 |")
+    print("| --- | --- | --- | --- | --- | --- |")
+    for row in rows:
+        print(f"| {row['variant']} | {row['clips_per_sec']:.1f} | {row['speedup']:.2f}x | "
+              f"{row['top1_agreement']:.2f} | {row[f'overlap_at_{args.k}']:.2f} | {row['mean_cosine_to_fp32']:.3f} |")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"clips": len(clips), "audio_seconds": audio_seconds, "threads": torch.get_num_threads(),
+                       "batch_size": args.batch_size, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+import numpy as np
+import main as search_app
+from audio_processor import AudioProcessor
+from synthetic_corpus import load_corpus
+from vector_db import VECTOR_BACKENDS
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def recall_at_k(matches, label, labels, relevant_count, k):
+    """Share of a query's relevant clips found in its top k, out of the most that fit in k."""
+    found = sum(labels.get(match["path"]) == label for match in matches[:k])
+    return found / min(k, relevant_count)
+
+
+def run_model(model_type, records, db_directory, backend, batch_size, workers, k, max_queries):
+    """Indexes the corpus with add_folder and times one search per query clip."""
+    indexed = [record for record in records if not record["query"]]
+    queries = [record for record in records if record["query"]][:max_queries]
+    labels = {record["path"]: record["label"] for record in indexed}
+    group_sizes = {}
+    for record in indexed:
+        group_sizes[record["label"]] = group_sizes.get(record["label"], 0) + 1
+
+    search_app.DB_DIRECTORY = db_directory
+    index_folder = os.path.dirname(indexed[0]["path"])
+    start = time.perf_counter()
+    search_app.add_folder(index_folder, model_type, batch_size=batch_size, workers=workers, backend=backend)
+    index_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model = search_app.get_model(model_type)
+    load_seconds = time.perf_counter() - start
+    db = search_app.open_db(backend, model_type=model_type)
+    processor = AudioProcessor()
+    search_app.find_similar(db, model, processor, queries[0]["path"], k) # Warm-up
+
+    print(f"Running {len(queries)} queries...")
+    latencies, recalls, hits = [], {}, []
+    for query in queries:
+        start = time.perf_counter()
+        matches = search_app.find_similar(db, model, processor, query["path"], k) or []
+        latencies.append(time.perf_counter() - start)
+        recall = recall_at_k(matches, query["label"], labels, group_sizes[query["label"]], k)
+        recalls.setdefault(query["kind"], []).append(recall)
+        hits.append(bool(matches) and labels.get(matches[0]["path"]) == query["label"])
+
+    latencies = np.array(latencies) * 1000
+    return {
+        "model": model_type,
+        "model_id": getattr(model, "model_id", model_type),
+        "backend": backend,
+        "indexed_files": len(indexed),
+        "queries": len(queries),
+        "index_seconds": index_seconds,
+        "index_files_per_sec": len(indexed) / index_seconds,
+        "model_load_seconds": load_seconds,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        f"recall_at_{k}": float(np.mean([r for kind in recalls.values() for r in kind])),
+        f"recall_at_{k}_by_kind": {kind: float(np.mean(values)) for kind, values in recalls.items()},
+        "top1_accuracy": float(np.mean(hits))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark indexing throughput, search latency and recall on a labelled synthetic corpus.")
+    parser.add_argument("--models", nargs="+", choices=search_app.MODEL_TYPES, default=["local", "remote"],
+                        help="Models to benchmark")
+    parser.add_argument("--bases", type=int, default=500, help="Labelled base clips")
+    parser.add_argument("--variants", type=int, default=4, help="Indexed shifted/gain-altered variants per base clip")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus random seed")
+    parser.add_argument("--corpus-dir", help="Where to keep the corpus between runs (default: a temporary folder)")
+    parser.add_argument("--backend", choices=VECTOR_BACKENDS, default="chroma", help="Vector store backend")
+    parser.add_argument("--batch-size", type=int, default=8, help="Files embedded per forward pass")
+    parser.add_argument("--workers", type=int, help="Decoding worker processes")
+    parser.add_argument("--k", type=int, default=5, help="Results per query for recall@k")
+    parser.add_argument("--queries", type=int, help="Limit the number of queries (default: one per base clip)")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        corpus_dir = args.corpus_dir or os.path.join(scratch, "corpus")
+        print(f"Preparing {args.bases} labelled clips with {args.variants} variants each in {corpus_dir}...")
+        records = load_corpus(corpus_dir, args.bases, args.variants, args.seed)
+        results = []
+        for model_type in args.models:
+            print(f"\nBenchmarking the {model_type} model...")
+            # A fresh index per model, so every run embeds the whole corpus
+            results.append(run_model(model_type, records, os.path.join(scratch, f"db_{model_type}"), args.backend,
+                                     args.batch_size, args.workers, args.k, args.queries))
+
+    print(f"\n| Model | Files | Index (files/s) | Model load (s) | p50 (ms) | p99 (ms) | Recall@{args.k} | Top-1 |")
+    print("| --- | --- | --- | --- | --- | --- | --- | --- |")
+    for res in results:
+        print(f"| {res['model']} | {res['indexed_files']} | {res['index_files_per_sec']:.1f} | "
+              f"{res['model_load_seconds']:.1f} | {res['p50_ms']:.1f} | {res['p99_ms']:.1f} | "
+              f"{res[f'recall_at_{args.k}']:.3f} | {res['top1_accuracy']:.3f} |")
+    if args.output:
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "config": {"bases": args.bases, "variants": args.variants, "seed": args.seed, "backend": args.backend,
+                       "batch_size": args.batch_size, "workers": args.workers, "k": args.k},
+            "results": results
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote the results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import os
+import tempfile
+import numpy as np
+
+DUPLICATE_THRESHOLD = 0.95 # Cosine similarity from which two clips count as near-duplicates
+NEIGHBOURS = 10
+BLOCK_ROWS = 4096 # Rows per block of the similarity join
+
+
+def export_normalized(db, directory):
+    """
+    Copies every stored embedding, scaled to unit length, into a float32
+    memory-mapped matrix under directory, one page at a time.
+    Returns (matrix, ids, metadatas).
+    """
+    count = db.collection.count()
+    ids, metadatas = [], []
+    matrix = None
+    for page_ids, page_metadatas, page_embeddings in db.iter_embeddings():
+        page = np.asarray(page_embeddings, dtype=np.float32)
+        if matrix is None:
+            matrix = np.memmap(os.path.join(directory, "embeddings.f32"), dtype=np.float32, mode="w+",
+                               shape=(count, page.shape[1]))
+        start = len(ids)
+        matrix[start:start + len(page)] = page / (np.linalg.norm(page, axis=1, keepdims=True) + 1e-12)
+        ids.extend(page_ids)
+        metadatas.extend(page_metadatas)
+    return matrix, ids, metadatas
+
+
+def _merge_top(top_sims, top_rows, sims, rows, k):
+    """Keeps the k highest similarities per row out of the current top-k and a new block."""
+    merged_sims = np.concatenate([top_sims, sims], axis=1)
+    merged_rows = np.concatenate([top_rows, np.broadcast_to(rows, sims.shape)], axis=1)
+    keep = np.argpartition(-merged_sims, k - 1, axis=1)[:, :k]
+    return np.take_along_axis(merged_sims, keep, axis=1), np.take_along_axis(merged_rows, keep, axis=1)
+
+
+def all_pairs_top_k(matrix, k=NEIGHBOURS, block_rows=BLOCK_ROWS):
+    """
+    Every row's k most similar other rows by cosine similarity (rows must be
+    unit length). Blocks of block_rows rows are multiplied against the blocks
+    at or after them, and each product updates the top-k of both sides, so
+    every pair is computed once. Memory stays at two blocks, one block_rows
+    x block_rows product and the N x k result.
+    """
+    count = len(matrix)
+    k = min(k, max(count - 1, 1))
+    top_sims = np.full((count, k), -np.inf, dtype=np.float32)
+    top_rows = np.full((count, k), -1)
+    for i in range(0, count, block_rows):
+        a = np.asarray(matrix[i:i + block_rows])
+        a_rows = np.arange(i, i + len(a))
+        for j in range(i, count, block_rows):
+            b = a if j == i else np.asarray(matrix[j:j + block_rows])
+            b_rows = np.arange(j, j + len(b))
+            sims = a @ b.T
+            if j == i:
+                np.fill_diagonal(sims, -np.inf)
+            top_sims[a_rows], top_rows[a_rows] = _merge_top(top_sims[a_rows], top_rows[a_rows], sims, b_rows, k)
+            if j != i:
+                top_sims[b_rows], top_rows[b_rows] = _merge_top(top_sims[b_rows], top_rows[b_rows], sims.T, a_rows, k)
+    return top_sims, top_rows
+
+
+def duplicate_clusters(top_sims, top_rows, threshold=DUPLICATE_THRESHOLD):
+    """Groups rows linked by a similarity of at least threshold (union-find), largest groups first."""
+    parent = list(range(len(top_rows)))
+
+    def find(row):
+        while parent[row] != row:
+            parent[row] = parent[parent[row]]
+            row = parent[row]
+        return row
+
+    for row, other in zip(*np.nonzero(top_sims >= threshold)):
+        a, b = find(row), find(int(top_rows[row, other]))
+        if a != b:
+            parent[a] = b
+
+    groups = {}
+    for row in range(len(parent)):
+        groups.setdefault(find(row), []).append(row)
+    return sorted((group for group in groups.values() if len(group) > 1), key=len, reverse=True)
+
+
+def find_library_duplicates(db, threshold=DUPLICATE_THRESHOLD, k=NEIGHBOURS, block_rows=BLOCK_ROWS):
+    """
+    Finds clusters of near-duplicate clips across the whole collection.
+    Returns a list of clusters, each a list of {path, filename, similarity}
+    dicts where similarity is the member's best match inside the cluster.
+    """
+    if db.collection.count() < 2:
+        return []
+    with tempfile.TemporaryDirectory(prefix="audio_dedupe_") as directory:
+        matrix, ids, metadatas = export_normalized(db, directory)
+        top_sims, top_rows = all_pairs_top_k(matrix, k, block_rows)
+        del matrix
+    clusters = []
+    for group in duplicate_clusters(top_sims, top_rows, threshold):
+        members = set(group)
+        clusters.append([
+            {
+                "path": metadatas[row]["path"],
+                "filename": metadatas[row]["filename"],
+                "similarity": float(max((sim for sim, other in zip(top_sims[row], top_rows[row]) if other in members),
+                                        default=threshold))
+            }
+            for row in group
+        ])
+    return clusters
+
+
+def find_duplicates_of(db, model, files, threshold=DUPLICATE_THRESHOLD, k=NEIGHBOURS):
+    """
+    Checks several files against the library at once: all files are embedded
+    in one batched forward pass and looked up with one multi-query call.
+    Returns {file: [matches with cosine similarity >= threshold]}.
+    """
+    from audio_processor import AudioProcessor
+    processor = AudioProcessor()
+    loaded = [(path, processor.load_and_preprocess(path)) for path in files]
+    loaded = [(path, waveform) for path, waveform in loaded if waveform is not None]
+    if not loaded:
+        return {}
+    embeddings = np.asarray(model.get_embeddings([waveform for _, waveform in loaded]), dtype=np.float32)
+    results = db.query_many(embeddings, n_results=k)
+    found = db.get_embeddings({id_ for ids in results["ids"] for id_ in ids})
+
+    duplicates = {}
+    for (path, _), query, ids, metadatas in zip(loaded, embeddings, results["ids"], results["metadatas"]):
+        query = query / (np.linalg.norm(query) + 1e-12)
+        matches = []
+        for id_, metadata in zip(ids, metadatas):
+            stored = np.asarray(found[id_], dtype=np.float32)
+            similarity = float(query @ stored / (np.linalg.norm(stored) + 1e-12))
+            if similarity >= threshold and os.path.abspath(metadata["path"]) != os.path.abspath(path):
+                matches.append({"path": metadata["path"], "filename": metadata["filename"], "similarity": similarity})
+        duplicates[path] = matches
+    return duplicates
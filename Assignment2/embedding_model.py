@@ -3,11 +3,21 @@ import torch
 from transformers import Wav2Vec2Model, Wav2Vec2Processor
 import numpy as np
 
+# Most padding, as a share of the longest clip, allowed in a batch for group-norm models
+GROUP_NORM_MAX_PADDING = 0.02
+
 class EmbeddingModel(ABC):
     @abstractmethod
     def get_embedding(self, waveform):
         pass
 
+    def get_embeddings(self, waveforms, batch_size=8):
+        """
+        Embeds a list of (1, T) waveforms. Models that can run several clips
+        in one forward pass override this, the default embeds them one by one.
+        """
+        return [self.get_embedding(waveform) for waveform in waveforms]
+
 class LocalWav2Vec2Model(EmbeddingModel):
     def __init__(self, model_name="facebook/wav2vec2-base-960h"):
         print(f"Loading local model: {model_name}...")
@@ -30,6 +40,129 @@ class LocalWav2Vec2Model(EmbeddingModel):
         
         return embedding.squeeze().numpy().tolist()
 
+    def get_embeddings(self, waveforms, batch_size=8):
+        """
+        Embeds many waveforms with one forward pass per batch.
+
+        Clips are sorted by length before batching so each batch holds clips of
+        similar length, which keeps padding small. Mean pooling only averages
+        the frames that belong to each clip. Layer-norm models take an
+        attention mask, so the result matches get_embedding() on the same clip.
+        Group-norm models (like wav2vec2-base) can't mask padding: the zeros
+        enter the feature encoder's normalization statistics. For them a batch
+        only holds clips within GROUP_NORM_MAX_PADDING of its longest clip,
+        and clips of equal length (e.g. fixed-size windows) match exactly.
+        """
+        arrays = [waveform.reshape(-1).numpy() for waveform in waveforms]
+        order = sorted(range(len(arrays)), key=lambda i: len(arrays[i]))
+        embeddings = [None] * len(arrays)
+
+        for indices in self._batches(order, [len(array) for array in arrays], batch_size):
+            inputs = self.processor(
+                [arrays[i] for i in indices],
+                return_tensors="pt",
+                sampling_rate=16000,
+                padding=True,
+                return_attention_mask=True
+            )
+            attention_mask = inputs.attention_mask
+
+            with torch.no_grad():
+                if self.model.config.feat_extract_norm == "layer":
+                    outputs = self.model(inputs.input_values, attention_mask=attention_mask)
+                else:
+                    # Models with group-norm feature extractors (like wav2vec2-base) were trained
+                    # without attention masks and expect plain zero padding instead
+                    outputs = self.model(inputs.input_values)
+
+            # Average only the output frames that come from each clip's own samples
+            hidden_states = outputs.last_hidden_state
+            frame_lengths = self.frame_lengths(attention_mask.sum(dim=1))
+            frame_mask = torch.arange(hidden_states.shape[1]) < frame_lengths.unsqueeze(1)
+            frame_mask = frame_mask.unsqueeze(-1).to(hidden_states.dtype)
+            pooled = (hidden_states * frame_mask).sum(dim=1) / frame_mask.sum(dim=1).clamp(min=1)
+
+            for i, embedding in zip(indices, pooled):
+                embeddings[i] = embedding.numpy().tolist()
+
+        return embeddings
+
+    def _batches(self, order, lengths, batch_size):
+        """Splits clip indices, shortest first, into batches; group-norm batches also cap the padding."""
+        group_norm = self.model.config.feat_extract_norm != "layer"
+        batch = []
+        for i in order:
+            # Sorted by length, so the clip being added is the longest and batch[0] the shortest
+            if batch and (len(batch) >= batch_size or
+                          group_norm and lengths[i] - lengths[batch[0]] > GROUP_NORM_MAX_PADDING * lengths[i]):
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def frame_lengths(self, sample_lengths):
+        """Output frames of the convolutional feature encoder for inputs of sample_lengths samples."""
+        lengths = torch.as_tensor(sample_lengths)
+        for kernel, stride in zip(self.model.config.conv_kernel, self.model.config.conv_stride):
+            lengths = torch.div(lengths - kernel, stride, rounding_mode="floor") + 1
+        return lengths
+
+def optimized_model_id(quantize=True, num_layers=None):
+    """Names an optimized variant, e.g. "optimized-int8-L6"."""
+    return f"optimized{'-int8' if quantize else ''}{f'-L{num_layers}' if num_layers else ''}"
+
+def quantize_linear_int8(model):
+    """
+    Dynamically quantizes a model's Linear layers to int8 weights and
+    activations. Uses torch.ao.quantization while PyTorch still ships it
+    (deprecated, and faster on CPU), otherwise torchao if it is installed.
+    Returns the quantized model, or None when neither is available.
+    """
+    try:
+        from torch.ao.quantization import quantize_dynamic
+    except ImportError:
+        quantize_dynamic = None
+    if quantize_dynamic is not None:
+        return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    try:
+        from torchao.quantization import Int8DynamicActivationInt8WeightConfig, quantize_
+    except ImportError:
+        return None
+    quantize_(model, Int8DynamicActivationInt8WeightConfig())
+    return model
+
+class OptimizedWav2Vec2Model(LocalWav2Vec2Model):
+    """
+    A faster CPU variant of LocalWav2Vec2Model.
+
+    With quantize=True the Linear layers (attention projections and
+    feed-forward blocks, most of the compute) are dynamically quantized to
+    int8 (see quantize_linear_int8); without a quantization backend the
+    model stays fp32, with a message, and is indexed as the fp32 variant.
+    With num_layers set, only the first num_layers transformer layers
+    are kept, and the embedding is pooled from the last kept layer. threads
+    sets PyTorch's intra-op threads. model_id names the variant; each variant
+    is indexed in its own collection (see vector_db.model_collection_name).
+    """
+
+    def __init__(self, model_name="facebook/wav2vec2-base-960h", quantize=True, num_layers=None, threads=None):
+        if threads:
+            torch.set_num_threads(threads)
+        super().__init__(model_name)
+        if num_layers:
+            self.model.encoder.layers = self.model.encoder.layers[:num_layers]
+            self.model.config.num_hidden_layers = num_layers
+        if quantize:
+            quantized = quantize_linear_int8(self.model)
+            if quantized is None:
+                print("This PyTorch has no torch.ao.quantization and torchao is not installed "
+                      "(pip install torchao), so the model runs unquantized in fp32.")
+                quantize = False
+            else:
+                self.model = quantized
+        self.model_id = optimized_model_id(quantize, num_layers)
+
 class RemoteMockModel(EmbeddingModel):
     def __init__(self):
         print("Initialized Remote Mock Model")
@@ -0,0 +1,29 @@
+import torch
+from torchaudio import transforms
+
+N_MELS = 64
+FINGERPRINT_DIMENSIONS = 2 * N_MELS
+
+
+class Fingerprinter:
+    """
+    Cheap spectral fingerprints for the first stage of two-stage search.
+
+    A fingerprint is the per-band mean and standard deviation of the log-mel
+    spectrogram of a clip (2 * N_MELS values). The overall level is removed
+    from the means, so a quieter or louder copy of a clip gets the same
+    fingerprint, and the vector is scaled to unit length. Computing one costs
+    an STFT, far less than a wav2vec2 forward pass.
+    """
+
+    def __init__(self, sample_rate=16000, n_mels=N_MELS):
+        self.mel = transforms.MelSpectrogram(sample_rate=sample_rate, n_fft=1024, hop_length=512, n_mels=n_mels)
+
+    def compute(self, waveform):
+        """Returns the fingerprint of a (1, T) waveform as a list of floats."""
+        with torch.no_grad():
+            log_mel = torch.log(self.mel(waveform.reshape(1, -1))[0] + 1e-6)
+        means = log_mel.mean(dim=1)
+        stds = log_mel.std(dim=1) if log_mel.shape[1] > 1 else torch.zeros_like(means)
+        fingerprint = torch.cat([means - means.mean(), stds])
+        return (fingerprint / fingerprint.norm().clamp(min=1e-12)).tolist()
@@ -0,0 +1,162 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import torch
+import audio_processor
+from audio_processor import AudioProcessor
+from fingerprint import Fingerprinter
+
+_DONE = object()
+_worker_processor = None
+_worker_fingerprinter = None
+_worker_keeps_waveform = True
+
+
+def _init_worker(target_sample_rate, keep_waveform, cache_settings):
+    global _worker_processor, _worker_fingerprinter, _worker_keeps_waveform
+    # One thread per worker: parallelism comes from the processes, not from intra-op threads
+    torch.set_num_threads(1)
+    # Passed explicitly because spawned workers don't inherit the parent's module state
+    audio_processor.WAVEFORM_CACHE_SETTINGS = cache_settings
+    _worker_processor = AudioProcessor(target_sample_rate)
+    _worker_fingerprinter = Fingerprinter(target_sample_rate)
+    _worker_keeps_waveform = keep_waveform
+
+
+def _decode(file_path):
+    """Decodes, mixes down, resamples and fingerprints one file in a worker process."""
+    start = time.perf_counter()
+    waveform = _worker_processor.load_and_preprocess(file_path)
+    fingerprint = None
+    if waveform is not None:
+        fingerprint = _worker_fingerprinter.compute(waveform)
+        if not _worker_keeps_waveform:
+            # Fingerprint-only indexing: don't ship the audio back to the main process
+            waveform = torch.zeros(1, 0)
+    return file_path, waveform, fingerprint, time.perf_counter() - start
+
+
+class IngestPipeline:
+    """
+    Overlaps audio decoding with embedding.
+
+    A process pool decodes, mixes down and resamples files (each worker keeps
+    its own AudioProcessor, so resamplers are cached per source rate) and feeds
+    a bounded queue. The caller's thread takes decoded clips off the queue and
+    embeds them in batches, so the model works while the next files decode.
+    At most queue_size files are decoding or waiting to be embedded at once.
+    Workers also compute each file's spectral fingerprint. With model=None
+    only fingerprints are produced and nothing is embedded.
+    """
+
+    def __init__(self, model, workers=None, batch_size=8, queue_size=32, target_sample_rate=16000):
+        self.model = model
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.batch_size = batch_size
+        self.queue_size = max(queue_size, batch_size)
+        self.target_sample_rate = target_sample_rate
+
+    def _produce(self, files, decoded, slots, stop):
+        try:
+            with ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker,
+                initargs=(self.target_sample_rate, self.model is not None, audio_processor.WAVEFORM_CACHE_SETTINGS)
+            ) as executor:
+                for file_path in files:
+                    # Wait for a free slot, but give up once the consumer has stopped
+                    while not slots.acquire(timeout=0.1) and not stop.is_set():
+                        pass
+                    if stop.is_set():
+                        executor.shutdown(cancel_futures=True)
+                        break
+                    future = executor.submit(_decode, file_path)
+                    future.add_done_callback(decoded.put)
+        except Exception as e:
+            # E.g. BrokenProcessPool from submit(); the consumer re-raises it
+            decoded.put(e)
+        finally:
+            decoded.put(_DONE)
+
+    def run(self, files, on_embedding):
+        """
+        Decodes and embeds every file, calling on_embedding(file_path, embedding,
+        fingerprint) for each one. Returns per-stage throughput statistics.
+        Raises BrokenProcessPool if a decoding worker dies, rather than
+        dropping the files that were still queued.
+        """
+        decoded = queue.Queue()
+        slots = threading.BoundedSemaphore(self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(files, decoded, slots, stop), daemon=True)
+
+        start = time.perf_counter()
+        decode_seconds = embed_seconds = 0.0
+        decoded_files = embedded_files = failed_files = 0
+        last_decoded_at = start
+        batch = []
+
+        def flush():
+            nonlocal embed_seconds, embedded_files
+            embed_start = time.perf_counter()
+            if self.model is None:
+                embeddings = [None] * len(batch)
+            else:
+                embeddings = self.model.get_embeddings([waveform for _, waveform, _ in batch], batch_size=self.batch_size)
+            embed_seconds += time.perf_counter() - embed_start
+            for (file_path, _, fingerprint), embedding in zip(batch, embeddings):
+                on_embedding(file_path, embedding, fingerprint)
+            embedded_files += len(batch)
+            batch.clear()
+
+        producer.start()
+        try:
+            while True:
+                future = decoded.get()
+                if future is _DONE:
+                    break
+                if isinstance(future, Exception):
+                    raise future
+                slots.release()
+                try:
+                    file_path, waveform, fingerprint, seconds = future.result()
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    print(f"Error decoding file: {e}")
+                    failed_files += 1
+                    continue
+                last_decoded_at = time.perf_counter()
+                decode_seconds += seconds
+                if waveform is None:
+                    failed_files += 1
+                    continue
+                decoded_files += 1
+                batch.append((file_path, waveform, fingerprint))
+                if len(batch) >= self.batch_size:
+                    flush()
+            if batch:
+                flush()
+        finally:
+            # Lets the producer stop submitting if embedding or a callback failed
+            stop.set()
+            producer.join()
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            "files": embedded_files,
+            "failed": failed_files,
+            "elapsed_sec": elapsed,
+            "decode_files_per_sec": decoded_files / (last_decoded_at - start) if last_decoded_at > start else 0.0,
+            "decode_files_per_sec_per_worker": decoded_files / decode_seconds if decode_seconds > 0 else 0.0,
+            "embed_files_per_sec": embedded_files / embed_seconds if embed_seconds > 0 else 0.0,
+            "files_per_sec": embedded_files / elapsed if elapsed > 0 else 0.0
+        }
+        print(f"\nIngested {stats['files']} files ({stats['failed']} failed) in {elapsed:.1f}s: "
+              f"{stats['files_per_sec']:.1f} files/sec overall")
+        print(f"  Decode: {stats['decode_files_per_sec']:.1f} files/sec with {self.workers} workers "
+              f"({stats['decode_files_per_sec_per_worker']:.1f} per worker)")
+        print(f"  Embed:  {stats['embed_files_per_sec']:.1f} files/sec")
+        return stats
@@ -1,81 +1,312 @@
 import argparse
 import os
 import glob
-from audio_processor import AudioProcessor
-from embedding_model import LocalWav2Vec2Model, RemoteMockModel
-from vector_db import AudioVectorDB
+import json
+import urllib.error
+# torch, torchaudio and transformers are imported by the commands that use them,
+# so `search --server` starts without paying for them
+from waveform_cache import DEFAULT_CACHE_DIRECTORY
+from vector_db import AudioVectorDB, ADD_BATCH_SIZE, VECTOR_BACKENDS, audio_id, model_collection_name
+from two_stage_search import SHORTLIST, search_two_stage
+from search_server import SERVER_HOST, SERVER_PORT, MAX_BATCH, MAX_WAIT_MS, serve
+from search_client import remote_search
+from dedupe import DUPLICATE_THRESHOLD, NEIGHBOURS, BLOCK_ROWS, find_library_duplicates, find_duplicates_of
+from segment_search import (
+    WINDOW_SECONDS, HOP_SECONDS, segment_collection_name, index_segments, search_segments, format_time
+)
+
+MODEL_TYPES = ['local', 'optimized', 'remote']
+# Set from the command line: intra-op threads and the optimized model's options
+MODEL_OPTIONS = {"threads": None, "quantize": True, "num_layers": None}
+# Where indexes are kept; benchmarks point it at a scratch directory
+DB_DIRECTORY = "./chroma_db"
 
 def get_model(model_type):
+    import torch
+    from embedding_model import LocalWav2Vec2Model, OptimizedWav2Vec2Model, RemoteMockModel
     if model_type == 'local':
+        if MODEL_OPTIONS["threads"]:
+            torch.set_num_threads(MODEL_OPTIONS["threads"])
         return LocalWav2Vec2Model()
+    elif model_type == 'optimized':
+        return OptimizedWav2Vec2Model(**MODEL_OPTIONS)
     elif model_type == 'remote':
         return RemoteMockModel()
     else:
-        raise ValueError("Invalid model type. Choose 'local' or 'remote'.")
+        raise ValueError(f"Invalid model type. Choose one of {MODEL_TYPES}.")
+
+def model_index_id(model_type):
+    """Names the embeddings a model type produces; every optimized variant is distinct."""
+    if model_type == 'optimized':
+        from embedding_model import optimized_model_id
+        return optimized_model_id(MODEL_OPTIONS["quantize"], MODEL_OPTIONS["num_layers"])
+    return model_type
+
+def open_db(backend="chroma", windowed=False, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS, nprobe=8,
+            model_type="local"):
+    base = segment_collection_name(window_seconds, hop_seconds) if windowed else "audio_embeddings"
+    return AudioVectorDB(collection_name=model_collection_name(model_index_id(model_type), base),
+                         persist_directory=DB_DIRECTORY, backend=backend, nprobe=nprobe)
 
-def add_folder(folder_path, model_type):
+def add_folder(folder_path, model_type, batch_size=8, workers=None, windowed=False,
+               window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS, backend="chroma", ivf_lists=None,
+               fingerprint_only=False):
     print(f"Adding audio files from {folder_path} using {model_type} model...")
-    processor = AudioProcessor()
-    model = get_model(model_type)
-    db = AudioVectorDB()
+    if fingerprint_only and windowed:
+        print("--fingerprint-only applies to whole-file indexing, not --windowed.")
+        return
+    # Fingerprint-only indexing defers the embedding model to search time
+    model = None if fingerprint_only else get_model(model_type)
+    db = open_db(backend, windowed, window_seconds, hop_seconds, model_type=model_type)
 
     # Find all wav and mp3 files
     files = glob.glob(os.path.join(folder_path, "*.wav")) + glob.glob(os.path.join(folder_path, "*.mp3"))
     
     if not files:
         print("No audio files found in the specified folder.")
+
+    # Only new or changed files are decoded and embedded; entries of deleted files are dropped
+    index_id = "fingerprints" if fingerprint_only else model_index_id(model_type)
+    todo, removed = db.sync_folder(folder_path, files, index_id, require_fingerprints=not windowed)
+    print(f"{len(files)} files: {len(todo)} new or changed, {len(files) - len(todo)} already indexed, "
+          f"{removed} removed from the index.")
+    if not todo and not ivf_lists:
         return
+    if todo and windowed:
+        index_segments(db, model, todo, index_id, window_seconds, hop_seconds, batch_size)
+    elif todo:
+        index_files(db, model, todo, index_id, batch_size, workers)
+        from audio_processor import make_waveform_cache
+        cache = make_waveform_cache()
+        if cache is not None:
+            stats = cache.stats()
+            print(f"Waveform cache: {stats['entries']} waveforms, {stats['bytes'] / 1024 ** 2:.0f} MB")
+
+    if ivf_lists:
+        if backend != "numpy":
+            print("--ivf-lists only applies to the numpy backend, skipping.")
+        else:
+            print(f"Training an IVF quantizer with {ivf_lists} lists...")
+            db.collection.train_ivf(ivf_lists)
+
+def index_files(db, model, todo, model_type, batch_size=8, workers=None):
+    from ingest_pipeline import IngestPipeline
+    hashes = dict(todo)
+    pending = []
+
+    def write_pending():
+        db.add_many(
+            None if model is None else [embedding for _, embedding, _ in pending],
+            [{"path": path, "filename": os.path.basename(path)} for path, _, _ in pending],
+            [audio_id(hashes[path]) for path, _, _ in pending],
+            fingerprints=[fingerprint for _, _, fingerprint in pending]
+        )
+        db.record([(path, hashes[path]) for path, _, _ in pending], model_type)
+        pending.clear()
 
-    for file_path in files:
-        print(f"Processing {file_path}...")
-        waveform = processor.load_and_preprocess(file_path)
-        if waveform is not None:
-            embedding = model.get_embedding(waveform)
-            db.add_audio(embedding, {"path": file_path, "filename": os.path.basename(file_path)})
-            print(f"Added {file_path} to database.")
+    def store(file_path, embedding, fingerprint):
+        pending.append((file_path, embedding, fingerprint))
+        if len(pending) >= ADD_BATCH_SIZE:
+            write_pending()
 
-def search_file(file_path, model_type):
+    # Worker processes decode, resample and fingerprint while this process embeds the previous batch
+    pipeline = IngestPipeline(model, workers=workers, batch_size=batch_size)
+    pipeline.run([path for path, _ in todo], store)
+    if pending:
+        write_pending()
+
+def search_file(file_path, model_type, windowed=False, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS,
+                backend="chroma", nprobe=8, two_stage=False, shortlist=SHORTLIST, n_results=5):
     print(f"Searching for similar files to {file_path} using {model_type} model...")
-    processor = AudioProcessor()
-    model = get_model(model_type)
-    db = AudioVectorDB()
+    db = open_db(backend, windowed, window_seconds, hop_seconds, nprobe, model_type)
+    if windowed:
+        return search_file_segments(db, file_path, model_type, window_seconds, hop_seconds)
+    if two_stage:
+        return search_file_two_stage(db, file_path, model_type, shortlist)
+    from audio_processor import AudioProcessor
+    matches = find_similar(db, get_model(model_type), AudioProcessor(), file_path, n_results)
+    if matches is None:
+        print("Failed to process input file.")
+        return
 
+    print("\nSearch Results:")
+    if not matches:
+        print("No results found.")
+    for i, match in enumerate(matches):
+        print(f"{i+1}. {match['filename']} (Path: {match['path']}) - Distance: {match['distance']}")
+    return matches
+
+def find_similar(db, model, processor, file_path, n_results=5):
+    """Embeds one file and returns its nearest indexed files, or None if it cannot be loaded."""
     waveform = processor.load_and_preprocess(file_path)
     if waveform is None:
-        print("Failed to process input file.")
-        return
+        return None
+    results = db.query_audio(model.get_embedding(waveform), n_results=n_results)
+    if not results['metadatas'] or not results['metadatas'][0]:
+        return []
+    return [
+        {"path": metadata["path"], "filename": metadata["filename"], "distance": distance}
+        for metadata, distance in zip(results['metadatas'][0], results['distances'][0])
+    ]
 
-    embedding = model.get_embedding(waveform)
-    results = db.query_audio(embedding)
+def search_via_server(server_url, file_path):
+    try:
+        response = remote_search(server_url, file_path)
+    except urllib.error.HTTPError as e:
+        print(f"Server error {e.code}: {e.read().decode('utf-8', 'replace')}")
+        return None
+    except urllib.error.URLError as e:
+        print(f"Could not reach the search server at {server_url}: {e.reason}")
+        return None
 
     print("\nSearch Results:")
-    if results['metadatas'] and results['metadatas'][0]:
-        for i, metadata in enumerate(results['metadatas'][0]):
-            distance = results['distances'][0][i] if 'distances' in results else "N/A"
-            print(f"{i+1}. {metadata['filename']} (Path: {metadata['path']}) - Distance: {distance}")
-    else:
+    if not response["results"]:
         print("No results found.")
+    for i, match in enumerate(response["results"]):
+        print(f"{i+1}. {match['filename']} (Path: {match['path']}) - Distance: {match['distance']}")
+    print(f"\nAnswered by the server in {response['seconds'] * 1000:.1f} ms")
+    return response["results"]
+
+def search_file_segments(db, file_path, model_type, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS):
+    model = get_model(model_type)
+    matches = search_segments(db, model, file_path, window_seconds=window_seconds, hop_seconds=hop_seconds)
+
+    print("\nSearch Results:")
+    if not matches:
+        print("No results found.")
+    for i, match in enumerate(matches):
+        print(f"{i+1}. {match['filename']} [{format_time(match['start'])} - {format_time(match['end'])}] "
+              f"(Path: {match['path']}) - Distance: {match['distance']}")
+    return matches
+
+def search_file_two_stage(db, file_path, model_type, shortlist=SHORTLIST):
+    if db.fingerprints.count() < len(db.manifest):
+        print(f"Warning: only {db.fingerprints.count()} of {len(db.manifest)} indexed files have fingerprints; "
+              "run add on folders indexed before fingerprints were stored to fill them in.")
+    model = get_model(model_type)
+    matches, timings = search_two_stage(db, model, file_path, shortlist=shortlist)
+
+    print("\nSearch Results:")
+    if not matches:
+        print("No results found.")
+    for i, match in enumerate(matches):
+        print(f"{i+1}. {match['filename']} (Path: {match['path']}) - Distance: {match['distance']}")
+    if timings:
+        print(f"\nFingerprint shortlist of {shortlist}: {timings['fingerprint'] * 1000:.1f} ms")
+    if "rerank" in timings:
+        print(f"Embedded {timings['candidates_embedded']} unembedded candidates: {timings['embed_candidates'] * 1000:.1f} ms")
+        print(f"Query embedding: {timings['embed_query'] * 1000:.1f} ms, re-rank: {timings['rerank'] * 1000:.1f} ms")
+    return matches
+
+def dedupe(model_type, backend="chroma", threshold=DUPLICATE_THRESHOLD, k=NEIGHBOURS, block_rows=BLOCK_ROWS,
+           files=None, output=None):
+    db = open_db(backend, model_type=model_type)
+    if files:
+        print(f"Checking {len(files)} files against {db.collection.count()} indexed clips...")
+        report = find_duplicates_of(db, get_model(model_type), files, threshold, k)
+        for file_path, matches in report.items():
+            print(f"\n{file_path}: {len(matches)} near-duplicates")
+            for match in matches:
+                print(f"  {match['filename']} (Path: {match['path']}) - Similarity: {match['similarity']:.4f}")
+    else:
+        print(f"Finding near-duplicates among {db.collection.count()} indexed clips (cosine >= {threshold})...")
+        report = find_library_duplicates(db, threshold, k, block_rows)
+        print(f"\nFound {len(report)} duplicate clusters covering {sum(len(c) for c in report)} clips.")
+        for i, cluster in enumerate(report):
+            print(f"\nCluster {i+1} ({len(cluster)} clips):")
+            for member in cluster:
+                print(f"  {member['filename']} (Path: {member['path']}) - Similarity: {member['similarity']:.4f}")
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote the report to {output}")
+    return report
 
 def main():
     parser = argparse.ArgumentParser(description="Audio Similarity Search")
+    parser.add_argument("--threads", type=int, help="PyTorch intra-op threads for the local models")
+    parser.add_argument("--layers", type=int, help="optimized model: keep only the first N transformer layers")
+    parser.add_argument("--no-quantize", action="store_true", help="optimized model: skip int8 quantization")
+    parser.add_argument("--waveform-cache", default=DEFAULT_CACHE_DIRECTORY, help="Directory of the decoded-waveform cache")
+    parser.add_argument("--waveform-cache-gb", type=float, default=10, help="Size cap of the waveform cache in GB")
+    parser.add_argument("--waveform-cache-dtype", choices=["float16", "int16"], default="float16", help="Sample format of cached waveforms")
+    parser.add_argument("--no-waveform-cache", action="store_true", help="Always decode audio files, don't use the cache")
     subparsers = parser.add_subparsers(dest="command", help="Command to execute")
 
     # Add command
     add_parser = subparsers.add_parser("add", help="Add audio files from a folder to the database")
     add_parser.add_argument("folder", help="Path to the folder containing audio files")
-    add_parser.add_argument("--model", choices=['local', 'remote'], default='local', help="Model to use for embeddings")
+    add_parser.add_argument("--model", choices=MODEL_TYPES, default='local', help="Model to use for embeddings")
+    add_parser.add_argument("--batch-size", type=int, default=8, help="Clips embedded per forward pass")
+    add_parser.add_argument("--workers", type=int, help="Processes decoding audio (default: CPU count - 1)")
+    add_parser.add_argument("--windowed", action="store_true", help="Store one vector per overlapping window instead of per file")
+    add_parser.add_argument("--window-seconds", type=float, default=WINDOW_SECONDS, help="Window length in windowed mode")
+    add_parser.add_argument("--hop-seconds", type=float, default=HOP_SECONDS, help="Step between windows in windowed mode")
+    add_parser.add_argument("--backend", choices=VECTOR_BACKENDS, default="chroma", help="Vector store backend")
+    add_parser.add_argument("--ivf-lists", type=int, help="numpy backend: train an IVF quantizer with this many lists")
+    add_parser.add_argument("--fingerprint-only", action="store_true",
+                            help="Only store spectral fingerprints; files are embedded when a two-stage search first needs them")
 
     # Search command
     search_parser = subparsers.add_parser("search", help="Search for similar audio files")
     search_parser.add_argument("file", help="Path to the audio file to search for")
-    search_parser.add_argument("--model", choices=['local', 'remote'], default='local', help="Model to use for embeddings")
+    search_parser.add_argument("--model", choices=MODEL_TYPES, default='local', help="Model to use for embeddings")
+    search_parser.add_argument("--windowed", action="store_true", help="Search the windowed index and report time ranges")
+    search_parser.add_argument("--window-seconds", type=float, default=WINDOW_SECONDS, help="Window length of the windowed index")
+    search_parser.add_argument("--hop-seconds", type=float, default=HOP_SECONDS, help="Window step of the windowed index")
+    search_parser.add_argument("--backend", choices=VECTOR_BACKENDS, default="chroma", help="Vector store backend")
+    search_parser.add_argument("--nprobe", type=int, default=8, help="numpy backend with IVF: lists scanned per query")
+    search_parser.add_argument("--two-stage", action="store_true", help="Shortlist by spectral fingerprint, then re-rank with the model")
+    search_parser.add_argument("--shortlist", type=int, default=SHORTLIST, help="Candidates re-ranked in two-stage search")
+    search_parser.add_argument("--server", help="URL of a running search server, e.g. http://127.0.0.1:8765")
+
+    # Dedupe command
+    dedupe_parser = subparsers.add_parser("dedupe", help="Find near-duplicate clips across the library")
+    dedupe_parser.add_argument("--files", nargs="+", help="Only check these files against the library, in one batch")
+    dedupe_parser.add_argument("--model", choices=MODEL_TYPES, default='local', help="Model used to embed --files")
+    dedupe_parser.add_argument("--backend", choices=VECTOR_BACKENDS, default="chroma", help="Vector store backend")
+    dedupe_parser.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD, help="Cosine similarity counted as a duplicate")
+    dedupe_parser.add_argument("--k", type=int, default=NEIGHBOURS, help="Neighbours kept per clip")
+    dedupe_parser.add_argument("--block-size", type=int, default=BLOCK_ROWS, help="Rows per block of the similarity join (bounds memory)")
+    dedupe_parser.add_argument("--output", help="Optional JSON file for the clusters")
+
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Keep the model and database loaded and answer searches over HTTP")
+    serve_parser.add_argument("--model", choices=MODEL_TYPES, default='local', help="Model to use for embeddings")
+    serve_parser.add_argument("--backend", choices=VECTOR_BACKENDS, default="chroma", help="Vector store backend")
+    serve_parser.add_argument("--nprobe", type=int, default=8, help="numpy backend with IVF: lists scanned per query")
+    serve_parser.add_argument("--host", default=SERVER_HOST, help="Address to listen on")
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT, help="Port to listen on")
+    serve_parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Most queries embedded in one forward pass")
+    serve_parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS, help="How long a query waits for others to batch with")
 
     args = parser.parse_args()
+    if args.command == "search" and args.server:
+        # Nothing is decoded or embedded here, so torch and the model are never loaded
+        search_via_server(args.server, args.file)
+        return
+
+    import audio_processor
+    MODEL_OPTIONS.update(threads=args.threads, num_layers=args.layers, quantize=not args.no_quantize)
+    if not args.no_waveform_cache:
+        audio_processor.WAVEFORM_CACHE_SETTINGS = {
+            "directory": args.waveform_cache,
+            "max_bytes": int(args.waveform_cache_gb * 1024 ** 3),
+            "dtype": args.waveform_cache_dtype
+        }
 
     if args.command == "add":
-        add_folder(args.folder, args.model)
+        add_folder(args.folder, args.model, args.batch_size, args.workers,
+                   args.windowed, args.window_seconds, args.hop_seconds, args.backend, args.ivf_lists,
+                   args.fingerprint_only)
     elif args.command == "search":
-        search_file(args.file, args.model)
+        search_file(args.file, args.model, args.windowed, args.window_seconds, args.hop_seconds,
+                    args.backend, args.nprobe, args.two_stage, args.shortlist)
+    elif args.command == "dedupe":
+        dedupe(args.model, args.backend, args.threshold, args.k, args.block_size, args.files, args.output)
+    elif args.command == "serve":
+        serve(get_model(args.model), open_db(args.backend, nprobe=args.nprobe, model_type=args.model),
+              args.host, args.port, args.max_batch, args.max_wait_ms)
     else:
         parser.print_help()
 
@@ -0,0 +1,318 @@
+import json
+import os
+import numpy as np
+
+INITIAL_CAPACITY = 1024
+QUERY_BLOCK_ROWS = 8192 # Rows converted to float32 at a time during a scan, small enough to stay in cache
+IVF_TRAIN_SAMPLE = 50000
+KMEANS_ITERATIONS = 20
+
+
+class NumpyCollection:
+    """
+    A light in-process vector collection with the part of the Chroma
+    collection API that AudioVectorDB uses (upsert/add/get/update/delete/
+    query/count), so it can be swapped in for a Chroma collection.
+
+    Vectors live in a memory-mapped float16 matrix next to their float32
+    squared norms: opening an index is instant and a query only reads the
+    pages it scans. IDs and metadata are kept in memory and persisted as an
+    append-only JSON-lines log, compacted when it grows to twice the live
+    size. Deleting a row moves the last row into its place, so the matrix
+    stays dense; the moves are logged before they are made, and redone on
+    load if the process died half-way.
+
+    The store is single-writer: nothing locks it across processes, so only
+    one process at a time may add, update or delete. Searching from other
+    processes is fine, and they see the state of the store when they opened it.
+
+    Queries return exact top-k squared L2 distances (Chroma's default metric)
+    computed block by block with NumPy. After train_ivf() an IVF coarse
+    quantizer assigns every vector to its nearest centroid, and queries only
+    scan the nprobe lists closest to the query; new vectors are assigned as
+    they are added.
+    """
+
+    def __init__(self, directory, nprobe=8):
+        self.directory = directory
+        self.nprobe = nprobe
+        self.ids = []
+        self.metadatas = []
+        self.rows = {}
+        self.dim = None
+        self.capacity = 0
+        self.vectors = self.norms = self.assign = None
+        self.centroids = None
+        self._log_lines = 0
+        self._pending_moves = [] # Logged row moves not yet confirmed as made, while loading
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        if os.path.exists(self._path("index.json")):
+            with open(self._path("index.json"), "r", encoding="utf-8") as f:
+                header = json.load(f)
+            self.dim = header["dim"]
+            self._map(header["capacity"])
+        if os.path.exists(self._path("centroids.npy")):
+            self.centroids = np.load(self._path("centroids.npy"))
+        if os.path.exists(self._path("records.jsonl")):
+            with open(self._path("records.jsonl"), "r", encoding="utf-8") as f:
+                for line in f:
+                    self._apply(json.loads(line))
+                    self._log_lines += 1
+        self.rows = {id_: row for row, id_ in enumerate(self.ids)}
+        if self._pending_moves:
+            # A delete was logged but its moves may not all have reached the matrix
+            self._move_rows(self._pending_moves)
+            self._log([{"moved": len(self._pending_moves)}])
+            self._pending_moves = []
+
+    def _apply(self, record):
+        if "moved" in record:
+            self._pending_moves = []
+            return
+        if "from" in record:
+            self._pending_moves.append((record["row"], record["from"]))
+        if "truncate" in record:
+            del self.ids[record["truncate"]:]
+            del self.metadatas[record["truncate"]:]
+        elif record["row"] == len(self.ids):
+            self.ids.append(record["id"])
+            self.metadatas.append(record["metadata"])
+        else:
+            self.ids[record["row"]] = record["id"]
+            self.metadatas[record["row"]] = record["metadata"]
+
+    def _log(self, records, sync=False):
+        with open(self._path("records.jsonl"), "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        self._log_lines += len(records)
+        # Never compact while logged moves are still to be made: the compacted log no longer lists them
+        if not sync and self._log_lines > 2 * len(self.ids) + 1000:
+            self._compact()
+
+    def _compact(self):
+        tmp_path = self._path("records.jsonl.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row, (id_, metadata) in enumerate(zip(self.ids, self.metadatas)):
+                f.write(json.dumps({"row": row, "id": id_, "metadata": metadata}) + "\n")
+        os.replace(tmp_path, self._path("records.jsonl"))
+        self._log_lines = len(self.ids)
+
+    def _map(self, capacity):
+        """(Re)opens the memory-mapped arrays, growing their files to capacity rows."""
+        for array in (self.vectors, self.norms, self.assign):
+            if array is not None:
+                array.flush()
+        self.vectors = self.norms = self.assign = None
+        arrays = []
+        for name, dtype, width in (("vectors.f16", np.float16, self.dim), ("norms.f32", np.float32, 1),
+                                   ("assign.i32", np.int32, 1)):
+            path = self._path(name)
+            size = capacity * width * np.dtype(dtype).itemsize
+            with open(path, "ab") as f:
+                if f.tell() < size:
+                    f.truncate(size)
+            shape = (capacity, width) if width > 1 else (capacity,)
+            arrays.append(np.memmap(path, dtype=dtype, mode="r+", shape=shape))
+        self.vectors, self.norms, self.assign = arrays
+        self.capacity = capacity
+
+    def _reserve(self, rows):
+        if rows > self.capacity:
+            self._map(max(rows, 2 * self.capacity, INITIAL_CAPACITY))
+            with open(self._path("index.json"), "w", encoding="utf-8") as f:
+                json.dump({"dim": self.dim, "capacity": self.capacity}, f)
+
+    def count(self):
+        return len(self.ids)
+
+    def upsert(self, embeddings, metadatas, ids):
+        vectors = np.asarray(embeddings, dtype=np.float32).astype(np.float16)
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match the collection ({self.dim})")
+
+        rows = []
+        records = []
+        for id_, metadata in zip(ids, metadatas):
+            row = self.rows.get(id_)
+            if row is None:
+                row = len(self.ids)
+                self.rows[id_] = row
+                self.ids.append(id_)
+                self.metadatas.append(metadata)
+            else:
+                self.metadatas[row] = metadata
+            rows.append(row)
+            records.append({"row": row, "id": id_, "metadata": metadata})
+        self._reserve(len(self.ids))
+
+        rows = np.array(rows)
+        self.vectors[rows] = vectors
+        self.norms[rows] = np.square(vectors.astype(np.float32)).sum(axis=1)
+        if self.centroids is not None:
+            self.assign[rows] = self._nearest_centroid(vectors.astype(np.float32))
+        for array in (self.vectors, self.norms, self.assign):
+            array.flush()
+        # Vectors are written before the log, so a logged row always has its vector
+        self._log(records)
+
+    add = upsert
+
+    def get(self, ids=None, include=("metadatas",), limit=None, offset=0):
+        if ids is None:
+            end = len(self.ids) if limit is None else min(offset + limit, len(self.ids))
+            rows = range(offset, end)
+        else:
+            rows = [self.rows[id_] for id_ in ids if id_ in self.rows]
+        embeddings = None
+        if "embeddings" in include:
+            if self.vectors is None or not len(rows):
+                # Nothing stored yet, e.g. an index of fingerprints only
+                embeddings = np.zeros((0, self.dim or 0), dtype=np.float32)
+            else:
+                embeddings = np.asarray(self.vectors[list(rows)], dtype=np.float32)
+        return {
+            "ids": [self.ids[row] for row in rows],
+            "metadatas": [self.metadatas[row] for row in rows] if "metadatas" in include else None,
+            "embeddings": embeddings
+        }
+
+    def update(self, ids, metadatas):
+        records = []
+        for id_, metadata in zip(ids, metadatas):
+            row = self.rows[id_]
+            self.metadatas[row] = metadata
+            records.append({"row": row, "id": id_, "metadata": metadata})
+        self._log(records)
+
+    def delete(self, ids):
+        records = []
+        moves = []
+        for id_ in ids:
+            row = self.rows.pop(id_, None)
+            if row is None:
+                continue
+            last = len(self.ids) - 1
+            if row != last:
+                # Move the last row into the hole so rows 0..count-1 stay valid
+                self.ids[row] = self.ids[last]
+                self.metadatas[row] = self.metadatas[last]
+                self.rows[self.ids[row]] = row
+                moves.append((row, last))
+                records.append({"row": row, "id": self.ids[row], "metadata": self.metadatas[row], "from": last})
+            self.ids.pop()
+            self.metadatas.pop()
+            records.append({"truncate": last})
+        if not moves:
+            if records:
+                self._log(records)
+            return
+        # The moves are on disk before any vector is, so _load can redo them after a crash;
+        # their source rows are past the end and stay untouched until the closing record
+        self._log(records, sync=True)
+        self._move_rows(moves)
+        self._log([{"moved": len(moves)}])
+
+    def _move_rows(self, moves):
+        """Copies each (row, source) vector in order, then flushes the matrix."""
+        for row, source in moves:
+            self.vectors[row] = self.vectors[source]
+            self.norms[row] = self.norms[source]
+            self.assign[row] = self.assign[source]
+        for array in (self.vectors, self.norms, self.assign):
+            array.flush()
+
+    def query(self, query_embeddings, n_results=10):
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        k = min(n_results, len(self.ids))
+        if self.centroids is None:
+            distances, rows = self._scan(queries, k)
+        else:
+            distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+            rows = np.full((len(queries), k), -1)
+            for i, query in enumerate(queries):
+                candidates = self._probe(query)
+                found = min(k, len(candidates))
+                found_distances, found_rows = self._scan(query[None, :], found, candidates)
+                distances[i, :found], rows[i, :found] = found_distances[0], found_rows[0]
+        return {
+            "ids": [[self.ids[row] for row in query_rows if row >= 0] for query_rows in rows],
+            "metadatas": [[self.metadatas[row] for row in query_rows if row >= 0] for query_rows in rows],
+            "distances": [[float(d) for d, row in zip(query_distances, query_rows) if row >= 0]
+                          for query_distances, query_rows in zip(distances, rows)]
+        }
+
+    def _scan(self, queries, k, candidates=None):
+        """Exact top-k over all rows, or over the given candidate rows, in blocks."""
+        total = len(self.ids) if candidates is None else len(candidates)
+        best_distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        best_rows = np.full((len(queries), k), -1)
+        if k == 0:
+            return best_distances, best_rows
+        query_norms = np.square(queries).sum(axis=1)[:, None]
+        for start in range(0, total, QUERY_BLOCK_ROWS):
+            end = min(start + QUERY_BLOCK_ROWS, total)
+            rows = np.arange(start, end) if candidates is None else candidates[start:end]
+            block = np.asarray(self.vectors[start:end] if candidates is None else self.vectors[rows], dtype=np.float32)
+            norms = self.norms[start:end] if candidates is None else self.norms[rows]
+            # ||q - x||^2 = ||q||^2 - 2 q.x + ||x||^2, clamped against rounding below zero
+            distances = np.maximum(query_norms - 2 * queries @ block.T + norms[None, :], 0)
+
+            merged_distances = np.concatenate([best_distances, distances], axis=1)
+            merged_rows = np.concatenate([best_rows, np.broadcast_to(rows, distances.shape)], axis=1)
+            top = np.argpartition(merged_distances, k - 1, axis=1)[:, :k]
+            best_distances = np.take_along_axis(merged_distances, top, axis=1)
+            best_rows = np.take_along_axis(merged_rows, top, axis=1)
+
+        order = np.argsort(best_distances, axis=1)
+        return np.take_along_axis(best_distances, order, axis=1), np.take_along_axis(best_rows, order, axis=1)
+
+    def _nearest_centroid(self, vectors):
+        centroid_norms = np.square(self.centroids).sum(axis=1)
+        return np.argmin(centroid_norms[None, :] - 2 * vectors @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _probe(self, query):
+        """Rows in the nprobe inverted lists closest to the query."""
+        nearest = np.argsort(np.square(self.centroids - query).sum(axis=1))[:self.nprobe]
+        return np.flatnonzero(np.isin(self.assign[:len(self.ids)], nearest))
+
+    def train_ivf(self, nlist, sample_size=IVF_TRAIN_SAMPLE, iterations=KMEANS_ITERATIONS, seed=0):
+        """
+        Trains a k-means coarse quantizer with nlist centroids on a sample of
+        the stored vectors and assigns every vector to its nearest centroid.
+        """
+        count = len(self.ids)
+        if count < nlist:
+            raise ValueError(f"Need at least {nlist} vectors to train {nlist} lists, have {count}")
+        rng = np.random.default_rng(seed)
+        sample_rows = np.sort(rng.choice(count, size=min(sample_size, count), replace=False))
+        sample = np.asarray(self.vectors[sample_rows], dtype=np.float32)
+        self.centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = self._nearest_centroid(sample)
+            sizes = np.bincount(labels, minlength=nlist)
+            starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+            filled = sizes > 0
+            # Sum each list's members in one pass over the sample sorted by list; empty lists keep their centroid
+            sums = np.add.reduceat(sample[np.argsort(labels, kind="stable")], starts[filled], axis=0)
+            self.centroids[filled] = sums / sizes[filled, None]
+
+        for start in range(0, count, QUERY_BLOCK_ROWS):
+            end = min(start + QUERY_BLOCK_ROWS, count)
+            self.assign[start:end] = self._nearest_centroid(np.asarray(self.vectors[start:end], dtype=np.float32))
+        self.assign.flush()
+        np.save(self._path("centroids.npy"), self.centroids)
+
+    def disk_bytes(self):
+        return sum(os.path.getsize(self._path(name)) for name in os.listdir(self.directory))
@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import urllib.error
+import urllib.request
+
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+
+
+def remote_search(server_url, file_path, n_results=5):
+    """Sends one search to a running server and returns its response."""
+    # The server resolves paths from its own working directory
+    body = json.dumps({"path": os.path.abspath(file_path), "n_results": n_results}).encode("utf-8")
+    request = urllib.request.Request(server_url.rstrip("/") + "/search", data=body,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def server_metrics(server_url):
+    with urllib.request.urlopen(server_url.rstrip("/") + "/metrics") as response:
+        return json.loads(response.read())
+
+
+def main():
+    # Only the standard library is imported here, so a search costs one HTTP round trip
+    parser = argparse.ArgumentParser(description="Query a running audio search server.")
+    parser.add_argument("file", nargs="?", help="Audio file to search for")
+    parser.add_argument("--server", default=DEFAULT_SERVER_URL, help="Server URL")
+    parser.add_argument("--n-results", type=int, default=5, help="Number of results")
+    parser.add_argument("--metrics", action="store_true", help="Print the server's latency and queue metrics")
+    args = parser.parse_args()
+
+    try:
+        if args.metrics or not args.file:
+            print(json.dumps(server_metrics(args.server), indent=2))
+            return
+        response = remote_search(args.server, args.file, args.n_results)
+    except urllib.error.HTTPError as e:
+        print(f"Server error {e.code}: {e.read().decode('utf-8', 'replace')}")
+        return
+    except urllib.error.URLError as e:
+        print(f"Could not reach the search server at {args.server}: {e.reason}")
+        return
+
+    for i, match in enumerate(response["results"]):
+        print(f"{i+1}. {match['filename']} (Path: {match['path']}) - Distance: {match['distance']}")
+    if not response["results"]:
+        print("No results found.")
+    print(f"Answered by the server in {response['seconds'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
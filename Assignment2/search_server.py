@@ -0,0 +1,190 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+MAX_BATCH = 16 # Queries embedded in one forward pass
+MAX_WAIT_MS = 10 # How long the first query of a batch waits for others to join
+LATENCY_WINDOW = 1000 # Recent requests kept for latency percentiles
+
+
+class MicroBatcher:
+    """
+    Groups concurrent search requests into micro-batches.
+
+    Request threads decode their own audio and enqueue it. One worker thread
+    takes the first waiting query, collects whatever else arrives within
+    max_wait_ms (up to max_batch), embeds queries of equal length together
+    and looks the whole batch up with one multi-query call. Every request
+    then gets its own slice of the results.
+    """
+
+    def __init__(self, model, db, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.model = model
+        self.db = db
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pending = queue.Queue()
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self.requests = self.errors = self.batches = self.max_queue_depth = 0
+        self.embed_seconds = self.query_seconds = 0.0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, waveform, n_results):
+        """Queues one query and returns a Future of its result list."""
+        future = Future()
+        self.pending.put((waveform, n_results, future, time.perf_counter()))
+        with self._lock:
+            self.max_queue_depth = max(self.max_queue_depth, self.pending.qsize())
+        return future
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._answer(batch)
+            except Exception as e:
+                # Only this batch fails; the thread keeps serving the next one
+                failed = [future for _, _, future, _ in batch if not future.done()]
+                for future in failed:
+                    future.set_exception(e)
+                with self._lock:
+                    self.errors += len(failed)
+
+    def _answer(self, batch):
+        start = time.perf_counter()
+        # Only equal-length queries share a forward pass: padding would make a query's
+        # embedding, and so its results, depend on which other requests arrived with it
+        by_length = {}
+        for i, (waveform, _, _, _) in enumerate(batch):
+            by_length.setdefault(waveform.shape[-1], []).append(i)
+        embeddings = [None] * len(batch)
+        for indices in by_length.values():
+            group = self.model.get_embeddings([batch[i][0] for i in indices], batch_size=len(indices))
+            for i, embedding in zip(indices, group):
+                embeddings[i] = embedding
+        embedded = time.perf_counter()
+        n_results = max(n for _, n, _, _ in batch)
+        results = self.db.query_many(embeddings, n_results=n_results)
+        queried = time.perf_counter()
+
+        answers = [
+            [{"path": metadata["path"], "filename": metadata["filename"], "distance": distance}
+             for metadata, distance in zip(results["metadatas"][i][:n], results["distances"][i][:n])]
+            for i, (_, n, _, _) in enumerate(batch)
+        ]
+        for (_, _, future, submitted), answer in zip(batch, answers):
+            future.set_result(answer)
+            with self._lock:
+                self.latencies.append(queried - submitted)
+        with self._lock:
+            self.requests += len(batch)
+            self.batches += 1
+            self.batch_sizes.append(len(batch))
+            self.embed_seconds += embedded - start
+            self.query_seconds += queried - embedded
+
+    def metrics(self):
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "batches": self.batches,
+                "queue_depth": self.pending.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+                "latency_ms": {
+                    "p50": float(np.percentile(latencies, 50)),
+                    "p95": float(np.percentile(latencies, 95)),
+                    "p99": float(np.percentile(latencies, 99))
+                },
+                "embed_ms_per_batch": self.embed_seconds * 1000 / self.batches if self.batches else 0.0,
+                "query_ms_per_batch": self.query_seconds * 1000 / self.batches if self.batches else 0.0
+            }
+
+
+def make_handler(processor, batcher):
+    class SearchHandler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, batcher.metrics())
+            elif self.path == "/health":
+                self._send(200, {"status": "ok"})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/search":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                file_path = request["path"]
+                n_results = int(request.get("n_results", 5))
+            except (ValueError, KeyError) as e:
+                self._send(400, {"error": f"Bad request: {e}"})
+                return
+            start = time.perf_counter()
+            # Decoding happens on this request's thread, in parallel with other requests
+            waveform = processor.load_and_preprocess(file_path)
+            if waveform is None:
+                self._send(422, {"error": f"Could not load {file_path}"})
+                return
+            try:
+                results = batcher.submit(waveform, n_results).result()
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+                return
+            self._send(200, {"results": results, "seconds": time.perf_counter() - start})
+
+        def log_message(self, format, *args):
+            # Per-request logging would dominate the output; /metrics has the numbers
+            pass
+
+    return SearchHandler
+
+
+def serve(model, db, host=SERVER_HOST, port=SERVER_PORT, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    """Serves searches over local HTTP with the model and database kept loaded."""
+    from audio_processor import AudioProcessor
+    processor = AudioProcessor()
+    batcher = MicroBatcher(model, db, max_batch, max_wait_ms)
+    server = ThreadingHTTPServer((host, port), make_handler(processor, batcher))
+    print(f"Search server listening on http://{host}:{port} (POST /search, GET /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down.")
+    finally:
+        server.server_close()
+
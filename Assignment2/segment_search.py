@@ -0,0 +1,109 @@
+import os
+import time
+from vector_db import ADD_BATCH_SIZE, audio_id
+
+WINDOW_SECONDS = 5.0
+HOP_SECONDS = 2.5
+
+
+def segment_collection_name(window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS):
+    """Each window/hop setting gets its own collection (and manifest), so segments never mix."""
+    return f"audio_segments_{window_seconds:g}s_{hop_seconds:g}s"
+
+
+def format_time(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(int(minutes), 60)
+    return f"{hours}:{minutes:02d}:{seconds:04.1f}"
+
+
+def index_segments(db, model, todo, model_type, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS, batch_size=8):
+    """
+    Streams every (path, sha256) in todo as overlapping windows and stores one
+    vector per window, with its start and end offsets in the metadata.
+    Windows are embedded batch_size at a time and written ADD_BATCH_SIZE at a
+    time, so neither the decoded audio nor the vectors of a long file are
+    ever held in memory all at once.
+    """
+    from audio_processor import AudioProcessor
+    processor = AudioProcessor()
+    start = time.perf_counter()
+    total_segments = 0
+    for n, (path, sha256) in enumerate(todo, 1):
+        segments = 0
+        windows = []
+        pending = []
+
+        def embed_windows():
+            embeddings = model.get_embeddings([waveform for _, _, waveform in windows], batch_size=batch_size)
+            for (window_start, window_end, _), embedding in zip(windows, embeddings):
+                pending.append((window_start, window_end, embedding))
+            windows.clear()
+
+        def write_pending():
+            nonlocal segments
+            db.add_many(
+                [embedding for _, _, embedding in pending],
+                [{"path": path, "filename": os.path.basename(path), "start": window_start, "end": window_end}
+                 for window_start, window_end, _ in pending],
+                [audio_id(sha256, segments + i) for i in range(len(pending))]
+            )
+            segments += len(pending)
+            pending.clear()
+
+        for window in processor.iter_windows(path, window_seconds, hop_seconds):
+            windows.append(window)
+            if len(windows) >= batch_size:
+                embed_windows()
+                if len(pending) >= ADD_BATCH_SIZE:
+                    write_pending()
+        if windows:
+            embed_windows()
+        if pending:
+            write_pending()
+
+        if segments:
+            # Recorded only once every segment is written, so an interrupted file is redone
+            db.record([(path, sha256)], model_type)
+        total_segments += segments
+        print(f"[{n}/{len(todo)}] {path}: {segments} segments")
+
+    elapsed = time.perf_counter() - start
+    if elapsed > 0:
+        print(f"Indexed {total_segments} segments of {len(todo)} files in {elapsed:.1f}s "
+              f"({total_segments / elapsed:.1f} segments/sec)")
+
+
+def search_segments(db, model, file_path, n_results=5, window_seconds=WINDOW_SECONDS, hop_seconds=HOP_SECONDS):
+    """
+    Finds the files containing the closest match to file_path.
+
+    The query is cut into the same windows as the index and all of its
+    windows are searched in one call. Each file is ranked by its single best
+    segment, and results carry that segment's time range in the file (and
+    the matching range of the query). Returns a list of result dicts, best first.
+    """
+    from audio_processor import AudioProcessor
+    processor = AudioProcessor()
+    windows = list(processor.iter_windows(file_path, window_seconds, hop_seconds))
+    if not windows or db.collection.count() == 0:
+        return []
+    embeddings = model.get_embeddings([waveform for _, _, waveform in windows])
+    # Several segments of one file can fill the top hits, so look further than n_results
+    results = db.query_many(embeddings, n_results=n_results * 4)
+
+    best = {}
+    for (query_start, query_end, _), metadatas, distances in zip(windows, results["metadatas"], results["distances"]):
+        for metadata, distance in zip(metadatas, distances):
+            path = metadata["path"]
+            if path not in best or distance < best[path]["distance"]:
+                best[path] = {
+                    "path": path,
+                    "filename": metadata["filename"],
+                    "start": metadata["start"],
+                    "end": metadata["end"],
+                    "query_start": query_start,
+                    "query_end": query_end,
+                    "distance": distance
+                }
+    return sorted(best.values(), key=lambda match: match["distance"])[:n_results]
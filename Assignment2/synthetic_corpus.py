@@ -0,0 +1,110 @@
+import json
+import os
+import wave
+import numpy as np
+
+CLIP_KINDS = ["tone", "chirp", "noise"]
+NOISE_FLOOR = 0.05 # Amplitude of the white noise mixed into every clip
+MAX_SHIFT_SECONDS = 0.5
+GAIN_RANGE_DB = (-12.0, -1.0)
+
+
+def base_clip(kind, rng, sample_rate=16000, duration=None):
+    """One clip of the given kind as float32 samples peaking at 0.5."""
+    if duration is None:
+        duration = rng.uniform(1.0, 4.0)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    if kind == "tone":
+        # A fundamental with a few weaker harmonics
+        f0 = rng.uniform(100, 2000)
+        samples = sum(rng.uniform(0.2, 1.0) ** h * np.sin(2 * np.pi * f0 * (h + 1) * t) for h in range(3))
+    elif kind == "chirp":
+        f0, f1 = rng.uniform(100, 4000, size=2)
+        samples = np.sin(2 * np.pi * (f0 * t + (f1 - f0) * t ** 2 / (2 * duration)))
+    elif kind == "noise":
+        # Band-passed noise, so different noise clips are not all alike
+        spectrum = np.fft.rfft(rng.standard_normal(len(t)))
+        frequencies = np.fft.rfftfreq(len(t), 1 / sample_rate)
+        low = rng.uniform(100, 4000)
+        spectrum[(frequencies < low) | (frequencies > low * rng.uniform(1.5, 3.0))] = 0
+        samples = np.fft.irfft(spectrum, len(t))
+    else:
+        raise ValueError(f"Unknown clip kind: {kind}. Choose one of {CLIP_KINDS}.")
+    samples = samples / np.abs(samples).max() + NOISE_FLOOR * rng.standard_normal(len(t))
+    return (0.5 * samples / np.abs(samples).max()).astype(np.float32)
+
+
+def make_variant(samples, rng, sample_rate=16000):
+    """
+    A time-shifted and/or gain-altered copy of a clip with fresh background
+    noise. Returns (samples, {"shift_seconds": ..., "gain_db": ...}).
+    """
+    change = rng.choice(["shift", "gain", "both"])
+    shift = rng.uniform(0.05, MAX_SHIFT_SECONDS) if change != "gain" else 0.0
+    gain_db = rng.uniform(*GAIN_RANGE_DB) if change != "shift" else 0.0
+    offset = int(shift * sample_rate)
+    # Delay the clip and keep its length, as if the recording started a little early
+    shifted = np.concatenate([np.zeros(offset, dtype=np.float32), samples])[:len(samples)]
+    shifted = shifted + 0.5 * NOISE_FLOOR * rng.standard_normal(len(shifted))
+    variant = np.clip(shifted * 10 ** (gain_db / 20), -1, 1).astype(np.float32)
+    return variant, {"shift_seconds": round(float(shift), 4), "gain_db": round(float(gain_db), 2)}
+
+
+def write_wav(path, samples, sample_rate=16000):
+    """Writes mono float samples in [-1, 1] as a 16-bit PCM wav file."""
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+def generate_corpus(folder, bases=250, variants=4, seed=0, sample_rate=16000):
+    """
+    Writes a labelled corpus of synthetic clips for measuring search quality.
+
+    Every base clip gets its own label. folder/index holds each base clip and
+    `variants` shifted or gain-altered copies of it; folder/queries holds one
+    more variant per label, which is not indexed. All clips with the same
+    label count as relevant results for that label's query. The records are
+    also written to folder/labels.json; the same seed always produces the
+    same corpus.
+    """
+    rng = np.random.default_rng(seed)
+    index_dir = os.path.join(folder, "index")
+    query_dir = os.path.join(folder, "queries")
+    for directory in (index_dir, query_dir):
+        os.makedirs(directory, exist_ok=True)
+        # Clips of an earlier corpus with other settings would be indexed too
+        for name in os.listdir(directory):
+            if name.endswith(".wav"):
+                os.remove(os.path.join(directory, name))
+    records = []
+    for i in range(bases):
+        kind = CLIP_KINDS[i % len(CLIP_KINDS)]
+        label = f"{kind}_{i:05d}"
+        samples = base_clip(kind, rng, sample_rate)
+        clips = [(samples, {"shift_seconds": 0.0, "gain_db": 0.0})]
+        clips += [make_variant(samples, rng, sample_rate) for _ in range(variants + 1)]
+        for v, (clip, change) in enumerate(clips):
+            is_query = v == len(clips) - 1
+            path = os.path.join(query_dir if is_query else index_dir, f"{label}_v{v}.wav")
+            write_wav(path, clip, sample_rate)
+            records.append(dict(change, path=os.path.abspath(path), label=label, kind=kind, query=is_query))
+
+    with open(os.path.join(folder, "labels.json"), "w", encoding="utf-8") as f:
+        json.dump({"bases": bases, "variants": variants, "seed": seed, "sample_rate": sample_rate,
+                   "records": records}, f)
+    return records
+
+
+def load_corpus(folder, bases, variants, seed, sample_rate=16000):
+    """Returns the records of a corpus in folder, generating it unless one with the same settings is there."""
+    labels_path = os.path.join(folder, "labels.json")
+    if os.path.exists(labels_path):
+        with open(labels_path, "r", encoding="utf-8") as f:
+            corpus = json.load(f)
+        if (corpus["bases"], corpus["variants"], corpus["seed"], corpus["sample_rate"]) == (bases, variants, seed, sample_rate):
+            return corpus["records"]
+    return generate_corpus(folder, bases, variants, seed, sample_rate)
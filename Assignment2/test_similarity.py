@@ -1,7 +1,11 @@
 import os
+import tempfile
 import torch
 import torchaudio
 from main import add_folder, search_file
+from embedding_model import LocalWav2Vec2Model
+from vector_db import AudioVectorDB
+from search_server import MicroBatcher
 
 def create_dummy_audio(filename, duration=1, sample_rate=16000):
     # Create a simple sine wave
@@ -30,5 +34,86 @@ def test_workflow():
     print("\n--- Testing Search Command ---")
     search_file(query_file, "local")
 
+def test_batch_matches_single():
+    """Batched embeddings of clips with different lengths should match one-by-one embeddings."""
+    model = LocalWav2Vec2Model()
+    waveforms = []
+    # 2.02s is within the group-norm padding cap of 2.0s, so those two share a forward pass
+    for i, duration in enumerate([0.8, 1.0, 1.3, 2.0, 2.02, 5.0]):
+        t = torch.linspace(0, duration, int(duration * 16000))
+        waveforms.append(torch.sin(2 * torch.pi * (220 + 110 * i) * t).unsqueeze(0))
+
+    batched = model.get_embeddings(waveforms, batch_size=4)
+    for waveform, batch_embedding in zip(waveforms, batched):
+        single = torch.tensor(model.get_embedding(waveform))
+        similarity = torch.nn.functional.cosine_similarity(single, torch.tensor(batch_embedding), dim=0).item()
+        print(f"Clip of {waveform.shape[1] / 16000:.1f}s: cosine similarity batch vs single = {similarity:.4f}")
+        assert similarity > 0.99, "Batched embedding differs from the single-clip embedding"
+
+def test_windowed_search():
+    """A short tone inside a long noisy recording should be found with its time range."""
+    test_dir = "test_audio_long"
+    os.makedirs(test_dir, exist_ok=True)
+    sample_rate = 16000
+    torch.manual_seed(0)
+    long_waveform = 0.1 * torch.randn(1, 30 * sample_rate)
+    t = torch.linspace(0, 3, 3 * sample_rate)
+    tone = torch.sin(2 * torch.pi * 440 * t).unsqueeze(0)
+    long_waveform[:, 12 * sample_rate:15 * sample_rate] = tone
+    torchaudio.save(os.path.join(test_dir, "long.wav"), long_waveform, sample_rate)
+    query_file = os.path.join("test_audio", "tone_query.wav")
+    os.makedirs("test_audio", exist_ok=True)
+    torchaudio.save(query_file, tone, sample_rate)
+
+    add_folder(test_dir, "local", windowed=True, window_seconds=3.0, hop_seconds=1.0)
+    matches = search_file(query_file, "local", windowed=True, window_seconds=3.0, hop_seconds=1.0)
+    assert matches and matches[0]["filename"] == "long.wav", "The long recording was not found"
+    best = matches[0]
+    print(f"Best segment: {best['start']:.1f}s - {best['end']:.1f}s")
+    assert best["start"] < 15 and best["end"] > 12, "The best segment does not overlap the tone"
+
+def test_two_stage_fingerprint_only_index():
+    """A numpy index with fingerprints but no embeddings yet returns no stored embeddings instead of failing."""
+    with tempfile.TemporaryDirectory() as directory:
+        db = AudioVectorDB(persist_directory=directory, backend="numpy")
+        ids = ["a" * 32, "b" * 32]
+        metadatas = [{"path": f"/audio/{name}.wav", "filename": f"{name}.wav"} for name in ("a", "b")]
+        db.add_many(None, metadatas, ids, fingerprints=[[1.0] * 128, [0.5] * 128])
+        assert db.get_embeddings(ids) == {}, "A fingerprint-only index has no embeddings"
+        empty = db.collection.get(include=["embeddings"])
+        assert empty["ids"] == [] and len(empty["embeddings"]) == 0
+
+        db.add_many([[0.1] * 768], metadatas[:1], ids[:1])
+        stored = db.get_embeddings(ids)
+        assert list(stored) == ids[:1] and len(stored[ids[0]]) == 768
+        assert len(db.collection.get(ids=["c" * 32], include=["embeddings"])["embeddings"]) == 0
+
+def test_server_results_independent_of_batch():
+    """A query gets the same results alone as when a longer query shares its micro-batch."""
+    model = LocalWav2Vec2Model()
+    torch.manual_seed(0)
+    library = [0.3 * torch.randn(1, int(seconds * 16000)) for seconds in (1.0, 1.5, 2.0, 3.0)]
+    with tempfile.TemporaryDirectory() as directory:
+        db = AudioVectorDB(persist_directory=directory, backend="numpy")
+        ids = [f"{i:032d}" for i in range(len(library))]
+        db.add_many(model.get_embeddings(library), [{"path": f"/audio/{i}.wav", "filename": f"{i}.wav"}
+                                                    for i in range(len(library))], ids)
+        # A long wait, so both queries below land in the same batch
+        batcher = MicroBatcher(model, db, max_batch=4, max_wait_ms=500)
+        query = library[1] + 0.05 * torch.randn(library[1].shape)
+        alone = batcher.submit(query, 4).result()
+        shared, longer = batcher.submit(query, 4), batcher.submit(0.3 * torch.randn(1, 5 * 16000), 4)
+        together = shared.result()
+        longer.result()
+        assert batcher.metrics()["batches"] == 2, "The two queries were not batched together"
+        assert [match["path"] for match in alone] == [match["path"] for match in together]
+        # Only float rounding of the multi-query distance product may differ
+        assert all(abs(a["distance"] - b["distance"]) <= 1e-5 * max(1.0, a["distance"]) for a, b in zip(alone, together)), \
+            "A query's distances changed with the other queries in its batch"
+
 if __name__ == "__main__":
     test_workflow()
+    test_batch_matches_single()
+    test_windowed_search()
+    test_two_stage_fingerprint_only_index()
+    test_server_results_independent_of_batch()
@@ -0,0 +1,61 @@
+import time
+import numpy as np
+
+SHORTLIST = 50 # Candidates from the fingerprint stage that get re-ranked
+
+
+def search_two_stage(db, model, file_path, n_results=5, shortlist=SHORTLIST):
+    """
+    Two-stage search: spectral fingerprints shortlist candidates, and only
+    the shortlist is ranked by wav2vec2 embedding distance.
+
+    Stage 1 compares the query's fingerprint with the fingerprints stored
+    beside the index. Stage 2 embeds the query and computes exact squared L2
+    distances to the shortlisted files' stored embeddings. Candidates that
+    were indexed with --fingerprint-only are embedded now and stored, so
+    each file pays for its forward pass at most once. A larger shortlist
+    gives better recall and costs more time.
+    Returns (results best first, per-stage timings in seconds).
+    """
+    timings = {}
+    start = time.perf_counter()
+    from audio_processor import AudioProcessor
+    from fingerprint import Fingerprinter
+    processor = AudioProcessor()
+    waveform = processor.load_and_preprocess(file_path)
+    if waveform is None:
+        return [], timings
+    fingerprint = Fingerprinter(processor.target_sample_rate).compute(waveform)
+    candidates = db.fingerprints.query([fingerprint], n_results=shortlist)
+    ids, metadatas = candidates["ids"][0], candidates["metadatas"][0]
+    timings["fingerprint"] = time.perf_counter() - start
+    if not ids:
+        return [], timings
+
+    start = time.perf_counter()
+    stored = db.get_embeddings(ids)
+    missing = [(id_, metadata) for id_, metadata in zip(ids, metadatas) if id_ not in stored]
+    loaded = [(id_, metadata, processor.load_and_preprocess(metadata["path"])) for id_, metadata in missing]
+    loaded = [(id_, metadata, candidate) for id_, metadata, candidate in loaded if candidate is not None]
+    if loaded:
+        embeddings = model.get_embeddings([candidate for _, _, candidate in loaded])
+        db.add_many(embeddings, [metadata for _, metadata, _ in loaded], [id_ for id_, _, _ in loaded])
+        stored.update((id_, embedding) for (id_, _, _), embedding in zip(loaded, embeddings))
+    timings["embed_candidates"] = time.perf_counter() - start
+    timings["candidates_embedded"] = len(loaded)
+
+    start = time.perf_counter()
+    query = np.asarray(model.get_embedding(waveform), dtype=np.float32)
+    timings["embed_query"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ranked = [id_ for id_ in ids if id_ in stored]
+    vectors = np.asarray([stored[id_] for id_ in ranked], dtype=np.float32).reshape(len(ranked), -1)
+    distances = np.square(vectors - query).sum(axis=1)
+    by_id = dict(zip(ids, metadatas))
+    results = [
+        {"path": by_id[id_]["path"], "filename": by_id[id_]["filename"], "distance": float(distance)}
+        for id_, distance in sorted(zip(ranked, distances), key=lambda pair: pair[1])[:n_results]
+    ]
+    timings["rerank"] = time.perf_counter() - start
+    return results, timings
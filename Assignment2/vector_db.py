@@ -1,10 +1,76 @@
-import chromadb
+import hashlib
+import json
+import os
 import uuid
+from numpy_store import NumpyCollection
+
+ADD_BATCH_SIZE = 512 # Embeddings written per Chroma call
+VECTOR_BACKENDS = ["chroma", "numpy"]
+
+
+def file_sha256(file_path, block_size=1 << 20):
+    """Returns the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def model_collection_name(model_id, base="audio_embeddings"):
+    """
+    Each embedding model gets its own collection (and manifest), since
+    embeddings of different models are not comparable and share IDs.
+    The local model keeps the base name, so existing indexes stay valid.
+    """
+    if model_id == "local":
+        return base
+    return f"{base}_{model_id}"
+
+
+def audio_id(sha256, segment=None):
+    """
+    Deterministic ID of an embedding: the same audio content always maps to
+    the same entry. Windowed indexes add the segment number.
+    """
+    if segment is None:
+        return sha256[:32]
+    return f"{sha256[:32]}-{segment}"
+
 
 class AudioVectorDB:
-    def __init__(self, collection_name="audio_embeddings", persist_directory="./chroma_db"):
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        self.collection = self.client.get_or_create_collection(name=collection_name)
+    """
+    Audio embeddings with their metadata, stored in a Chroma collection or,
+    with backend="numpy", in a memory-mapped NumpyCollection (see
+    numpy_store.py) that is lighter for read-heavy search. Both backends
+    keep their own manifest under persist_directory.
+    """
+
+    def __init__(self, collection_name="audio_embeddings", persist_directory="./chroma_db", backend="chroma", nprobe=8):
+        self.backend = backend
+        if backend == "chroma":
+            import chromadb
+            self.client = chromadb.PersistentClient(path=persist_directory)
+            self.collection = self.client.get_or_create_collection(name=collection_name)
+            self.manifest_path = os.path.join(persist_directory, f"{collection_name}_manifest.json")
+            self.fingerprint_directory = os.path.join(persist_directory, "fingerprints", collection_name)
+        elif backend == "numpy":
+            directory = os.path.join(persist_directory, "numpy", collection_name)
+            self.collection = NumpyCollection(directory, nprobe=nprobe)
+            self.manifest_path = os.path.join(directory, "manifest.json")
+            self.fingerprint_directory = os.path.join(directory, "fingerprints")
+        else:
+            raise ValueError(f"Unsupported vector backend: {backend}. Choose one of {VECTOR_BACKENDS}.")
+        self.manifest = self._load_manifest()
+        self._duplicates = {}
+        self._fingerprints = None
+
+    @property
+    def fingerprints(self):
+        """Spectral fingerprints of the indexed files, under the same IDs as their embeddings."""
+        if self._fingerprints is None:
+            self._fingerprints = NumpyCollection(self.fingerprint_directory)
+        return self._fingerprints
 
     def add_audio(self, embedding, metadata):
         """
@@ -19,6 +85,30 @@ class AudioVectorDB:
         )
         return audio_id
 
+    def add_many(self, embeddings, metadatas, ids, batch_size=ADD_BATCH_SIZE, fingerprints=None):
+        """
+        Writes many embeddings in batches. Existing IDs are overwritten,
+        so writing the same files twice never creates duplicates.
+        Fingerprints, if given, are stored beside the index under the same
+        IDs; embeddings may then be None to store fingerprints only.
+        """
+        if fingerprints is not None:
+            for start in range(0, len(ids), batch_size):
+                end = start + batch_size
+                self.fingerprints.upsert(fingerprints[start:end], metadatas[start:end], ids[start:end])
+        if embeddings is None:
+            return
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            batch = embeddings[start:end]
+            if self.backend == "chroma":
+                batch = [list(map(float, embedding)) for embedding in batch]
+            self.collection.upsert(
+                embeddings=batch,
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+
     def query_audio(self, embedding, n_results=5):
         """
         Queries the database for similar audio files.
@@ -28,3 +118,134 @@ class AudioVectorDB:
             n_results=n_results
         )
         return results
+
+    def get_embeddings(self, ids):
+        """Returns {id: embedding} for the given IDs that have a stored embedding."""
+        found = self.collection.get(ids=list(ids), include=["embeddings"])
+        return dict(zip(found["ids"], found["embeddings"]))
+
+    def iter_embeddings(self, page_size=ADD_BATCH_SIZE * 8):
+        """Yields (ids, metadatas, embeddings) pages of the whole collection."""
+        for offset in range(0, self.collection.count(), page_size):
+            page = self.collection.get(include=["embeddings", "metadatas"], limit=page_size, offset=offset)
+            yield page["ids"], page["metadatas"], page["embeddings"]
+
+    def query_many(self, embeddings, n_results=5):
+        """Queries the database with several embeddings in one call."""
+        if self.collection.count() == 0:
+            return {"ids": [[] for _ in embeddings], "metadatas": [[] for _ in embeddings],
+                    "distances": [[] for _ in embeddings]}
+        return self.collection.query(
+            query_embeddings=[list(map(float, embedding)) for embedding in embeddings],
+            n_results=min(n_results, self.collection.count())
+        )
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_manifest(self):
+        # Write to a temp file first so an interrupted run never leaves a corrupt manifest
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def sync_folder(self, folder_path, files, model_id, require_fingerprints=False):
+        """
+        Compares the files of a folder with the manifest of indexed files.
+
+        A file whose size and mtime match its manifest entry is skipped without
+        being read; otherwise it is hashed, and only content that is not already
+        indexed with model_id needs embedding. Entries for files that are no
+        longer in the folder are removed, and their embeddings deleted once no
+        other indexed file has the same content. With require_fingerprints,
+        files indexed without a fingerprint are queued again as well.
+        Returns (files to embed as (path, sha256) pairs, number of removed files).
+        """
+        folder = os.path.abspath(folder_path)
+        current = set()
+        todo = []
+        queued = set()
+        stale = False
+        fingerprinted = set(self.fingerprints.get(include=[])["ids"]) if require_fingerprints else None
+        indexed = {(entry["sha256"], entry["model"]) for entry in self.manifest.values()
+                   if fingerprinted is None or audio_id(entry["sha256"]) in fingerprinted}
+        for file_path in files:
+            path = os.path.abspath(file_path)
+            current.add(path)
+            stat = os.stat(path)
+            entry = self.manifest.get(path)
+            if (entry is not None and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime
+                    and (entry["sha256"], entry["model"]) in indexed and entry["model"] == model_id):
+                continue
+            sha256 = file_sha256(path)
+            if (sha256, model_id) in indexed:
+                # Touched or copied file whose content is already in the index
+                self.manifest[path] = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256, "model": model_id}
+                continue
+            if entry is not None:
+                # The old embedding of a changed file is stale whether or not the new one succeeds
+                del self.manifest[path]
+                stale = True
+            if sha256 in queued:
+                # Same content as a file already queued: recorded once that one is written
+                self._duplicates.setdefault(sha256, []).append(path)
+            else:
+                queued.add(sha256)
+                todo.append((path, sha256))
+
+        removed = [path for path in self.manifest
+                   if os.path.dirname(path) == folder and path not in current]
+        for path in removed:
+            del self.manifest[path]
+        if removed or stale:
+            self._delete_orphans()
+        self.save_manifest()
+        return todo, len(removed)
+
+    def record(self, entries, model_id):
+        """Adds (path, sha256) pairs that were just written, and files with the same content, to the manifest."""
+        for path, sha256 in entries:
+            for same_path in [path] + self._duplicates.pop(sha256, []):
+                stat = os.stat(same_path)
+                self.manifest[same_path] = {
+                    "size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256, "model": model_id
+                }
+        self.save_manifest()
+
+    def _delete_orphans(self):
+        """
+        Deletes embeddings (and fingerprints) that no manifest entry points to
+        any more, and repoints the metadata of shared content at a file that
+        still exists.
+        """
+        paths = {}
+        for path, entry in self.manifest.items():
+            paths.setdefault(audio_id(entry["sha256"]), path)
+        self._prune(self.collection, paths)
+        if os.path.isdir(self.fingerprint_directory):
+            self._prune(self.fingerprints, paths)
+
+    @staticmethod
+    def _prune(collection, paths):
+        stored = collection.get(include=["metadatas"])
+        orphans = []
+        moved_ids, moved_metadatas = [], []
+        for id_, metadata in zip(stored["ids"], stored["metadatas"]):
+            # Segment IDs add "-<index>" to the content hash
+            content_id = id_.split("-")[0]
+            if content_id in paths:
+                if metadata.get("path") != paths[content_id]:
+                    path = paths[content_id]
+                    moved_ids.append(id_)
+                    moved_metadatas.append(dict(metadata, path=path, filename=os.path.basename(path)))
+            elif len(content_id) == 32:
+                # Entries added by add_audio have random UUIDs and are left alone
+                orphans.append(id_)
+        if orphans:
+            collection.delete(ids=orphans)
+        if moved_ids:
+            collection.update(ids=moved_ids, metadatas=moved_metadatas)
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import numpy as np
+
+DEFAULT_CACHE_DIRECTORY = "./waveform_cache"
+DEFAULT_MAX_BYTES = 10 * 1024 ** 3
+
+
+class WaveformCache:
+    """
+    On-disk cache of decoded, preprocessed waveforms with LRU eviction.
+
+    Entries are keyed on the file's content hash and the target sample rate,
+    so a renamed file still hits and an edited one misses. Each waveform is
+    stored as a .npy array of float16 (or int16, scaled from [-1, 1]), half
+    the size of float32 samples. Reading one back is a single sequential
+    read plus a conversion to float32, a fraction of the cost of decoding
+    and resampling the original. An SQLite index tracks sizes and last access
+    times; once the cache exceeds max_bytes the least recently used
+    waveforms are deleted. Several processes (e.g. ingest workers) can
+    share one cache directory.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES, dtype="float16"):
+        if dtype not in ("float16", "int16"):
+            raise ValueError("dtype must be 'float16' or 'int16'")
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS waveforms (key TEXT PRIMARY KEY, size INTEGER, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS waveforms_last_access ON waveforms (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(sha256, sample_rate):
+        return f"{sha256[:32]}-{sample_rate}"
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npy")
+
+    def get(self, key):
+        """Returns the cached waveform as a float32 array of samples, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM waveforms WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE waveforms SET last_access = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+        try:
+            # Read whole: every sample is converted to float32 right away, so mapping the file would gain nothing
+            samples = np.load(self._path(key)) if row is not None else None
+        except (OSError, ValueError):
+            # Evicted by another process in the meantime
+            samples = None
+        if samples is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self._to_float32(samples)
+
+    @staticmethod
+    def _to_float32(stored):
+        if stored.dtype == np.int16:
+            return stored.astype(np.float32) / 32767
+        return stored.astype(np.float32)
+
+    def put(self, key, samples):
+        """
+        Stores a 1-D array of samples in [-1, 1] and evicts old entries beyond
+        max_bytes. Returns the samples as get() will return them, i.e. after
+        rounding to the cache's dtype, so a miss and later hits agree.
+        """
+        if self.dtype == "int16":
+            stored = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+        else:
+            stored = np.asarray(samples, dtype=np.float16)
+        # Write under a unique name and rename, so readers never see a partial file
+        tmp_path = os.path.join(self.directory, f"{key}.{uuid.uuid4().hex}.tmp.npy")
+        np.save(tmp_path, stored)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO waveforms VALUES (?, ?, ?)",
+                               (key, os.path.getsize(self._path(key)), time.time()))
+            self._evict()
+            self._conn.commit()
+        return self._to_float32(stored)
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM waveforms").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM waveforms ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM waveforms WHERE key = ?", (key,))
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            total -= size
+
+    def stats(self):
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM waveforms").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": size}
@@ -1,18 +1,45 @@
 import streamlit as st
 import os
 import time
+import wave
 import numpy as np
 from collections import deque
 import sounddevice as sd
-import io
-import wave
-from translator_engine import recognize_speech_from_mic, translate_text, text_to_speech, LANGUAGES
+import queue
+from functools import partial
+from translator_engine import (
+    recognize_speech_from_mic, translate_text, text_to_speech, cleanup_temp_files, get_cache, LANGUAGES
+)
+from engines import ONLINE_ENGINES, OFFLINE_ENGINES, get_engine
+from streaming_pipeline import SAMPLE_RATE, StreamingTranslator, to_wav_bytes
+
+GTTS_BITRATE = 32000 # gTTS writes constant-bitrate 32 kbit/s mp3
+PLAYBACK_GAP_SECONDS = 0.3 # Slack for the browser to start a clip, so clips never overlap
 
 st.set_page_config(page_title="Voice Translator", page_icon="🎙️")
 
 st.title("🎙️ Voice to Voice Translator")
 st.markdown("Speak in one language and hear it in another!")
 
+# Output files of older versions were never deleted
+cleanup_temp_files()
+
+@st.cache_resource(show_spinner="Loading speech models...")
+def load_engines(offline):
+    """Loads the engines once per server process; they stay warm across reruns and sessions."""
+    names = OFFLINE_ENGINES if offline else ONLINE_ENGINES
+    return {stage: get_engine(stage, name) for stage, name in names.items()}
+
+def audio_format(path):
+    return "audio/wav" if path.endswith(".wav") else "audio/mp3"
+
+def clip_seconds(path):
+    """Playing time of a synthesized clip."""
+    if path.endswith(".wav"):
+        with wave.open(path, "rb") as f:
+            return f.getnframes() / f.getframerate()
+    return os.path.getsize(path) * 8 / GTTS_BITRATE
+
 def record_audio(max_duration_seconds=15):
     """Records audio from the microphone for a specified duration with progress indication."""
     
@@ -52,31 +79,109 @@ def record_audio(max_duration_seconds=15):
     
     # --- Convert to WAV bytes ---
     if audio_data:
-        audio_np = np.array(audio_data)
-        # Normalize and convert to 16-bit PCM
-        audio_int16 = (audio_np * 32767).astype(np.int16)
-        
-        wav_io = io.BytesIO()
-        with wave.open(wav_io, "wb") as wf:
-            wf.setnchannels(channels)
-            wf.setsampwidth(2)  # 2 bytes for int16
-            wf.setframerate(sample_rate)
-            wf.writeframes(audio_int16.tobytes())
-        
-        wav_io.seek(0)
-        return wav_io.getvalue()
+        return to_wav_bytes(np.array(audio_data), sample_rate)
         
     return None
 
+def stream_translation(input_lang, output_lang, engines, max_duration_seconds=60, stop_after_silence_seconds=3):
+    """
+    Translates while recording: each utterance is recognized, translated and
+    spoken as soon as the speaker pauses, instead of after the whole recording.
+    """
+    blocks = queue.Queue()
+
+    def callback(indata, frames, time, status):
+        """This is called (from a separate thread) for each audio block."""
+        blocks.put(indata[:, 0].copy())
+
+    pipeline = StreamingTranslator(
+        input_lang, output_lang,
+        recognizer=partial(recognize_speech_from_mic, engine=engines["recognizer"]),
+        translator=partial(translate_text, engine=engines["translator"]),
+        synthesizer=partial(text_to_speech, engine=engines["synthesizer"])
+    )
+    status = st.empty()
+    status.info(f"Listening for up to {max_duration_seconds} seconds. Pause between sentences; "
+                f"stop talking for {stop_after_silence_seconds} seconds to finish.")
+
+    # Each clip's player is added once the previous clip has finished, so translations don't talk over each other
+    playback = deque()
+    playing_until = 0.0
+
+    def play_next():
+        nonlocal playing_until
+        if playback and time.time() >= playing_until:
+            slot, path = playback.popleft()
+            slot.audio(path, format=audio_format(path), autoplay=True)
+            playing_until = time.time() + clip_seconds(path) + PLAYBACK_GAP_SECONDS
+
+    def show(results):
+        for result in results:
+            st.markdown(f"**{result['start']:.1f}s - {result['end']:.1f}s**")
+            if result["error"]:
+                st.warning(result["error"])
+                continue
+            st.write(f"{result['text']} → {result['translation']}")
+            if result["audio_path"]:
+                playback.append((st.empty(), result["audio_path"]))
+        play_next()
+
+    try:
+        with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, callback=callback, dtype='float32'):
+            start_time = time.time()
+            while time.time() - start_time < max_duration_seconds:
+                try:
+                    pipeline.feed(blocks.get(timeout=0.1))
+                except queue.Empty:
+                    pass
+                show(pipeline.poll())
+                silence = pipeline.segmenter.seconds_since_speech()
+                if silence is not None and silence >= stop_after_silence_seconds:
+                    break
+        # Audio captured after the last block was read
+        while not blocks.empty():
+            pipeline.feed(blocks.get())
+        pipeline.finish()
+        status.info("Finishing the last sentences...")
+        show(pipeline.drain())
+        while playback:
+            time.sleep(0.1)
+            play_next()
+        status.success("Done!")
+    except Exception as e:
+        st.error(f"An error occurred during streaming: {e}")
+    finally:
+        pipeline.close()
+
 # Sidebar for Language Selection
 with st.sidebar:
     st.header("Settings")
     input_lang = st.selectbox("Input Language", list(LANGUAGES.keys()), index=0)
     output_lang = st.selectbox("Output Language", list(LANGUAGES.keys()), index=1)
+    streaming = st.checkbox("Streaming mode", help="Translate each sentence as soon as you pause")
+    offline = st.radio("Engines", ["Online (Google)", "Offline (local models)"]) == "Offline (local models)"
+    # Loaded before recording starts, so the first sentence doesn't wait for the models
+    try:
+        engines = load_engines(offline)
+        engines["synthesizer"].warm_up(output_lang)
+    except ImportError as e:
+        st.error(f"Offline engines are not installed ({e}). Run: pip install -r requirements.txt")
+        st.stop()
+    except OSError as e:
+        # Missing or partly downloaded weights; Hugging Face Hub errors are OSErrors as well
+        st.error(f"Could not load the offline models ({e}). They are downloaded from the Hugging Face Hub "
+                 "on first use, so run once with a network connection, or check the models in the HF_HOME cache. "
+                 "Missing packages: pip install -r requirements.txt")
+        st.stop()
+    cache_stats = get_cache().stats()
+    st.caption(f"Cache: {cache_stats['entries']} phrases, {cache_stats['bytes'] / 1024 ** 2:.1f} MB, "
+               f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
 
 # Audio Recorder
 st.subheader("1. Record your Voice")
-if st.button("Start Recording"):
+if streaming and st.button("Start Talking"):
+    stream_translation(input_lang, output_lang, engines)
+elif not streaming and st.button("Start Recording"):
     audio_bytes = record_audio()
 
     if audio_bytes:
@@ -89,7 +194,7 @@ if st.button("Start Recording"):
 
         # 2. Transcribe
         with st.spinner(f"Transcribing {input_lang}..."):
-            text_input = recognize_speech_from_mic(temp_input_path, input_lang)
+            text_input = recognize_speech_from_mic(temp_input_path, input_lang, engines["recognizer"])
             
         if text_input:
             st.success("Transcription Complete!")
@@ -97,18 +202,18 @@ if st.button("Start Recording"):
 
             # 3. Translate
             with st.spinner(f"Translating to {output_lang}..."):
-                translated_text = translate_text(text_input, output_lang)
+                translated_text = translate_text(text_input, output_lang, input_lang, engines["translator"])
                 
             st.text_area("Translated Text", value=translated_text, height=100, disabled=True)
 
             # 4. Text to Speech
             if translated_text and not translated_text.startswith("Translation Error"):
                 with st.spinner("Generating Audio..."):
-                    output_audio_path = text_to_speech(translated_text, output_lang)
+                    output_audio_path = text_to_speech(translated_text, output_lang, engines["synthesizer"])
                     
                 if output_audio_path:
                     st.subheader("Result Audio")
-                    st.audio(output_audio_path, format="audio/mp3")
+                    st.audio(output_audio_path, format=audio_format(output_audio_path))
                     
         else:
             st.error("Could not understand audio. Please try again.")
@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import numpy as np
+from engines import LANGUAGES, ONLINE_ENGINES, OFFLINE_ENGINES, get_engine
+
+# One everyday sentence per language, as a kiosk would hear it
+SAMPLE_PHRASES = {
+    "English": "Where is the nearest train station?",
+    "Hindi": "निकटतम रेलवे स्टेशन कहाँ है?",
+    "Tamil": "அருகிலுள்ள ரயில் நிலையம் எங்கே?",
+    "French": "Où est la gare la plus proche ?",
+    "Arabic": "أين أقرب محطة قطار؟"
+}
+
+
+def load_engine(stage, name):
+    start = time.perf_counter()
+    engine = get_engine(stage, name)
+    return engine, time.perf_counter() - start
+
+
+def timed(call, rounds):
+    """Runs call() rounds + 1 times; returns (first output, cold seconds, warm seconds of the others)."""
+    start = time.perf_counter()
+    output = call()
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        call()
+        warm.append(time.perf_counter() - start)
+    return output, cold, warm
+
+
+def row(stage, name, language, load_seconds, output, cold, warm):
+    warm_ms = np.array(warm or [cold]) * 1000
+    return {
+        "stage": stage, "engine": name, "language": language,
+        "load_seconds": load_seconds, "cold_ms": cold * 1000,
+        "p50_ms": float(np.percentile(warm_ms, 50)), "p90_ms": float(np.percentile(warm_ms, 90)),
+        "output": output
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-stage latency of the online and offline engines.")
+    parser.add_argument("--languages", nargs="+", choices=list(LANGUAGES), default=list(LANGUAGES),
+                        help="Source languages to test")
+    parser.add_argument("--target", choices=list(LANGUAGES), default="English",
+                        help="Translation target (English sources are translated to French)")
+    parser.add_argument("--rounds", type=int, default=5, help="Warm repetitions per measurement")
+    parser.add_argument("--audio-dir", help="Folder of recordings named <Language>.wav to recognize "
+                                            "(default: the offline voice reading the sample phrase)")
+    parser.add_argument("--output", help="Optional JSON file for the results")
+    args = parser.parse_args()
+
+    engines = {}
+    for setting in (ONLINE_ENGINES, OFFLINE_ENGINES):
+        for stage, name in setting.items():
+            try:
+                engines[(stage, name)] = load_engine(stage, name)
+                print(f"Loaded {stage} '{name}' in {engines[(stage, name)][1]:.1f}s")
+            except Exception as e:
+                print(f"Skipping {stage} '{name}': {e}")
+
+    results = []
+
+    def measure(stage, name, language, call):
+        if (stage, name) not in engines:
+            return None
+        engine, load_seconds = engines[(stage, name)]
+        try:
+            output, cold, warm = timed(lambda: call(engine), args.rounds)
+        except Exception as e:
+            print(f"{stage} '{name}' failed on {language}: {e}")
+            return None
+        results.append(row(stage, name, language, load_seconds, output, cold, warm))
+        return output
+
+    with tempfile.TemporaryDirectory() as scratch:
+        for language in args.languages:
+            phrase = SAMPLE_PHRASES[language]
+            target = "French" if language == args.target else args.target
+            print(f"\nMeasuring {language} -> {target}...")
+            # Every synthesizer writes to its own file; the offline voice's wav doubles as recognizer input
+            speech = {}
+            for name in (ONLINE_ENGINES["synthesizer"], OFFLINE_ENGINES["synthesizer"]):
+                engine = engines.get(("synthesizer", name), (None,))[0]
+                if engine is None:
+                    continue
+                path = os.path.join(scratch, f"{language}_{name}{engine.suffix}")
+                if measure("synthesizer", name, language,
+                           lambda engine: engine.synthesize(phrase, language, path) or path) is not None:
+                    speech[name] = path
+
+            recording = os.path.join(args.audio_dir, f"{language}.wav") if args.audio_dir else None
+            if recording is None or not os.path.exists(recording):
+                recording = speech.get(OFFLINE_ENGINES["synthesizer"])
+            if recording is None:
+                print(f"No wav audio to recognize for {language}; pass --audio-dir with {language}.wav")
+            else:
+                for name in (ONLINE_ENGINES["recognizer"], OFFLINE_ENGINES["recognizer"]):
+                    measure("recognizer", name, language, lambda engine: engine.recognize(recording, language))
+
+            for name in (ONLINE_ENGINES["translator"], OFFLINE_ENGINES["translator"]):
+                measure("translator", name, language, lambda engine: engine.translate(phrase, target, language))
+
+    print("\n| Stage | Engine | Language | Load (s) | Cold (ms) | p50 (ms) | p90 (ms) |")
+    print("| --- | --- | --- | --- | --- | --- | --- |")
+    for res in results:
+        print(f"| {res['stage']} | {res['engine']} | {res['language']} | {res['load_seconds']:.1f} | "
+              f"{res['cold_ms']:.0f} | {res['p50_ms']:.0f} | {res['p90_ms']:.0f} |")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\nWrote the results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
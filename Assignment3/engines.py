@@ -0,0 +1,265 @@
+import threading
+import wave
+import numpy as np
+import speech_recognition as sr
+from deep_translator import GoogleTranslator
+from gtts import gTTS
+
+# Language Mapping
+LANGUAGES = {
+    "English": "en",
+    "Hindi": "hi",
+    "Tamil": "ta",
+    "French": "fr",
+    "Arabic": "ar"
+}
+
+# Speech Recognition Language Codes (BCP-47)
+SR_LANG_CODES = {
+    "English": "en-US",
+    "Hindi": "hi-IN",
+    "Tamil": "ta-IN",
+    "French": "fr-FR",
+    "Arabic": "ar-SA"
+}
+
+# ISO 639-3 codes used by the MMS speech synthesis models
+MMS_LANG_CODES = {
+    "English": "eng",
+    "Hindi": "hin",
+    "Tamil": "tam",
+    "French": "fra",
+    "Arabic": "ara"
+}
+
+WHISPER_MODEL = "small" # Smaller Whisper models do poorly on Tamil and Hindi
+M2M100_MODEL = "facebook/m2m100_418M"
+CPU_THREADS = 4 # torch's share is process-wide, see M2M100Translator
+
+
+def read_wav(audio_data, sample_rate=16000):
+    """Reads a wav file path or file-like object as mono float32 samples at sample_rate."""
+    with wave.open(audio_data, "rb") as wf:
+        frames = wf.readframes(wf.getnframes())
+        channels, width, source_rate = wf.getnchannels(), wf.getsampwidth(), wf.getframerate()
+    if width != 2:
+        raise ValueError("Only 16-bit PCM wav audio is supported")
+    samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if source_rate != sample_rate:
+        positions = np.arange(int(len(samples) * sample_rate / source_rate)) * source_rate / sample_rate
+        samples = np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+    return samples
+
+
+def write_wav(path, samples, sample_rate):
+    """Writes mono float samples in [-1, 1] as a 16-bit PCM wav file."""
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+
+class Recognizer:
+    """Speech to text. recognize() returns the transcript, or None if nothing was understood."""
+    name = None
+
+    def recognize(self, audio_data, language_name):
+        raise NotImplementedError
+
+
+class Translator:
+    """Text to text. source_language_name may be None to detect the language."""
+    name = None
+
+    def translate(self, text, target_language_name, source_language_name=None):
+        raise NotImplementedError
+
+
+class Synthesizer:
+    """Text to speech, written to a file with the engine's suffix."""
+    name = None
+    suffix = ".wav"
+
+    @property
+    def voice(self):
+        """Identifies the voice in cache keys."""
+        return self.name
+
+    def warm_up(self, language_name):
+        """Loads whatever the engine needs for a language ahead of the first request."""
+        pass
+
+    def synthesize(self, text, language_name, path):
+        raise NotImplementedError
+
+
+class GoogleRecognizer(Recognizer):
+    """Google Web Speech API via speech_recognition (online)."""
+    name = "google"
+
+    def recognize(self, audio_data, language_name):
+        recognizer = sr.Recognizer()
+        with sr.AudioFile(audio_data) as source:
+            audio = recognizer.record(source)
+        try:
+            return recognizer.recognize_google(audio, language=SR_LANG_CODES.get(language_name, "en-US"))
+        except sr.UnknownValueError:
+            return None
+
+
+class GoogleTranslatorEngine(Translator):
+    """Google Translate via deep_translator (online)."""
+    name = "google"
+
+    def __init__(self):
+        self._clients = {} # (source, target) -> (GoogleTranslator, its lock)
+        self._lock = threading.Lock() # Guards _clients only
+
+    def get_client(self, source_code, target_code):
+        """Returns the GoogleTranslator for the language pair and its lock, created on first use and reused."""
+        with self._lock:
+            if (source_code, target_code) not in self._clients:
+                client = GoogleTranslator(source=source_code, target=target_code)
+                self._clients[(source_code, target_code)] = (client, threading.Lock())
+            return self._clients[(source_code, target_code)]
+
+    def translate(self, text, target_language_name, source_language_name=None):
+        target_code = LANGUAGES.get(target_language_name, "en")
+        source_code = LANGUAGES.get(source_language_name, "auto")
+        client, lock = self.get_client(source_code, target_code)
+        # A translator keeps per-request state, so one pair's client serves one request at a time;
+        # other language pairs go through their own clients meanwhile
+        with lock:
+            return client.translate(text)
+
+
+class GTTSSynthesizer(Synthesizer):
+    """Google Text-to-Speech (online). tld picks the accent, e.g. "com" or "co.uk"."""
+    name = "gtts"
+    suffix = ".mp3"
+
+    def __init__(self, tld="com"):
+        self.tld = tld
+
+    @property
+    def voice(self):
+        return f"gtts:{self.tld}"
+
+    def synthesize(self, text, language_name, path):
+        gTTS(text=text, lang=LANGUAGES.get(language_name, "en"), tld=self.tld, slow=False).save(path)
+
+
+class WhisperRecognizer(Recognizer):
+    """Whisper via faster-whisper with int8 weights on the CPU (offline)."""
+    name = "whisper"
+
+    def __init__(self, model_size=WHISPER_MODEL, threads=CPU_THREADS):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(model_size, device="cpu", compute_type="int8", cpu_threads=threads)
+        self._lock = threading.Lock()
+
+    def recognize(self, audio_data, language_name):
+        samples = read_wav(audio_data)
+        with self._lock:
+            # Greedy decoding: beam search costs several times more for little gain on short utterances
+            segments, _ = self.model.transcribe(samples, language=LANGUAGES.get(language_name, "en"), beam_size=1)
+            text = " ".join(segment.text.strip() for segment in segments).strip()
+        return text or None
+
+
+class M2M100Translator(Translator):
+    """
+    M2M100 many-to-many translation with transformers on the CPU (offline).
+    It covers every pair of LANGUAGES directly, without pivoting through English.
+    torch.set_num_threads(threads) applies to the whole process, so it also
+    sets the threads of MMSSynthesizer and any other torch model loaded here.
+    """
+    name = "m2m100"
+
+    def __init__(self, model_name=M2M100_MODEL, threads=CPU_THREADS):
+        import torch
+        from transformers import M2M100ForConditionalGeneration, M2M100Tokenizer
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.tokenizer = M2M100Tokenizer.from_pretrained(model_name)
+        self.model = M2M100ForConditionalGeneration.from_pretrained(model_name).eval()
+        self._lock = threading.Lock()
+
+    def translate(self, text, target_language_name, source_language_name=None):
+        if source_language_name is None:
+            raise ValueError("The offline translator needs the source language")
+        with self._lock, self.torch.inference_mode():
+            # src_lang is tokenizer state, hence the lock
+            self.tokenizer.src_lang = LANGUAGES[source_language_name]
+            inputs = self.tokenizer(text, return_tensors="pt")
+            generated = self.model.generate(
+                **inputs, forced_bos_token_id=self.tokenizer.get_lang_id(LANGUAGES[target_language_name]),
+                num_beams=1, max_new_tokens=256
+            )
+            return self.tokenizer.batch_decode(generated, skip_special_tokens=True)[0]
+
+
+class MMSSynthesizer(Synthesizer):
+    """
+    Massively Multilingual Speech (VITS) voices with transformers on the CPU
+    (offline). One small model per language, loaded on first use and kept.
+    Like M2M100Translator, it sets torch's process-wide thread count.
+    """
+    name = "mms"
+
+    def __init__(self, threads=CPU_THREADS):
+        import torch
+        torch.set_num_threads(threads)
+        self.torch = torch
+        self.voices = {}
+        self.uroman = None
+        self._lock = threading.Lock()
+
+    def load(self, language_name):
+        from transformers import AutoTokenizer, VitsModel
+        code = MMS_LANG_CODES[language_name]
+        if code not in self.voices:
+            model_name = f"facebook/mms-tts-{code}"
+            self.voices[code] = (AutoTokenizer.from_pretrained(model_name),
+                                 VitsModel.from_pretrained(model_name).eval())
+        return self.voices[code]
+
+    def warm_up(self, language_name):
+        with self._lock:
+            self.load(language_name)
+
+    def synthesize(self, text, language_name, path):
+        with self._lock, self.torch.inference_mode():
+            tokenizer, model = self.load(language_name)
+            if getattr(tokenizer, "is_uroman", False):
+                # Voices trained on romanized text, e.g. for non-Latin scripts
+                if self.uroman is None:
+                    from uroman import Uroman
+                    self.uroman = Uroman()
+                text = self.uroman.romanize_string(text)
+            waveform = model(**tokenizer(text, return_tensors="pt")).waveform[0].numpy()
+        write_wav(path, waveform, model.config.sampling_rate)
+
+
+ENGINES = {
+    "recognizer": {"google": GoogleRecognizer, "whisper": WhisperRecognizer},
+    "translator": {"google": GoogleTranslatorEngine, "m2m100": M2M100Translator},
+    "synthesizer": {"gtts": GTTSSynthesizer, "mms": MMSSynthesizer}
+}
+ONLINE_ENGINES = {"recognizer": "google", "translator": "google", "synthesizer": "gtts"}
+OFFLINE_ENGINES = {"recognizer": "whisper", "translator": "m2m100", "synthesizer": "mms"}
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+def get_engine(stage, name):
+    """Returns the engine for a stage, loading it on first use and keeping it for the life of the process."""
+    if name not in ENGINES[stage]:
+        raise ValueError(f"Unknown {stage}: {name}. Choose one of {list(ENGINES[stage])}.")
+    with _load_lock:
+        if (stage, name) not in _loaded:
+            _loaded[(stage, name)] = ENGINES[stage][name]()
+        return _loaded[(stage, name)]
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+CACHE_DIRECTORY = "./speech_cache"
+CACHE_MAX_BYTES = 512 * 1024 ** 2 # Disk budget for cached translations and audio
+MEMORY_ITEMS = 1024 # Recent entries kept in memory in front of the disk store
+
+
+def cache_key(kind, *parts):
+    """Content address of a cached result, e.g. cache_key("translation", text, source, target)."""
+    return hashlib.sha256(json.dumps([kind, *parts], ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SpeechCache:
+    """
+    Cache of translations and synthesized speech for phrases heard again and again.
+
+    A small in-memory LRU sits in front of a size-bounded disk store.
+    Translations are kept as text in an SQLite index; audio is kept as one
+    file per key next to it. The index also tracks sizes and last access
+    times, and once the store exceeds max_bytes the least recently used
+    entries are deleted. Hits served from memory are written back to the
+    index in bulk, at the next insert, so the disk order stays true without
+    a write per hit. Safe to share between threads.
+    """
+
+    def __init__(self, directory=CACHE_DIRECTORY, max_bytes=CACHE_MAX_BYTES, memory_items=MEMORY_ITEMS):
+        self.directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.touched = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, "index.sqlite"), timeout=30, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, text TEXT, filename TEXT, size INTEGER, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def _lookup(self, key):
+        """Returns ("text", text) or ("file", path) for a cached key, or None."""
+        with self._lock:
+            value = self.memory.get(key)
+            if value is not None and (value[0] == "text" or os.path.exists(value[1])):
+                self.memory.move_to_end(key)
+                self.touched[key] = time.time()
+                self.hits += 1
+                return value
+            row = self._conn.execute("SELECT text, filename FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                value = ("text", row[0]) if row[1] is None else ("file", os.path.join(self.directory, row[1]))
+                if value[0] == "text" or os.path.exists(value[1]):
+                    self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+                    self._remember(key, value)
+                    self.hits += 1
+                    return value
+            self.memory.pop(key, None)
+            self.misses += 1
+            return None
+
+    def _store(self, key, value, size):
+        with self._lock:
+            text, filename = (value[1], None) if value[0] == "text" else (None, os.path.basename(value[1]))
+            self._conn.executemany("UPDATE entries SET last_access = ? WHERE key = ?",
+                                   [(accessed, touched) for touched, accessed in self.touched.items()])
+            self.touched.clear()
+            self._conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                               (key, text, filename, size, time.time()))
+            self._evict(keep=key)
+            self._conn.commit()
+            self._remember(key, value)
+
+    def _evict(self, keep=None):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # The entry just stored is kept even if it alone is over the limit
+        for key, filename, size in self._conn.execute(
+                "SELECT key, filename, size FROM entries WHERE key != ? ORDER BY last_access", (keep,)).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.memory.pop(key, None)
+            if filename is not None:
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                except OSError:
+                    pass
+            total -= size
+
+    def get_text(self, key):
+        value = self._lookup(key)
+        return value[1] if value is not None else None
+
+    def put_text(self, key, text):
+        self._store(key, ("text", text), len(text.encode("utf-8")))
+
+    def get_file(self, key):
+        """Returns the path of a cached file, or None."""
+        value = self._lookup(key)
+        return value[1] if value is not None else None
+
+    def put_file(self, key, write, suffix=".mp3"):
+        """
+        Stores a file written by write(path) and returns its cached path.
+        The file is written under a temporary name and renamed, so readers
+        never see a partial file.
+        """
+        path = os.path.join(self.directory, key + suffix)
+        tmp_path = os.path.join(self.directory, f"{key}.{uuid.uuid4().hex}.tmp{suffix}")
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._store(key, ("file", path), os.path.getsize(path))
+        return path
+
+    def stats(self):
+        with self._lock:
+            count, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": size,
+                    "memory_entries": len(self.memory)}
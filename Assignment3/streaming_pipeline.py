@@ -0,0 +1,262 @@
+import io
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from translator_engine import recognize_speech_from_mic, translate_text, text_to_speech
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30 # Voice activity is decided per frame of this length
+SPEECH_MARGIN_DB = 12 # How far above the noise floor a frame must be to count as speech
+MIN_SPEECH_DB = -45 # Frames quieter than this (dBFS) are never speech
+MIN_SILENCE_MS = 600 # Pause that ends an utterance
+MIN_SPEECH_MS = 250 # Shorter bursts are dropped as clicks or noise
+PRE_ROLL_MS = 200 # Audio kept from before the detected onset, so first syllables aren't clipped
+MAX_UTTERANCE_SECONDS = 12 # Long monologues are cut so translation can start
+PIPELINE_WORKERS = 3 # Utterances processed at the same time
+
+
+def to_wav_bytes(samples, sample_rate=SAMPLE_RATE):
+    """Converts float samples in [-1, 1] to mono 16-bit PCM wav bytes."""
+    audio_int16 = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+    wav_io = io.BytesIO()
+    with wave.open(wav_io, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2) # 2 bytes for int16
+        wf.setframerate(sample_rate)
+        wf.writeframes(audio_int16.tobytes())
+    return wav_io.getvalue()
+
+
+class UtteranceSegmenter:
+    """
+    Splits a live stream of samples into utterances by voice activity.
+
+    Each frame's level is compared with a running estimate of the noise
+    floor, so the detector adapts to a quiet room or a noisy kiosk. The
+    floor only adapts between utterances, so a held vowel or tone never
+    becomes the floor. An utterance starts at the first speech frame (plus
+    a little pre-roll) and ends after MIN_SILENCE_MS without speech, or at
+    MAX_UTTERANCE_SECONDS.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS, margin_db=SPEECH_MARGIN_DB,
+                 min_speech_db=MIN_SPEECH_DB, min_silence_ms=MIN_SILENCE_MS, min_speech_ms=MIN_SPEECH_MS,
+                 pre_roll_ms=PRE_ROLL_MS, max_utterance_seconds=MAX_UTTERANCE_SECONDS):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.margin_db = margin_db
+        self.min_speech_db = min_speech_db
+        self.silence_frames = max(1, min_silence_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_frames = int(max_utterance_seconds * 1000 / frame_ms)
+        self.pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self.noise_floor_db = None
+        self.quietest_db = float("inf") # Quietest frame of the utterance in progress
+        self.buffer = np.zeros(0, dtype=np.float32)
+        self.frames = []
+        self.speech_count = 0
+        self.trailing_silence = 0
+        self.position = 0 # Samples consumed so far
+        self.start = 0
+        self.last_speech = None
+
+    def _is_speech(self, frame):
+        level_db = 10 * np.log10(np.mean(np.square(frame)) + 1e-10)
+        if self.noise_floor_db is None:
+            self.noise_floor_db = level_db
+        speech = level_db > max(self.noise_floor_db + self.margin_db, self.min_speech_db)
+        if self.frames:
+            # Frozen inside an utterance
+            self.quietest_db = min(self.quietest_db, level_db)
+        elif level_db < self.noise_floor_db:
+            # Drop to quieter levels at once, rise slowly so speech doesn't become the floor
+            self.noise_floor_db = level_db
+        else:
+            self.noise_floor_db += 0.02 * (level_db - self.noise_floor_db)
+        return speech
+
+    def feed(self, samples):
+        """Adds samples and returns the utterances completed by them as (start_s, end_s, samples)."""
+        self.buffer = np.concatenate([self.buffer, np.asarray(samples, dtype=np.float32).reshape(-1)])
+        completed = []
+        while len(self.buffer) >= self.frame_length:
+            frame, self.buffer = self.buffer[:self.frame_length], self.buffer[self.frame_length:]
+            self.position += len(frame)
+            speech = self._is_speech(frame)
+            if speech:
+                self.last_speech = self.position
+            if not self.frames:
+                if speech:
+                    self.frames = list(self.pre_roll) + [frame]
+                    self.start = self.position - len(self.frames) * self.frame_length
+                    self.speech_count = 1
+                    self.trailing_silence = 0
+                else:
+                    self.pre_roll.append(frame)
+                continue
+            self.frames.append(frame)
+            if speech:
+                self.speech_count += 1
+                self.trailing_silence = 0
+            else:
+                self.trailing_silence += 1
+            if len(self.frames) >= self.max_frames:
+                # Nothing in the cut was quiet enough to end it, so the background may have
+                # grown louder: restart the floor from the quietest frame heard
+                self.noise_floor_db = max(self.noise_floor_db, self.quietest_db)
+            if self.trailing_silence >= self.silence_frames or len(self.frames) >= self.max_frames:
+                utterance = self._close()
+                if utterance is not None:
+                    completed.append(utterance)
+        return completed
+
+    def flush(self):
+        """Ends the stream and returns the utterance in progress, if any, as a list."""
+        utterance = self._close() if self.frames else None
+        return [utterance] if utterance is not None else []
+
+    def _close(self):
+        # Trailing silence beyond a short tail carries nothing to recognize
+        keep = len(self.frames) - max(0, self.trailing_silence - self.pre_roll.maxlen)
+        frames, speech_count = self.frames[:keep], self.speech_count
+        self.frames = []
+        self.pre_roll.clear()
+        self.speech_count = self.trailing_silence = 0
+        self.quietest_db = float("inf")
+        if speech_count < self.min_speech_frames:
+            return None
+        samples = np.concatenate(frames)
+        start = self.start / self.sample_rate
+        return start, start + len(samples) / self.sample_rate, samples
+
+    def seconds_since_speech(self):
+        """Seconds of audio since the last speech frame, or None if nobody has spoken yet."""
+        if self.last_speech is None:
+            return None
+        return (self.position - self.last_speech) / self.sample_rate
+
+
+class StreamingTranslator:
+    """
+    Speech-to-speech translation that runs while audio is still coming in.
+
+    Captured samples are fed to an UtteranceSegmenter. Every finished
+    utterance goes through recognizer -> translator -> synthesizer on a
+    thread pool, so one utterance is recognized while the previous one is
+    translated or spoken. Results come back in utterance order.
+
+    The three stages are plain callables with the signatures of
+    translator_engine's recognize_speech_from_mic(audio, language_name),
+    translate_text(text, target_language_name, source_language_name) and
+    text_to_speech(text, language_name), so local stand-ins can replace
+    the speech engines.
+    """
+
+    def __init__(self, input_language, output_language, recognizer=recognize_speech_from_mic,
+                 translator=translate_text, synthesizer=text_to_speech, segmenter=None,
+                 workers=PIPELINE_WORKERS):
+        self.input_language = input_language
+        self.output_language = output_language
+        self.recognizer = recognizer
+        self.translator = translator
+        self.synthesizer = synthesizer
+        self.segmenter = segmenter or UtteranceSegmenter()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.pending = deque()
+        self.count = 0
+
+    def feed(self, samples):
+        """Adds captured samples; finished utterances are queued for translation."""
+        for utterance in self.segmenter.feed(samples):
+            self._submit(utterance)
+
+    def finish(self):
+        """Ends the input; the utterance in progress is queued as well."""
+        for utterance in self.segmenter.flush():
+            self._submit(utterance)
+
+    def _submit(self, utterance):
+        self.pending.append(self.executor.submit(self._process, self.count, utterance, time.perf_counter()))
+        self.count += 1
+
+    def _process(self, index, utterance, queued):
+        start, end, samples = utterance
+        result = {"index": index, "start": start, "end": end, "text": None, "translation": None,
+                  "audio_path": None, "error": None}
+        # speech_recognition reads wav data from any file-like object
+        text = self.recognizer(io.BytesIO(to_wav_bytes(samples, self.segmenter.sample_rate)), self.input_language)
+        if not text:
+            result["error"] = "Could not understand audio."
+        elif text.startswith(("API Error: ", "Error: ")):
+            result["error"] = text
+        else:
+            result["text"] = text
+            translation = self.translator(text, self.output_language, self.input_language)
+            if translation and translation.startswith("Translation Error"):
+                result["error"] = translation
+            else:
+                result["translation"] = translation
+                result["audio_path"] = self.synthesizer(translation, self.output_language) if translation else None
+        result["seconds"] = time.perf_counter() - queued
+        return result
+
+    def poll(self):
+        """Returns the results that are ready, in utterance order, without waiting."""
+        ready = []
+        while self.pending and self.pending[0].done():
+            ready.append(self.pending.popleft().result())
+        return ready
+
+    def drain(self):
+        """Waits for every queued utterance and returns the remaining results in order."""
+        ready = []
+        while self.pending:
+            ready.append(self.pending.popleft().result())
+        return ready
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def stream_file(file_path, input_language, output_language, chunk_ms=100, realtime=True, **stages):
+    """Feeds a 16 kHz mono wav file through a StreamingTranslator as if it were live input."""
+    with wave.open(file_path, "rb") as wf:
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16).astype(np.float32) / 32767
+        sample_rate = wf.getframerate()
+    pipeline = StreamingTranslator(input_language, output_language,
+                                   segmenter=UtteranceSegmenter(sample_rate=sample_rate), **stages)
+    chunk = int(sample_rate * chunk_ms / 1000)
+    started = time.perf_counter()
+    try:
+        for offset in range(0, len(samples), chunk):
+            pipeline.feed(samples[offset:offset + chunk])
+            if realtime:
+                time.sleep(max(0.0, (offset + chunk) / sample_rate - (time.perf_counter() - started)))
+            for result in pipeline.poll():
+                yield result
+        pipeline.finish()
+        for result in pipeline.drain():
+            yield result
+    finally:
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from translator_engine import LANGUAGES
+    parser = argparse.ArgumentParser(description="Translate a recorded wav file utterance by utterance.")
+    parser.add_argument("file", help="16-bit mono wav file")
+    parser.add_argument("--input-language", choices=list(LANGUAGES), default="English")
+    parser.add_argument("--output-language", choices=list(LANGUAGES), default="Hindi")
+    parser.add_argument("--fast", action="store_true", help="Feed the file as fast as possible instead of in real time")
+    args = parser.parse_args()
+    started = time.perf_counter()
+    for result in stream_file(args.file, args.input_language, args.output_language, realtime=not args.fast):
+        print(f"[{result['start']:.1f}s - {result['end']:.1f}s] ready after {time.perf_counter() - started:.1f}s "
+              f"({result['seconds']:.2f}s in the pipeline)")
+        if result["error"]:
+            print(f"  {result['error']}")
+        else:
+            print(f"  {result['text']} -> {result['translation']} ({result['audio_path']})")
@@ -0,0 +1,63 @@
+import numpy as np
+from streaming_pipeline import SAMPLE_RATE, UtteranceSegmenter
+
+rng = np.random.default_rng(0)
+
+
+def noise(seconds, level=0.003):
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * level).astype(np.float32)
+
+
+def tone(seconds, amplitude=0.3, frequency=220):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t)).astype(np.float32) + noise(seconds)
+
+
+def segment(samples, chunk_ms=100, **settings):
+    """Feeds samples in live-sized chunks and returns every utterance, including the one flushed at the end."""
+    segmenter = UtteranceSegmenter(**settings)
+    chunk = int(SAMPLE_RATE * chunk_ms / 1000)
+    utterances = []
+    for offset in range(0, len(samples), chunk):
+        utterances.extend(segmenter.feed(samples[offset:offset + chunk]))
+    return utterances + segmenter.flush()
+
+
+def test_long_tone_is_one_utterance():
+    """A held 5 s sound must not raise the noise floor and get cut short."""
+    utterances = segment(np.concatenate([noise(2), tone(5), noise(2)]))
+    assert len(utterances) == 1, f"Expected one utterance, got {len(utterances)}"
+    start, end, samples = utterances[0]
+    assert 1.7 <= start <= 2.0, f"Utterance starts at {start:.2f}s"
+    assert 6.9 <= end <= 7.5, f"Utterance ends at {end:.2f}s"
+    assert len(samples) == round((end - start) * SAMPLE_RATE)
+
+
+def test_pause_splits_utterances():
+    utterances = segment(np.concatenate([noise(1), tone(1), noise(1), tone(1.5), noise(1)]))
+    assert len(utterances) == 2, f"Expected two utterances, got {len(utterances)}"
+    assert utterances[0][1] <= utterances[1][0], "Utterances overlap"
+    assert 2.8 <= utterances[1][0] <= 3.0
+
+
+def test_clicks_and_noise_are_dropped():
+    click = tone(0.1, amplitude=0.5, frequency=2000)
+    utterances = segment(np.concatenate([noise(1), click, noise(2), noise(2, level=0.004)]))
+    assert utterances == [], f"Expected no utterances, got {[(u[0], u[1]) for u in utterances]}"
+
+
+def test_noise_floor_follows_louder_background():
+    """A lasting rise of the background is cut at the length cap and then becomes the floor."""
+    utterances = segment(np.concatenate([noise(1), noise(6, level=0.05), tone(1, amplitude=0.8), noise(2, level=0.05)]),
+                         max_utterance_seconds=3)
+    speech = [u for u in utterances if u[0] >= 6.5]
+    assert len(speech) == 1, f"Expected the tone after the noise, got {[(u[0], u[1]) for u in utterances]}"
+    assert 6.7 <= speech[0][0] <= 7.0
+
+
+if __name__ == "__main__":
+    test_long_tone_is_one_utterance()
+    test_pause_splits_utterances()
+    test_clicks_and_noise_are_dropped()
+    test_noise_floor_follows_louder_background()
+    print("All segmenter tests passed.")
@@ -1,43 +1,43 @@
 import speech_recognition as sr
-from deep_translator import GoogleTranslator
-from gtts import gTTS
+import glob
 import os
-import uuid
+import time
+from speech_cache import SpeechCache, cache_key
+# The language tables used to live here; they are re-exported for existing imports (app.py uses LANGUAGES)
+from engines import LANGUAGES, SR_LANG_CODES  # noqa: F401
+from engines import ONLINE_ENGINES, get_engine
 
-# Language Mapping
-LANGUAGES = {
-    "English": "en",
-    "Hindi": "hi",
-    "Tamil": "ta",
-    "French": "fr",
-    "Arabic": "ar"
-}
+TEMP_FILE_MAX_AGE_SECONDS = 600 # Older temp_output_*.mp3 files are no longer being played
 
-# Speech Recognition Language Codes (BCP-47)
-SR_LANG_CODES = {
-    "English": "en-US",
-    "Hindi": "hi-IN",
-    "Tamil": "ta-IN",
-    "French": "fr-FR",
-    "Arabic": "ar-SA"
-}
+_cache = None
 
-def recognize_speech_from_mic(audio_data, language_name):
+def get_cache():
+    """The translation and speech cache shared by every session of this process."""
+    global _cache
+    if _cache is None:
+        _cache = SpeechCache()
+    return _cache
+
+def cleanup_temp_files(directory=None, max_age_seconds=TEMP_FILE_MAX_AGE_SECONDS):
+    """Deletes temp_output_*.mp3 files left behind in directory (default: the working directory)."""
+    removed = 0
+    for path in glob.glob(os.path.join(directory or os.getcwd(), "temp_output_*.mp3")):
+        try:
+            if time.time() - os.path.getmtime(path) > max_age_seconds:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass
+    return removed
+
+def recognize_speech_from_mic(audio_data, language_name, engine=None):
     """
-    Recognizes speech from audio data.
+    Recognizes speech from audio data (a wav file path or file-like object).
+    engine is a Recognizer from engines.py; the default is Google's online API.
     """
-    recognizer = sr.Recognizer()
-    lang_code = SR_LANG_CODES.get(language_name, "en-US")
-    
+    engine = engine or get_engine("recognizer", ONLINE_ENGINES["recognizer"])
     try:
-        # Convert audio_data (bytes) to AudioData object if needed
-        # In this app, we might valid path or bytes. 
-        # For simplicity with streamlit-audiorecorder, we usually save to file first or process bytes.
-        # Let's assume we pass a file path for now to be robust.
-        with sr.AudioFile(audio_data) as source:
-            audio = recognizer.record(source)
-            text = recognizer.recognize_google(audio, language=lang_code)
-            return text
+        return engine.recognize(audio_data, language_name)
     except sr.UnknownValueError:
         return None
     except sr.RequestError as e:
@@ -45,29 +45,41 @@ def recognize_speech_from_mic(audio_data, language_name):
     except Exception as e:
         return f"Error: {e}"
 
-def translate_text(text, target_language_name):
+def translate_text(text, target_language_name, source_language_name=None, engine=None):
     """
     Translates text to target language.
+    Translations are cached on (text, source, target) for each engine.
     """
+    engine = engine or get_engine("translator", ONLINE_ENGINES["translator"])
     target_code = LANGUAGES.get(target_language_name, "en")
+    source_code = LANGUAGES.get(source_language_name, "auto")
+    key = cache_key("translation", text, source_code, target_code, engine.name)
+    cached = get_cache().get_text(key)
+    if cached is not None:
+        return cached
     try:
-        translator = GoogleTranslator(source='auto', target=target_code)
-        translated_text = translator.translate(text)
-        return translated_text
+        translated_text = engine.translate(text, target_language_name, source_language_name)
     except Exception as e:
         return f"Translation Error: {e}"
+    if translated_text:
+        get_cache().put_text(key, translated_text)
+    return translated_text
 
-def text_to_speech(text, target_language_name):
+def text_to_speech(text, target_language_name, engine=None):
     """
     Converts text to speech and returns the file path.
+    Audio is cached on (text, language, voice), so a repeated phrase is
+    played from the cache instead of being synthesized again.
     """
+    engine = engine or get_engine("synthesizer", ONLINE_ENGINES["synthesizer"])
     target_code = LANGUAGES.get(target_language_name, "en")
+    key = cache_key("speech", text, target_code, engine.voice)
+    cached = get_cache().get_file(key)
+    if cached is not None:
+        return cached
     try:
-        tts = gTTS(text=text, lang=target_code, slow=False)
-        filename = f"temp_output_{uuid.uuid4().hex}.mp3"
-        filepath = os.path.join(os.getcwd(), filename)
-        tts.save(filepath)
-        return filepath
+        return get_cache().put_file(key, lambda path: engine.synthesize(text, target_language_name, path),
+                                    suffix=engine.suffix)
     except Exception as e:
         print(f"TTS Error: {e}")
         return None
@@ -1,17 +1,40 @@
 import os
+import sys
+import time
 from langchain_core.prompts import PromptTemplate
 from langchain_community.llms import Ollama
 from langchain_community.chat_models import ChatOllama
 from langchain_openai import ChatOpenAI
 from langchain.chains import LLMChain
-from typing import List, Dict
+from langchain_core.globals import set_llm_cache
+from typing import List, Dict, Optional
+
+# The LLM cache lives with the Assignment1 summarizer, which shares its cache file
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "Assignment1"))
+from llm_cache import DiskLRUCache, DEFAULT_CACHE_PATH, cached_stream
 
 class LLMChainHandler:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         self.provider = os.getenv("LLM_PROVIDER", "ollama").lower()
+        self.cache = self._initialize_cache(use_cache)
         self.llm = self._initialize_llm()
         self.prompt = self._initialize_prompt()
         self.chain = self.prompt | self.llm 
+        # LangChain only caches invoke(), so streaming goes through the cache explicitly
+        self.stream_chain = self.prompt | cached_stream(self.llm, self.cache)
+        self.last_metrics: Optional[Dict] = None
+
+    def _initialize_cache(self, use_cache: bool) -> DiskLRUCache:
+        # Same default file as the Assignment1 summarizer, so both tools share cached answers
+        bypass = not use_cache or os.getenv("LLM_CACHE_DISABLED", "false").lower() == "true"
+        cache = DiskLRUCache(
+            path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+            max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+            ttl_seconds=int(os.getenv("LLM_CACHE_TTL_HOURS", "168")) * 3600,
+            bypass=bypass
+        )
+        set_llm_cache(cache)
+        return cache
 
     def _initialize_llm(self):
         if self.provider == "ollama":
@@ -45,14 +68,48 @@ class LLMChainHandler:
         """
         return PromptTemplate(template=template, input_variables=["context", "question"])
 
-    def query(self, question: str, context_docs: List[Dict]) -> str:
+    def query(self, question: str, context_docs: List[Dict], stream: bool = False) -> str:
         # Format context
         context_text = "\n\n".join([f"- {doc.get('content', '')}" for doc in context_docs])
-        
+        inputs = {"context": context_text, "question": question}
+
+        if stream:
+            return self._stream(inputs)
+
         # Invoke chain
-        response = self.chain.invoke({"context": context_text, "question": question})
+        response = self.chain.invoke(inputs)
         
         # Handle different response types (str vs message)
         if hasattr(response, 'content'):
             return response.content
         return str(response)
+
+    def _stream(self, inputs: Dict) -> str:
+        """
+        Writes the answer to stdout token by token as the provider generates it,
+        records time-to-first-token and tokens/sec in last_metrics and returns
+        the full answer. Works with both the Ollama and OpenAI-compatible models.
+        A cached answer is written out at once.
+        """
+        start = time.perf_counter()
+        first_token_at = None
+        parts = []
+        for chunk in self.stream_chain.stream(inputs):
+            token = chunk.content if hasattr(chunk, 'content') else str(chunk)
+            if not token:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            parts.append(token)
+            sys.stdout.write(token)
+            sys.stdout.flush()
+        finished_at = time.perf_counter()
+
+        generation_seconds = finished_at - first_token_at if first_token_at else 0.0
+        self.last_metrics = {
+            "time_to_first_token": first_token_at - start if first_token_at else None,
+            "tokens": len(parts),
+            "tokens_per_sec": len(parts) / generation_seconds if generation_seconds > 0 else 0.0,
+            "total_seconds": finished_at - start
+        }
+        return "".join(parts)
@@ -13,6 +13,8 @@ def main():
     parser.add_argument("--upload", type=str, help="Text content to upload to MongoDB")
     parser.add_argument("--query", type=str, help="Question to ask the LLM")
     parser.add_argument("--list", action="store_true", help="List recent documents from DB")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the LLM response cache")
+    parser.add_argument("--stream", action="store_true", help="Print the answer token by token as it is generated")
     
     args = parser.parse_args()
 
@@ -54,17 +56,33 @@ def main():
         
         # 2. Initialize LLM Chain
         try:
-            chain = LLMChainHandler()
+            chain = LLMChainHandler(use_cache=not args.no_cache)
         except Exception as e:
             print(f"Error initializing LLM Chain: {e}")
             sys.exit(1)
             
         # 3. Get Answer
+        if args.stream:
+            print("\n=== LLM Response ===")
+            chain.query(args.query, context_docs, stream=True)
+            print("\n====================")
+            metrics = chain.last_metrics
+            if metrics["time_to_first_token"] is not None:
+                print(f"First token after {metrics['time_to_first_token']:.2f}s, "
+                      f"{metrics['tokens']} tokens at {metrics['tokens_per_sec']:.1f} tokens/sec")
+            if not chain.cache.bypass:
+                stats = chain.cache.stats()
+                print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
+            return
+
         answer = chain.query(args.query, context_docs)
         
         print("\n=== LLM Response ===")
         print(answer)
         print("====================")
+        if not chain.cache.bypass:
+            stats = chain.cache.stats()
+            print(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses ({stats['entries']} entries)")
         return
 
     # If no arguments